@@ -0,0 +1,89 @@
+"""
+Cold-start benchmark: import time of `src.app.main` and time until the app answers.
+
+    python -m benchmarks.bench_cold_start --budget-ms 1500
+
+Each run starts a fresh interpreter with no platform secrets set, imports the app,
+runs its lifespan startup through a TestClient and sends `GET /`. Reports the
+median over `--runs` and exits non-zero when import + startup exceeds
+`--budget-ms` or when a module that should load lazily (LangChain, slack_sdk,
+uvicorn) was imported at startup.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+LAZY_MODULES = ("langchain", "langchain_community", "langchain_core", "slack_sdk", "uvicorn")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import src.app.main as main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+client_ready = time.perf_counter()
+with TestClient(main.app) as client:
+    up = time.perf_counter()
+    client.get("/")
+    answered = time.perf_counter()
+lazy = json.loads(sys.argv[1])
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (up - client_ready) * 1000,
+    "first_response_ms": (answered - up) * 1000,
+    "eager_modules": sorted(name for name in lazy if name in sys.modules),
+}))
+"""
+
+SECRETS = (
+    "SLACK_TOKEN", "SLACK_SIGNING_SECRET", "OPENAI_API_KEY", "DISCORD_TOKEN", "DISCORD_PUBLIC_KEY",
+    "TEAMS_CLIENT_ID", "TEAMS_CLIENT_SECRET", "TEAMS_TENANT_ID", "TEAMS_GRAPH_TOKEN",
+    "GITHUB_TOKEN", "GITHUB_REPO", "JENKINS_URL",
+)
+
+def run_once(data_dir: str) -> dict:
+    env = {k: v for k, v in os.environ.items() if k not in SECRETS}
+    env.update({
+        "JOB_DB_PATH": os.path.join(data_dir, "jobs.sqlite3"),
+        "MESSAGE_STORE_PATH": os.path.join(data_dir, "messages.sqlite3"),
+        "LLM_CACHE_PATH": os.path.join(data_dir, "llm_cache.sqlite3"),
+        "STARTUP_WARMUP": "false",
+    })
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, json.dumps(LAZY_MODULES)],
+        env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="max median import + startup time")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        runs = [run_once(data_dir) for _ in range(args.runs)]
+
+    results = {
+        key: round(statistics.median(run[key] for run in runs), 1)
+        for key in ("import_ms", "startup_ms", "first_response_ms")
+    }
+    results["total_ms"] = round(results["import_ms"] + results["startup_ms"], 1)
+    results["budget_ms"] = args.budget_ms
+    results["eager_modules"] = sorted({name for run in runs for name in run["eager_modules"]})
+    results["ok"] = results["total_ms"] <= args.budget_ms and not results["eager_modules"]
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if not results["ok"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
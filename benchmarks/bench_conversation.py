@@ -0,0 +1,123 @@
+"""
+Microbenchmark: columnar `Conversation` against a list of pydantic `Message` objects.
+
+    python -m benchmarks.bench_conversation --messages 10000,50000 --authors 50
+
+For each size, builds the conversation from synthetic Slack `conversations.history`
+pages both ways (one validated `Message` per row, as the parsers used to, versus
+`slack_parser.parse_history_page`), then sorts it by time and serializes it to JSON.
+Reports the best of `--repeat` timings per step, the memory retained by the built
+conversation and the allocation peak while building (tracemalloc), and checks that
+both serialize to identical JSON.
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from datetime import datetime
+
+from src.app.core.models import Message
+from src.ingestion.parsers.slack_parser import SYSTEM_SUBTYPES, parse_history_page
+
+WORDS = "deploy rollback error timeout latency pod restart 502 gateway database migration canary traffic".split()
+
+def synthetic_page(messages: int, authors: int, seed: int) -> list:
+    rng = random.Random(seed)
+    start = 1_700_000_000.0
+    page = []
+    for i in range(messages):
+        msg = {"type": "message", "ts": f"{start + rng.random() * 86400:.6f}", "text": " ".join(rng.choices(WORDS, k=rng.randint(5, 30)))}
+        if rng.random() < 0.05:
+            msg.update({"subtype": "bot_message", "bot_id": "B1"})
+        else:
+            msg["user"] = f"U{rng.randrange(authors):06d}"
+        page.append(msg)
+    return page
+
+def build_messages(page: list, user_names: dict) -> list:
+    return [
+        Message(
+            user_id=msg.get("user", "unknown"),
+            username=user_names.get(msg.get("user")) or "Unknown",
+            text=msg.get("text", ""),
+            timestamp=datetime.fromtimestamp(float(msg.get("ts", 0))),
+            source="slack",
+            message_id=msg.get("ts"),
+            is_bot=bool(msg.get("bot_id")) or msg.get("subtype") == "bot_message",
+            is_system=msg.get("subtype") in SYSTEM_SUBTYPES,
+        )
+        for msg in page
+    ]
+
+def best_of(repeat: int, func):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def measure_memory(func) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {"retained_mb": round((retained - before) / 1e6, 2), "peak_mb": round((peak - before) / 1e6, 2)}
+
+def run(messages: int, authors: int, repeat: int, seed: int) -> dict:
+    page = synthetic_page(messages, authors, seed)
+    user_names = {f"U{i:06d}": f"User {i}" for i in range(authors)}
+
+    def sort_list(items):
+        return lambda: sorted(items, key=lambda msg: msg.timestamp)
+
+    def sort_columns(conversation):
+        def sort():
+            conversation.sort()
+            return conversation
+        return sort
+
+    legacy_build, legacy = best_of(repeat, lambda: build_messages(page, user_names))
+    compact_build, compact = best_of(repeat, lambda: parse_history_page(page, user_names))
+    legacy_sort, legacy = best_of(repeat, sort_list(legacy))
+    compact_sort, compact = best_of(repeat, sort_columns(compact))
+    legacy_dump, legacy_json = best_of(repeat, lambda: json.dumps([msg.model_dump(mode="json") for msg in legacy]))
+    compact_dump, compact_json = best_of(repeat, lambda: json.dumps(compact.dump(json=True)))
+
+    return {
+        "messages": messages,
+        "authors": authors,
+        "identical_json": legacy_json == compact_json,
+        "message_list": {
+            "build_ms": round(legacy_build * 1000, 2), "sort_ms": round(legacy_sort * 1000, 2),
+            "dump_ms": round(legacy_dump * 1000, 2), **measure_memory(lambda: build_messages(page, user_names)),
+        },
+        "conversation": {
+            "build_ms": round(compact_build * 1000, 2), "sort_ms": round(compact_sort * 1000, 2),
+            "dump_ms": round(compact_dump * 1000, 2), **measure_memory(lambda: parse_history_page(page, user_names)),
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", default="10000,50000", help="conversation sizes, comma separated")
+    parser.add_argument("--authors", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = [run(int(size), args.authors, args.repeat, args.seed) for size in args.messages.split(",") if size]
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+End-to-end benchmark: the real FastAPI app against local fakes of every external API.
+
+    python -m benchmarks.bench_e2e --messages 200,5000 --authors 20 --log-mb 1,50 \\
+        --requests 8 --concurrency 4 --json e2e.json --baseline previous.json
+
+Starts `benchmarks.fake_services` in a subprocess, points every connector at it through
+the *_API_URL / JENKINS_URL / OPENAI_BASE_URL settings and serves `src.app.main:app` with
+uvicorn in this process. For each incident size (the product of `--messages`, `--authors`
+and `--log-mb`) it fires `--requests` triggers round-robin over `--platforms`, at most
+`--concurrency` at once, and follows each job through `GET /api/v1/jobs/{id}`.
+
+Reported per scenario:
+  trigger_ms / jobs_api_ms / health_ms   p50/p99 latency of the webhooks, job polls and a
+                                         `GET /` probe sent every 50ms while jobs run
+  e2e_seconds                            trigger to job finished (server timestamps)
+  loop_lag_ms                            event-loop lag sampled inside the app every 10ms
+  peak_rss_mb                            process high-water RSS after the scenario (it never
+                                         goes down, so sizes run smallest first)
+  fake                                   calls and injected 429s per fake route
+
+`--baseline` compares against an earlier `--json` file scenario by scenario.
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLATFORMS = ("slack", "discord", "teams")
+COMPARED = (("e2e_seconds", "p50"), ("e2e_seconds", "p99"), ("trigger_ms", "p99"), ("health_ms", "p99"), ("loop_lag_ms", "p99"), ("peak_rss_mb", None))
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentiles(values: List[float], scale: float = 1.0) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"n": 0, "p50": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def rank(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * scale, 3)
+
+    return {"n": len(ordered), "p50": rank(0.5), "p99": rank(0.99), "max": round(ordered[-1] * scale, 3)}
+
+def app_environment(fake_url: str, data_dir: str, llm_cache: bool) -> Dict[str, str]:
+    return {
+        "SLACK_TOKEN": "xoxb-bench", "SLACK_SIGNING_SECRET": "bench",
+        "DISCORD_TOKEN": "bench", "DISCORD_PUBLIC_KEY": "bench",
+        "TEAMS_CLIENT_ID": "bench", "TEAMS_CLIENT_SECRET": "bench", "TEAMS_TENANT_ID": "bench",
+        "GITHUB_TOKEN": "bench", "GITHUB_REPO": "acme/payments",
+        "JENKINS_URL": f"{fake_url}/jenkins", "JENKINS_USERNAME": "bench", "JENKINS_TOKEN": "bench", "JENKINS_JOB_NAME": "deploy",
+        "OPENAI_API_KEY": "sk-bench", "OPENAI_BASE_URL": f"{fake_url}/openai/v1",
+        "SLACK_API_URL": f"{fake_url}/slack/api",
+        "DISCORD_API_URL": f"{fake_url}/discord/api/v10",
+        "GRAPH_API_URL": f"{fake_url}/graph/v1.0",
+        "GRAPH_LOGIN_URL": f"{fake_url}/login",
+        "GITHUB_API_URL": f"{fake_url}/github",
+        "JOB_DB_PATH": os.path.join(data_dir, "jobs.sqlite3"),
+        "MESSAGE_STORE_PATH": os.path.join(data_dir, "messages.sqlite3"),
+        "LLM_CACHE_PATH": os.path.join(data_dir, "llm_cache.sqlite3"),
+        "INCIDENT_INDEX_PATH": os.path.join(data_dir, "incidents.sqlite3"),
+        "GITHUB_CACHE_PATH": os.path.join(data_dir, "github"),
+        "LLM_CACHE_STAGES": json.dumps(["log_summary", "repair"] if llm_cache else []),
+        "STARTUP_WARMUP": "false",
+        # Scenarios re-trigger the same channels on purpose; measure every run rather than attach to the last.
+        "JOB_COALESCE_ENABLED": "false",
+        # Queue every trigger however many are sent at once; the benchmark measures the backlog.
+        "JOB_MAX_QUEUED": "0",
+        # The fakes meter nothing but their injected 429s, which the scheduler still honours.
+        "HTTP_RATE_LIMITS": "{}",
+    }
+
+def start_fakes(port: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_services", "--port", str(port)], cwd=ROOT,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/_health", timeout=1.0).raise_for_status()
+            return process
+        except httpx.HTTPError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("fake services did not start")
+
+def trigger(platform: str, channel: str, user: str) -> dict:
+    """Request kwargs for the webhook each platform would send."""
+    if platform == "slack":
+        return {"data": {"channel_id": channel, "user_id": user, "channel_name": channel, "command": "/postmortem"}}
+    if platform == "discord":
+        return {"json": {"type": 2, "channel_id": channel, "channel": {"id": channel, "name": channel}, "member": {"user": {"id": user}}}}
+    return {"json": {"channelId": channel, "channelName": channel, "from": {"user": {"id": user}}}}
+
+TRIGGER_USERS = {"slack": "U000000", "discord": "100000000", "teams": "00000000-0000-0000-0000-000000000000"}
+
+async def run_job(client: httpx.AsyncClient, platform: str, channel: str, timeout: float, samples: dict) -> dict:
+    started = time.perf_counter()
+    resp = await client.post(f"/api/v1/{platform}", **trigger(platform, channel, TRIGGER_USERS[platform]))
+    samples["trigger"].append(time.perf_counter() - started)
+    resp.raise_for_status()
+    job_id = resp.json()["job_id"] if platform == "discord" else resp.text.rsplit(" ", 1)[-1].strip("`")
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+        started = time.perf_counter()
+        resp = await client.get(f"/api/v1/jobs/{job_id}")
+        samples["jobs_api"].append(time.perf_counter() - started)
+        job = resp.json()
+        if job["status"] in ("done", "failed"):
+            return job
+    return {"id": job_id, "status": "timeout"}
+
+async def probe(client: httpx.AsyncClient, samples: list, stop: asyncio.Event):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/")
+        samples.append(time.perf_counter() - started)
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(stop.wait(), 0.05)
+
+async def drive_scenario(app_url: str, args, index: int) -> dict:
+    samples = {"trigger": [], "jobs_api": [], "health": []}
+    limit = asyncio.Semaphore(args.concurrency)
+    platforms = itertools.cycle(args.platforms)
+
+    async with httpx.AsyncClient(base_url=app_url, timeout=60.0) as client:
+        async def one(i: int, platform: str):
+            async with limit:
+                return await run_job(client, platform, f"bench-{index}-{i}", args.timeout, samples)
+
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(client, samples["health"], stop))
+        started = time.perf_counter()
+        jobs = await asyncio.gather(*(one(i, next(platforms)) for i in range(args.requests)))
+        wall = time.perf_counter() - started
+        stop.set()
+        await prober
+
+    finished = [job for job in jobs if job.get("finished_at")]
+    stages: Dict[str, List[float]] = {}
+    for job in finished:
+        for stage, span in (job.get("stages") or {}).items():
+            if span.get("finished_at"):
+                stages.setdefault(stage, []).append(span["finished_at"] - span["started_at"])
+    return {
+        "wall_seconds": round(wall, 3),
+        "jobs": {status: sum(1 for job in jobs if job["status"] == status) for status in {job["status"] for job in jobs}},
+        "errors": sorted({job["error"] for job in jobs if job.get("error")})[:5],
+        "trigger_ms": percentiles(samples["trigger"], 1000),
+        "jobs_api_ms": percentiles(samples["jobs_api"], 1000),
+        "health_ms": percentiles(samples["health"], 1000),
+        "e2e_seconds": percentiles([job["finished_at"] - job["created_at"] for job in finished]),
+        "queued_seconds": percentiles([job["queued_seconds"] for job in finished if job.get("queued_seconds") is not None]),
+        "stage_seconds": {stage: percentiles(values)["p50"] for stage, values in sorted(stages.items())},
+    }
+
+async def monitor_loop_lag(lag: dict, interval: float = 0.01):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag["samples"].append(max(0.0, time.perf_counter() - started - interval))
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def run_scenarios(app_url: str, fake_url: str, args, lag: dict) -> List[dict]:
+    results = []
+    sizes = sorted(itertools.product(args.messages, args.authors, args.log_mb), key=lambda size: (size[2], size[0], size[1]))
+    for index, (messages, authors, log_mb) in enumerate(sizes):
+        fake_config = {
+            "messages": messages, "authors": authors, "log_mb": log_mb, "message_chars": args.message_chars,
+            "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "page_cap": args.page_cap,
+            "rate_limit_ratio": args.rate_limit_ratio, "retry_after_seconds": args.retry_after_seconds,
+            "llm_latency_ms": args.llm_latency_ms, "seed": args.seed,
+        }
+        httpx.post(f"{fake_url}/_config", json=fake_config, timeout=300.0).raise_for_status()
+        lag["samples"] = []
+        result = asyncio.run(drive_scenario(app_url, args, index))
+        result = {
+            "scenario": {"messages": messages, "authors": authors, "log_mb": log_mb},
+            **result,
+            "loop_lag_ms": percentiles(lag["samples"], 1000),
+            "peak_rss_mb": peak_rss_mb(),
+            "fake": httpx.get(f"{fake_url}/_stats").json(),
+        }
+        results.append(result)
+        e2e = result["e2e_seconds"]
+        print(
+            f"messages={messages} authors={authors} log_mb={log_mb}: e2e p50={e2e['p50']}s p99={e2e['p99']}s "
+            f"lag p99={result['loop_lag_ms']['p99']}ms rss={result['peak_rss_mb']}MB jobs={result['jobs']}",
+            file=sys.__stdout__, flush=True,
+        )
+    return results
+
+async def serve(app, port: int, app_url: str, fake_url: str, args) -> List[dict]:
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        if serving.done():
+            serving.result()
+        await asyncio.sleep(0.05)
+    lag = {"samples": []}
+    monitor = asyncio.create_task(monitor_loop_lag(lag))
+    try:
+        # The load generator runs on its own thread and loop so it doesn't show up as app loop lag.
+        return await asyncio.to_thread(run_scenarios, app_url, fake_url, args, lag)
+    finally:
+        monitor.cancel()
+        server.should_exit = True
+        await serving
+
+def compare(results: List[dict], baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = {json.dumps(r["scenario"], sort_keys=True): r for r in json.load(f)["scenarios"]}
+    for result in results:
+        before = baseline.get(json.dumps(result["scenario"], sort_keys=True))
+        if before is None:
+            continue
+        changes = []
+        for metric, key in COMPARED:
+            new = result[metric] if key is None else result[metric][key]
+            old = before[metric] if key is None else before[metric][key]
+            if new is not None and old:
+                changes.append(f"{metric}{'.' + key if key else ''} {old} -> {new} ({(new - old) / old:+.0%})")
+        print(f"{result['scenario']}: " + "; ".join(changes))
+
+def csv(cast):
+    return lambda value: [cast(part) for part in value.split(",") if part]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=csv(int), default=[500], help="messages per channel, comma separated")
+    parser.add_argument("--authors", type=csv(int), default=[20], help="distinct authors, comma separated")
+    parser.add_argument("--log-mb", type=csv(float), default=[5.0], help="deployment log size, comma separated")
+    parser.add_argument("--message-chars", type=int, default=120)
+    parser.add_argument("--platforms", type=csv(str), default=list(PLATFORMS))
+    parser.add_argument("--requests", type=int, default=6, help="triggers per scenario")
+    parser.add_argument("--concurrency", type=int, default=3, help="triggers in flight at once")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--page-cap", type=int, default=200)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="share of fake API calls answered 429")
+    parser.add_argument("--retry-after-seconds", type=float, default=1.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=1500.0)
+    parser.add_argument("--llm-cache", action="store_true", help="keep the LLM response cache on (off by default)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds to wait for each job")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--app-log", default=os.devnull, help="where the app's own output goes")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--baseline", help="earlier --json results to compare against")
+    args = parser.parse_args()
+
+    fake_port, app_port = free_port(), free_port()
+    fake_url, app_url = f"http://127.0.0.1:{fake_port}", f"http://127.0.0.1:{app_port}"
+    fakes = start_fakes(fake_port)
+    try:
+        with tempfile.TemporaryDirectory() as data_dir, open(args.app_log, "a") as app_log:
+            # Settings are read at import time, so the environment has to be in place first.
+            os.environ.update(app_environment(fake_url, data_dir, args.llm_cache))
+            sys.path.insert(0, ROOT)
+            from src.app.main import app
+
+            with contextlib.redirect_stdout(app_log):
+                results = asyncio.run(serve(app, app_port, app_url, fake_url, args))
+    finally:
+        fakes.terminate()
+        fakes.wait()
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("json", "baseline", "app_log")},
+        "python": sys.version.split()[0],
+        "scenarios": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        compare(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Microbenchmark: similar-incident search over a synthetic corpus of past postmortems.
+
+    python -m benchmarks.bench_incident_index --incidents 10000,100000 --dimensions 256
+
+For each corpus size, fills a fresh `IncidentIndex` on a temporary SQLite file with clustered
+random unit vectors (incidents recur, so real corpora cluster too), then times a cold load
+from disk and `--queries` searches both exhaustively and through the IVF (built regardless of
+the size threshold). Reports p50/p99 search latency per mode and the IVF's recall@k against
+the exact results.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from src.llm.incident_index import IncidentIndex
+
+def synthetic_vectors(count: int, dimensions: int, clusters: int, rng) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, count)] + 0.35 * rng.standard_normal((count, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def fill(index: IncidentIndex, vectors: np.ndarray, batch: int = 5000):
+    for start in range(0, len(vectors), batch):
+        keys = [f"k{i}" for i in range(start, min(start + batch, len(vectors)))]
+        index.put_embeddings(list(zip(keys, vectors[start:start + batch])))
+        index.add(
+            [{"incident_id": f"inc-{key[1:]}", "platform": "slack", "channel_id": "C1", "channel_name": "incidents",
+              "summary": "synthetic", "root_cause": "", "created_at": 1_700_000_000 + int(key[1:])} for key in keys],
+            keys,
+        )
+
+def percentiles(samples: list) -> dict:
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+    return {"p50_ms": pick(0.5), "p99_ms": pick(0.99)}
+
+def run(count: int, dimensions: int, queries: int, k: int, nprobe: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    vectors = synthetic_vectors(count, dimensions, max(count // 50, 10), rng)
+    probes = vectors[rng.integers(0, count, queries)] + 0.2 * rng.standard_normal((queries, dimensions)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "incidents.sqlite3")
+        started = time.perf_counter()
+        fill(IncidentIndex(path, "bench", dimensions, ivf_threshold=count + 1, nprobe=nprobe), vectors)
+        fill_seconds = time.perf_counter() - started
+
+        exact = IncidentIndex(path, "bench", dimensions, ivf_threshold=count + 1, nprobe=nprobe)
+        started = time.perf_counter()
+        exact.load()
+        load_seconds = time.perf_counter() - started
+        approximate = IncidentIndex(path, "bench", dimensions, ivf_threshold=1, nprobe=nprobe)
+        started = time.perf_counter()
+        approximate.load()
+        ivf_build_seconds = time.perf_counter() - started - load_seconds
+
+        timings = {"exact": [], "ivf": []}
+        hits = 0
+        for probe in probes:
+            started = time.perf_counter()
+            truth = {incident_id for incident_id, _ in exact.search(probe, k)}
+            timings["exact"].append(time.perf_counter() - started)
+            started = time.perf_counter()
+            found = {incident_id for incident_id, _ in approximate.search(probe, k)}
+            timings["ivf"].append(time.perf_counter() - started)
+            hits += len(truth & found)
+        exact.close()
+        approximate.close()
+
+    return {
+        "incidents": count,
+        "dimensions": dimensions,
+        "fill_seconds": round(fill_seconds, 2),
+        "load_seconds": round(load_seconds, 3),
+        "ivf_build_seconds": round(ivf_build_seconds, 3),
+        "exact": percentiles(timings["exact"]),
+        "ivf": percentiles(timings["ivf"]),
+        f"ivf_recall_at_{k}": round(hits / (queries * k), 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--incidents", default="10000,100000", help="corpus sizes, comma separated")
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = [
+        run(int(size), args.dimensions, args.queries, args.k, args.nprobe, args.seed)
+        for size in args.incidents.split(",") if size
+    ]
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
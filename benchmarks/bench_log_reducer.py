@@ -0,0 +1,119 @@
+"""
+Throughput and compression benchmark for the deterministic log reducer.
+
+    python -m benchmarks.bench_log_reducer --size-mb 100
+
+Writes a synthetic CI/deploy log of roughly `--size-mb` to a temp file (timestamps,
+ANSI colours, repetitive download/test lines and a few failure bursts), then streams
+it through `reduce_logs` and reports MB/s, input/digest compression ratio, and how
+often the digest stays under the pipeline's LOG_LENGTH_LIMIT.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from src.app.core.config import settings
+from src.ingestion.parsers.log_reducer import reduce_logs
+
+TEMPLATES = [
+    "\x1b[36mINFO\x1b[0m Downloading {pkg}-{major}.{minor}.{patch}.tar.gz from https://registry.example.com/{pkg} ({kb} kB)",
+    "\x1b[36mINFO\x1b[0m Step {step}/{steps} : RUN pip install -r requirements-{pkg}.txt",
+    "test_{pkg}_{step} PASSED [{pct}%] in {ms}ms",
+    "Pod {pkg}-{hexid} in namespace prod is Running (restarts={restarts})",
+    "GET /api/v1/{pkg}/{step} 200 {ms}ms request_id={uuid}",
+]
+FAILURE_BURST = [
+    "\x1b[31mERROR\x1b[0m Readiness probe failed for {pkg}-{hexid}: connection refused on 10.0.{a}.{b}:8080",
+    "Traceback (most recent call last):",
+    '  File "/app/{pkg}/migrate.py", line {step}, in apply',
+    "psycopg2.OperationalError: could not connect to server: Connection timed out",
+    "##[error]Process completed with exit code 1.",
+]
+
+def random_fields(rng: random.Random) -> dict:
+    return {
+        "pkg": rng.choice(["auth", "billing", "search", "gateway", "worker", "payments"]),
+        "major": rng.randint(0, 9), "minor": rng.randint(0, 30), "patch": rng.randint(0, 99),
+        "kb": rng.randint(1, 90000), "step": rng.randint(1, 400), "steps": 400,
+        "pct": rng.randint(0, 100), "ms": rng.randint(1, 5000), "restarts": rng.randint(0, 5),
+        "hexid": f"{rng.getrandbits(40):010x}", "uuid": f"{rng.getrandbits(128):032x}",
+        "a": rng.randint(0, 255), "b": rng.randint(0, 255),
+    }
+
+def write_synthetic_log(path: str, size_mb: float, seed: int) -> int:
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    written = 0
+    second = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            second += 1
+            stamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(1_700_000_000 + second // 20))
+            templates = FAILURE_BURST if rng.random() < 0.0005 else [rng.choice(TEMPLATES)]
+            for template in templates:
+                line = f"{stamp}.{rng.randint(0, 9999999):07d}Z {template.format(**random_fields(rng))}\n"
+                f.write(line)
+                written += len(line)
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=100.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--runs", type=int, default=3, help="logs to reduce, seeded --seed, --seed + 1, ...")
+    parser.add_argument("--threshold", type=int,
+                        help="digest size the prompt allows (default: the pipeline's LOG_LENGTH_LIMIT)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    if args.threshold is None:
+        # Imported here: fake_services imports this module for write_synthetic_log.
+        from src.llm.pipeline import LOG_LENGTH_LIMIT
+        args.threshold = LOG_LENGTH_LIMIT
+
+    runs = []
+    for seed in range(args.seed, args.seed + args.runs):
+        fd, path = tempfile.mkstemp(suffix=".log")
+        os.close(fd)
+        try:
+            size = write_synthetic_log(path, args.size_mb, seed)
+            started = time.perf_counter()
+            with open(path, encoding="utf-8") as f:
+                digest = reduce_logs(line.rstrip("\n") for line in f)
+            rendered = digest.render(max_chars=min(settings.LOG_DIGEST_MAX_CHARS, args.threshold))
+            elapsed = time.perf_counter() - started
+        finally:
+            os.remove(path)
+        runs.append({
+            "seed": seed,
+            "input_bytes": size,
+            "input_lines": digest.total_lines,
+            "templates": len(digest.templates),
+            "signal_lines": digest.signal_lines,
+            "digest_chars": len(rendered),
+            # What the windows and templates need before the budget cuts anything.
+            "unbudgeted_digest_chars": len(digest.render(max_chars=sys.maxsize)),
+            "seconds": round(elapsed, 3),
+        })
+
+    seconds = sum(run["seconds"] for run in runs)
+    input_bytes = sum(run["input_bytes"] for run in runs)
+    results = {
+        "runs": runs,
+        "threshold_chars": args.threshold,
+        "under_threshold_rate": sum(run["digest_chars"] <= args.threshold for run in runs) / len(runs),
+        "unbudgeted_under_threshold_rate": sum(run["unbudgeted_digest_chars"] <= args.threshold for run in runs) / len(runs),
+        "mb_per_second": round(input_bytes / 1024 / 1024 / seconds, 2),
+        "lines_per_second": round(sum(run["input_lines"] for run in runs) / seconds),
+        "compression_ratio": round(input_bytes / max(sum(run["digest_chars"] for run in runs), 1), 1),
+    }
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,639 @@
+"""
+Local stand-ins for every external API the app calls: Slack, Discord, Microsoft Graph,
+GitHub (plus the log blob it redirects to), Jenkins, OpenAI chat completions and embeddings, and
+the Microsoft identity platform's token endpoint.
+
+    python -m benchmarks.fake_services --port 8765
+
+One ASGI app serves them all under a per-service prefix (`/slack/api`, `/discord/api/v10`,
+`/graph/v1.0`, `/login`, `/github`, `/jenkins`, `/openai/v1`). Conversations are generated on the fly
+and deterministically from the channel id: `messages` per channel from `authors` distinct
+users, spread over the last `span_seconds`. Both log sources serve one synthetic log of
+`log_mb`. Every API response is delayed by `latency_ms` (+ up to `jitter_ms`) and answered
+with a 429 and `Retry-After` with probability `rate_limit_ratio`; pages are capped at
+`page_cap` whatever the client asks for.
+
+`POST /_config` replaces the configuration (JSON body, see `FakeConfig`) and resets the
+counters; `GET /_stats` returns request and 429 counts per route.
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import math
+import os
+import random
+import re
+import tempfile
+import time
+import zlib
+from collections import Counter
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from benchmarks.bench_log_reducer import write_synthetic_log
+
+DISCORD_EPOCH_MS = 1420070400000
+WORDS = (
+    "deploy rollback error timeout latency pod restart 502 gateway database migration replica "
+    "cpu memory alert pager dashboard canary traffic queue backlog retry config flag cache"
+).split()
+PROMPT_USER = re.compile(r"\] \[(slack|discord|teams)\] (\S+) \(")
+
+@dataclass
+class FakeConfig:
+    messages: int = 500
+    authors: int = 20
+    message_chars: int = 120
+    span_seconds: float = 6 * 3600
+    bot_ratio: float = 0.05
+    log_mb: float = 5.0
+    latency_ms: float = 20.0
+    jitter_ms: float = 10.0
+    rate_limit_ratio: float = 0.0
+    retry_after_seconds: float = 1.0
+    page_cap: int = 200
+    llm_latency_ms: float = 1500.0
+    llm_chunks: int = 40
+    seed: int = 1
+
+class FakeState:
+    def __init__(self):
+        self.config = FakeConfig()
+        self.end = time.time()
+        self.counts: Counter = Counter()
+        self.rate_limited: Counter = Counter()
+        self.rng = random.Random(0)
+        self.log_path = None
+        self.log_size = 0
+        self.log_mb = None
+        self.log_span = (0.0, 0.0)
+        self.message_ids = 0
+
+    def configure(self, values: dict):
+        known = {f.name for f in fields(FakeConfig)}
+        self.config = FakeConfig(**{k: v for k, v in values.items() if k in known})
+        # Keep every generated message safely before any trigger sent from now on.
+        self.end = time.time() - 60
+        self.counts.clear()
+        self.rate_limited.clear()
+        self.rng = random.Random(self.config.seed)
+        if self.log_mb != self.config.log_mb:
+            if self.log_path:
+                os.unlink(self.log_path)
+            fd, self.log_path = tempfile.mkstemp(prefix="fake-deploy-", suffix=".log")
+            os.close(fd)
+            self.log_size = write_synthetic_log(self.log_path, self.config.log_mb, self.config.seed)
+            self.log_mb = self.config.log_mb
+            with open(self.log_path, "rb") as f:
+                first = f.readline()
+                f.seek(max(self.log_size - 4096, 0))
+                last = f.read().rstrip(b"\n").rsplit(b"\n", 1)[-1]
+            self.log_span = tuple(
+                datetime.strptime(line[:19].decode(), "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+                for line in (first, last)
+            )
+
+    # --- generated conversation -------------------------------------------------
+
+    @property
+    def step(self) -> float:
+        return self.config.span_seconds / max(self.config.messages, 1)
+
+    @property
+    def start(self) -> float:
+        return self.end - self.config.span_seconds
+
+    def ts(self, k: int) -> float:
+        return self.start + (k + 0.5) * self.step
+
+    def index_range(self, oldest: float = None, latest: float = None):
+        """Indices of generated messages inside [oldest, latest], as (low, high) inclusive."""
+        low, high = 0, self.config.messages - 1
+        if oldest is not None:
+            low = max(low, math.ceil((oldest - self.start) / self.step - 0.5))
+        if latest is not None:
+            high = min(high, math.floor((latest - self.start) / self.step - 0.5))
+        return low, high
+
+    def author(self, k: int, channel: str) -> int:
+        return (k + zlib.crc32(channel.encode())) % max(self.config.authors, 1)
+
+    def text(self, k: int, channel: str) -> str:
+        rng = random.Random(zlib.crc32(f"{channel}:{k}".encode()))
+        words = []
+        length = 0
+        target = rng.randint(self.config.message_chars // 2, self.config.message_chars * 3 // 2)
+        while length < target:
+            word = rng.choice(WORDS)
+            words.append(word)
+            length += len(word) + 1
+        return " ".join(words)
+
+    def is_bot(self, k: int, channel: str) -> bool:
+        return random.Random(zlib.crc32(f"bot:{channel}:{k}".encode())).random() < self.config.bot_ratio
+
+    def next_id(self) -> str:
+        self.message_ids += 1
+        return str(self.message_ids)
+
+state = FakeState()
+
+def iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+async def admit(request: Request, route: str):
+    """Count the call, apply latency, and maybe answer 429 instead. Returns the 429 response or None."""
+    config = state.config
+    state.counts[route] += 1
+    delay = config.latency_ms + state.rng.random() * config.jitter_ms
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+    if config.rate_limit_ratio > 0 and state.rng.random() < config.rate_limit_ratio:
+        state.rate_limited[route] += 1
+        return JSONResponse(
+            {"ok": False, "error": "ratelimited", "message": "You are being rate limited.",
+             "retry_after": config.retry_after_seconds},
+            status_code=429,
+            headers={"Retry-After": f"{config.retry_after_seconds:g}"},
+        )
+    return None
+
+def page_size(requested, default: int) -> int:
+    try:
+        size = int(requested) if requested is not None else default
+    except ValueError:
+        size = default
+    return max(1, min(size, state.config.page_cap))
+
+# --- Slack -----------------------------------------------------------------------
+
+def slack_user(author: int) -> str:
+    return f"U{author:06d}"
+
+async def slack_method(request: Request):
+    method = request.path_params["method"]
+    limited = await admit(request, f"slack:{method}")
+    if limited:
+        return limited
+    params = dict(request.query_params)
+    if request.method == "POST":
+        params.update(await request.json())
+
+    if method == "conversations.history":
+        channel = params["channel"]
+        low, high = state.index_range(
+            float(params["oldest"]) if params.get("oldest") else None,
+            float(params["latest"]) if params.get("latest") else None,
+        )
+        offset = int(params.get("cursor") or 0)
+        size = page_size(params.get("limit"), 100)
+        first = high - offset
+        last = max(low, first - size + 1)
+        messages = []
+        for k in range(first, last - 1, -1):
+            msg = {"type": "message", "ts": f"{state.ts(k):.6f}", "text": state.text(k, channel)}
+            if state.is_bot(k, channel):
+                msg.update({"subtype": "bot_message", "bot_id": "B000001", "username": "deploybot"})
+            else:
+                msg["user"] = slack_user(state.author(k, channel))
+            messages.append(msg)
+        has_more = last > low
+        return JSONResponse({
+            "ok": True, "messages": messages, "has_more": has_more,
+            "response_metadata": {"next_cursor": str(offset + len(messages)) if has_more else ""},
+        })
+    if method == "users.info":
+        user = params["user"]
+        return JSONResponse({"ok": True, "user": {"id": user, "real_name": f"Slack User {user}"}})
+    if method == "users.list":
+        offset = int(params.get("cursor") or 0)
+        size = page_size(params.get("limit"), 200)
+        authors = range(offset, min(offset + size, state.config.authors))
+        members = [{"id": slack_user(a), "real_name": f"Slack User {slack_user(a)}"} for a in authors]
+        more = offset + size < state.config.authors
+        return JSONResponse({"ok": True, "members": members, "response_metadata": {"next_cursor": str(offset + size) if more else ""}})
+    if method == "chat.postMessage":
+        return JSONResponse({"ok": True, "channel": params.get("channel"), "ts": f"{time.time():.6f}"})
+    if method == "chat.update":
+        return JSONResponse({"ok": True, "channel": params.get("channel"), "ts": params.get("ts")})
+    return JSONResponse({"ok": False, "error": "unknown_method"})
+
+# --- Discord ---------------------------------------------------------------------
+
+def discord_user(author: int) -> str:
+    return str(100_000_000 + author)
+
+def discord_id(k: int) -> int:
+    return ((int(state.ts(k) * 1000) - DISCORD_EPOCH_MS) << 22) | (k & 0x3FFFFF)
+
+async def discord_messages(request: Request):
+    channel = request.path_params["channel"]
+    limited = await admit(request, f"discord:{request.method} messages")
+    if limited:
+        return limited
+    if request.method == "POST":
+        return JSONResponse({"id": state.next_id(), "channel_id": channel})
+    _, high = state.index_range()
+    before = request.query_params.get("before")
+    if before is not None:
+        high = bisect.bisect_left(range(high + 1), int(before), key=discord_id) - 1
+    size = page_size(request.query_params.get("limit"), 50)
+    messages = []
+    for k in range(high, max(-1, high - size), -1):
+        author = state.author(k, channel)
+        messages.append({
+            "id": str(discord_id(k)), "type": 0, "content": state.text(k, channel), "timestamp": iso(state.ts(k)),
+            "author": {"id": discord_user(author), "username": f"discord-user-{author}", "bot": state.is_bot(k, channel)},
+        })
+    return JSONResponse(messages)
+
+async def discord_message(request: Request):
+    limited = await admit(request, "discord:PATCH message")
+    if limited:
+        return limited
+    return JSONResponse({"id": request.path_params["message"], "channel_id": request.path_params["channel"]})
+
+async def discord_user_info(request: Request):
+    limited = await admit(request, "discord:users")
+    if limited:
+        return limited
+    user = request.path_params["user"]
+    return JSONResponse({"id": user, "username": f"discord-user-{int(user) - 100_000_000}"})
+
+# --- Microsoft Graph --------------------------------------------------------------
+
+def teams_user(author: int) -> str:
+    return f"00000000-0000-0000-0000-{author:012d}"
+
+def graph_item(k: int, channel: str) -> dict:
+    author = state.author(k, channel)
+    stamp = iso(state.ts(k))
+    return {
+        "id": str(k), "messageType": "message", "createdDateTime": stamp, "lastModifiedDateTime": stamp,
+        "from": {"user": {"id": teams_user(author), "displayName": f"Teams User {author}"}},
+        "body": {"contentType": "text", "content": state.text(k, channel)},
+    }
+
+def graph_replies_of(root: str, channel: str) -> list:
+    """Every 25th message starts a thread of two replies."""
+    k = int(root)
+    if k % 25:
+        return []
+    replies = []
+    for j in (1, 2):
+        author = state.author(k + j, channel)
+        stamp = iso(state.ts(k) + j * state.step / 4)
+        replies.append({
+            "id": f"{k}-{j}", "replyToId": root, "messageType": "message", "createdDateTime": stamp, "lastModifiedDateTime": stamp,
+            "from": {"user": {"id": teams_user(author), "displayName": f"Teams User {author}"}},
+            "body": {"contentType": "text", "content": state.text(k * 100 + j, channel)},
+        })
+    return replies
+
+async def graph_messages(request: Request):
+    channel = request.path_params["channel"]
+    limited = await admit(request, f"graph:{request.method} messages")
+    if limited:
+        return limited
+    if request.method == "POST":
+        return JSONResponse({"id": state.next_id()}, status_code=201)
+    size = page_size(request.query_params.get("$top"), 20)
+    offset = int(request.query_params.get("$skiptoken") or 0)
+    _, high = state.index_range()
+    first = high - offset
+    data = {"value": [graph_item(k, channel) for k in range(first, max(-1, first - size), -1)]}
+    if first - size >= 0:
+        data["@odata.nextLink"] = str(request.url.include_query_params(**{"$top": size, "$skiptoken": offset + size}))
+    return JSONResponse(data)
+
+async def graph_delta(request: Request):
+    """
+    Channel-messages delta: with `$filter=lastModifiedDateTime gt ...` everything since then, oldest
+    first, ending in a deltaLink; the (static) conversation never changes, so a deltaLink returns
+    nothing new until `/_config` regenerates it, after which it is rejected with a 410.
+    """
+    channel = request.path_params["channel"]
+    limited = await admit(request, "graph:GET delta")
+    if limited:
+        return limited
+    generation = f"{state.end:.0f}"
+    base = str(request.url.remove_query_params(["$deltatoken", "$skiptoken", "$filter", "$top"]))
+    token = request.query_params.get("$deltatoken")
+    if token is not None:
+        if token != generation:
+            return JSONResponse({"error": {"code": "SyncStateNotFound", "message": "Resync required."}}, status_code=410)
+        return JSONResponse({"value": [], "@odata.deltaLink": f"{base}?$deltatoken={generation}"})
+    match = re.search(r"lastModifiedDateTime gt (\S+)", request.query_params.get("$filter", ""))
+    since = datetime.fromisoformat(match.group(1).replace("Z", "+00:00")).timestamp() if match else None
+    low, high = state.index_range(oldest=since)
+    size = page_size(request.query_params.get("$top"), 20)
+    offset = int(request.query_params.get("$skiptoken") or 0)
+    first = low + offset
+    data = {"value": [graph_item(k, channel) for k in range(first, min(first + size, high + 1))]}
+    if first + size <= high:
+        data["@odata.nextLink"] = str(request.url.include_query_params(**{"$top": size, "$skiptoken": offset + size}))
+    else:
+        data["@odata.deltaLink"] = f"{base}?$deltatoken={generation}"
+    return JSONResponse(data)
+
+async def graph_replies(request: Request):
+    if request.method == "POST":
+        return await graph_message(request)
+    limited = await admit(request, "graph:GET replies")
+    if limited:
+        return limited
+    return JSONResponse({"value": graph_replies_of(request.path_params["message"], request.path_params["channel"])})
+
+async def graph_message(request: Request):
+    limited = await admit(request, f"graph:{request.method} message")
+    if limited:
+        return limited
+    if request.method == "POST":
+        return JSONResponse({"id": state.next_id()}, status_code=201)
+    return Response(status_code=204)
+
+async def graph_user(request: Request):
+    limited = await admit(request, "graph:users")
+    if limited:
+        return limited
+    user = request.path_params["user"]
+    return JSONResponse({"id": user, "displayName": f"Teams User {user[-4:]}"})
+
+async def graph_batch(request: Request):
+    limited = await admit(request, "graph:$batch")
+    if limited:
+        return limited
+    responses = []
+    for item in (await request.json()).get("requests", []):
+        path = item["url"].split("?")[0].strip("/").split("/")
+        if path[-1] == "replies":
+            body = {"value": graph_replies_of(path[-2], path[3])}
+        else:
+            body = {"id": path[-1], "displayName": f"Teams User {path[-1][-4:]}"}
+        responses.append({"id": item["id"], "status": 200, "body": body})
+    return JSONResponse({"responses": responses})
+
+async def login_token(request: Request):
+    """Client-credentials token endpoint of the identity platform."""
+    limited = await admit(request, "login:token")
+    if limited:
+        return limited
+    form = {key: values[0] for key, values in parse_qs((await request.body()).decode()).items()}
+    if form.get("grant_type") != "client_credentials" or not form.get("client_secret"):
+        return JSONResponse({"error": "invalid_request"}, status_code=400)
+    return JSONResponse({"token_type": "Bearer", "expires_in": 3599, "access_token": f"graph-{state.next_id()}"})
+
+# --- GitHub and Jenkins -----------------------------------------------------------
+
+def json_with_etag(request: Request, route: str, payload: dict) -> Response:
+    """JSON with an ETag; a matching If-None-Match gets an empty 304, as GitHub answers."""
+    body = json.dumps(payload).encode()
+    etag = f'"{zlib.crc32(body):08x}"'
+    if request.headers.get("if-none-match") == etag:
+        state.counts[f"{route}:304"] += 1
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
+
+# Recent deployments, relative to the end of the conversation: (id, seconds before the end it
+# started, duration, conclusion). The newest one failed while the incident was being discussed.
+DEPLOYMENTS = [(1003, 1800, 600, "failure"), (1002, 7200, 400, "success"), (1001, 3 * 86400, 400, "success")]
+
+async def github_runs(request: Request):
+    limited = await admit(request, "github:runs")
+    if limited:
+        return limited
+    per_page = int(request.query_params.get("per_page") or 30)
+    runs = [
+        {"id": run_id, "name": "deploy", "run_number": run_id - 1000, "event": "push",
+         "status": "completed", "conclusion": conclusion, "head_sha": f"{zlib.crc32(str(run_id).encode()):08x}" * 5,
+         "created_at": iso(state.end - ago), "run_started_at": iso(state.end - ago), "updated_at": iso(state.end - ago + duration)}
+        for run_id, ago, duration, conclusion in DEPLOYMENTS
+    ][:per_page]
+    return json_with_etag(request, "github:runs", {"total_count": len(DEPLOYMENTS), "workflow_runs": runs})
+
+async def github_jobs(request: Request):
+    """A build and a test job that passed, and a deploy job whose last step (over the log's final third) failed if the run did."""
+    limited = await admit(request, "github:jobs")
+    if limited:
+        return limited
+    run_id = int(request.path_params["run"])
+    first_job = 2001 + 10 * (run_id - 1001)
+    conclusion = next((c for r, _, _, c in DEPLOYMENTS if r == run_id), "failure")
+    start, end = state.log_span
+    failed_from = end - (end - start) / 3
+    step = lambda number, name, began, ended, conclusion: {
+        "number": number, "name": name, "status": "completed", "conclusion": conclusion,
+        "started_at": iso(began), "completed_at": iso(ended),
+    }
+    jobs = [
+        {"id": first_job, "name": "build", "status": "completed", "conclusion": "success", "steps": [step(1, "Build", start, start + 1, "success")]},
+        {"id": first_job + 1, "name": "test", "status": "completed", "conclusion": "success", "steps": [step(1, "Test", start, start + 1, "success")]},
+        {"id": first_job + 2, "name": "deploy", "status": "completed", "conclusion": conclusion, "steps": [
+            step(1, "Checkout", start, start + 1, "success"),
+            step(2, "Run migrations", failed_from, end, conclusion),
+        ]},
+    ]
+    return json_with_etag(request, "github:jobs", {"total_count": len(jobs), "jobs": jobs})
+
+async def github_job_logs(request: Request):
+    limited = await admit(request, "github:logs")
+    if limited:
+        return limited
+    return Response(status_code=302, headers={"Location": f"{request.base_url}blob/deploy.log"})
+
+def read_log(start: int, end: int):
+    with open(state.log_path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(remaining, 64 * 1024))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+async def log_blob(request: Request):
+    """The blob store behind GitHub's log redirect: no latency or rate limits, honours `Range`."""
+    state.counts["blob"] += 1
+    size = state.log_size
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", request.headers.get("range", ""))
+    if not match:
+        return StreamingResponse(read_log(0, size), media_type="text/plain", headers={"Content-Length": str(size)})
+    first, last = match.groups()
+    if first:
+        start, end = int(first), min(int(last) + 1 if last else size, size)
+    else:
+        start, end = max(size - int(last or 0), 0), size
+    return StreamingResponse(
+        read_log(start, end), status_code=206, media_type="text/plain",
+        headers={"Content-Range": f"bytes {start}-{end - 1}/{size}", "Content-Length": str(end - start)},
+    )
+
+async def jenkins_job(request: Request):
+    limited = await admit(request, "jenkins:job")
+    if limited:
+        return limited
+    payload = {"name": request.path_params["job"], "lastBuild": {"number": 42}}
+    if "builds" in request.query_params.get("tree", ""):
+        payload["builds"] = [
+            {"number": run_id - 961, "timestamp": int((state.end - ago) * 1000), "duration": duration * 1000,
+             "result": conclusion.upper(), "building": False,
+             "actions": [{"lastBuiltRevision": {"SHA1": f"{zlib.crc32(str(run_id).encode()):08x}" * 5}}]}
+            for run_id, ago, duration, conclusion in DEPLOYMENTS
+        ]
+    return JSONResponse(payload)
+
+async def jenkins_log(request: Request):
+    limited = await admit(request, "jenkins:progressiveText")
+    if limited:
+        return limited
+    headers = {"X-Text-Size": str(state.log_size), "X-More-Data": "false"}
+    if request.method == "HEAD":
+        return Response(headers=headers, media_type="text/plain")
+    start = min(int(request.query_params.get("start") or 0), state.log_size)
+    return StreamingResponse(read_log(start, state.log_size), media_type="text/plain", headers=headers)
+
+# --- OpenAI ------------------------------------------------------------------------
+
+def postmortem_text(prompt: str) -> str:
+    match = PROMPT_USER.search(prompt)
+    cite = f"{match.group(2)}@{match.group(1)}" if match else "unknown@slack"
+    return (
+        "## 1. Summary\n"
+        f"A deploy of the payments service failed its readiness checks and was rolled back ({cite}).\n\n"
+        "## 2. Impact\n"
+        f"Checkout requests returned 502s for about 25 minutes; roughly 8% of traffic was affected ({cite}).\n\n"
+        "## 3. Timeline\n"
+        f"- 10:02 Deploy started from the release pipeline ({cite}).\n"
+        "- 10:09 Readiness probes began failing; the pager fired.\n"
+        "- 10:21 The deploy was rolled back.\n"
+        "- 10:27 Error rates returned to baseline.\n\n"
+        "## 4. Root Cause\n"
+        "A database migration held a lock that timed out new connections from the updated pods.\n\n"
+        "## 5. Remediations\n"
+        "- Rolled back the release and released the migration lock.\n\n"
+        "## 6. Follow-ups\n"
+        "- Run migrations in a separate pre-deploy step.\n"
+        "- Alert on readiness failures during canary.\n"
+    )
+
+def completion_text(messages: list) -> str:
+    system = next((m["content"] for m in messages if m["role"] == "system"), "")
+    prompt = "\n".join(m["content"] for m in messages)
+    if "log summarization" in system:
+        return "- ERROR Readiness probe failed: connection refused\n- psycopg2.OperationalError: connection timed out\n- Process completed with exit code 1"
+    return postmortem_text(prompt)
+
+async def openai_completions(request: Request):
+    limited = await admit(request, "openai:chat.completions")
+    if limited:
+        return limited
+    body = await request.json()
+    text = completion_text(body.get("messages", []))
+    prompt_tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(text) // 4, "total_tokens": prompt_tokens + len(text) // 4}
+    latency = state.config.llm_latency_ms / 1000
+    if not body.get("stream"):
+        await asyncio.sleep(latency)
+        return JSONResponse({
+            "id": "chatcmpl-fake", "object": "chat.completion", "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    async def events():
+        chunks = max(state.config.llm_chunks, 1)
+        size = math.ceil(len(text) / chunks)
+        for i in range(0, len(text), size):
+            await asyncio.sleep(latency / chunks)
+            chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": {"content": text[i:i + size]}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield f"data: {json.dumps({'id': 'chatcmpl-fake', 'choices': [], 'usage': usage})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+def embedding(text: str, dimensions: int) -> list:
+    """Hashed bag of words: deterministic, and texts sharing words get a positive cosine."""
+    vector = [0.0] * dimensions
+    for word in re.findall(r"\w+", text.lower()):
+        bucket = zlib.crc32(word.encode())
+        vector[bucket % dimensions] += 1.0 if bucket & 0x80000000 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+async def openai_embeddings(request: Request):
+    limited = await admit(request, "openai:embeddings")
+    if limited:
+        return limited
+    body = await request.json()
+    texts = body.get("input", [])
+    texts = [texts] if isinstance(texts, str) else texts
+    dimensions = body.get("dimensions") or 1536
+    tokens = sum(len(text) for text in texts) // 4
+    return JSONResponse({
+        "object": "list", "model": body.get("model"),
+        "data": [{"object": "embedding", "index": i, "embedding": embedding(text, dimensions)} for i, text in enumerate(texts)],
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    })
+
+# --- control -------------------------------------------------------------------------
+
+async def configure(request: Request):
+    state.configure(await request.json())
+    return JSONResponse(asdict(state.config))
+
+async def stats(request: Request):
+    return JSONResponse({"requests": dict(state.counts), "rate_limited": dict(state.rate_limited)})
+
+async def health(request: Request):
+    return JSONResponse({"ok": True})
+
+def create_app() -> Starlette:
+    state.configure({})
+    return Starlette(routes=[
+        Route("/_config", configure, methods=["POST"]),
+        Route("/_stats", stats),
+        Route("/_health", health),
+        Route("/slack/api/{method}", slack_method, methods=["GET", "POST"]),
+        Route("/discord/api/v10/channels/{channel}/messages", discord_messages, methods=["GET", "POST"]),
+        Route("/discord/api/v10/channels/{channel}/messages/{message}", discord_message, methods=["PATCH"]),
+        Route("/discord/api/v10/users/{user}", discord_user_info),
+        Route("/graph/v1.0/teams/{team}/channels/{channel}/messages", graph_messages, methods=["GET", "POST"]),
+        Route("/graph/v1.0/teams/{team}/channels/{channel}/messages/delta", graph_delta),
+        Route("/graph/v1.0/teams/{team}/channels/{channel}/messages/{message}", graph_message, methods=["PATCH"]),
+        Route("/graph/v1.0/teams/{team}/channels/{channel}/messages/{message}/replies", graph_replies, methods=["GET", "POST"]),
+        Route("/graph/v1.0/teams/{team}/channels/{channel}/messages/{message}/replies/{reply}", graph_message, methods=["PATCH"]),
+        Route("/graph/v1.0/users/{user}", graph_user),
+        Route("/graph/v1.0/$batch", graph_batch, methods=["POST"]),
+        Route("/login/{tenant}/oauth2/v2.0/token", login_token, methods=["POST"]),
+        Route("/github/repos/{owner}/{repo}/actions/runs", github_runs),
+        Route("/github/repos/{owner}/{repo}/actions/runs/{run}/jobs", github_jobs),
+        Route("/github/repos/{owner}/{repo}/actions/jobs/{job}/logs", github_job_logs),
+        Route("/blob/deploy.log", log_blob),
+        Route("/jenkins/job/{job}/api/json", jenkins_job),
+        Route("/jenkins/job/{job}/{build}/logText/progressiveText", jenkins_log),
+        Route("/openai/v1/chat/completions", openai_completions, methods=["POST"]),
+        Route("/openai/v1/embeddings", openai_embeddings, methods=["POST"]),
+    ])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    uvicorn.run(create_app(), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from src.app.core.config import settings
+from src.llm.client import ModelClient
+
+router = APIRouter()
+
+def require_index():
+    if not settings.INCIDENT_INDEX_ENABLED:
+        raise HTTPException(status_code=503, detail="The incident index is disabled on this server")
+
+def _index():
+    from src.llm.incident_index import incident_index
+
+    return incident_index
+
+async def _search(vector, k: int, exclude: str = None) -> dict:
+    index = _index()
+    started = time.perf_counter()
+    results = await asyncio.to_thread(index.search, vector, k, exclude)
+    search_ms = round((time.perf_counter() - started) * 1000, 2)
+    return {"mode": index.mode, "search_ms": search_ms, "results": index.describe(results)}
+
+@router.get("/incidents/similar", dependencies=[Depends(require_index)])
+async def search_similar_incidents(q: str = Query(..., min_length=1), k: int = Query(5, ge=1, le=100)):
+    [vector] = await _index().embed([q], ModelClient.select())
+    return await _search(vector, k)
+
+@router.get("/incidents/{incident_id}/similar", dependencies=[Depends(require_index)])
+async def get_similar_incidents(incident_id: str, k: int = Query(5, ge=1, le=100)):
+    vector = await asyncio.to_thread(_index().vector, incident_id)
+    if vector is None:
+        raise HTTPException(status_code=404, detail="Incident not found in the index")
+    return await _search(vector, k, exclude=incident_id)
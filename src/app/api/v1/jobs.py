@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException
+
+from src.app.core.config import settings
+from src.app.core.jobs import job_store
+
+router = APIRouter()
+
+@router.get("/jobs/queue")
+async def get_queue():
+    """Admission state for autoscaling: waiting and running jobs against this process's limits."""
+    return {**job_store.queue_stats(), "workers": settings.JOB_WORKERS, "max_queued": settings.JOB_MAX_QUEUED}
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    queued_seconds = None
+    if job["started_at"]:
+        queued_seconds = round(job["started_at"] - job["created_at"], 3)
+    run_seconds = None
+    if job["started_at"] and job["finished_at"]:
+        run_seconds = round(job["finished_at"] - job["started_at"], 3)
+
+    return {
+        "id": job["id"],
+        "platform": job["platform"],
+        "channel_id": job["channel_id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "attempts": job["attempts"],
+        "error": job["error"],
+        "incident_id": job["incident_id"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "queued_seconds": queued_seconds,
+        "run_seconds": run_seconds,
+        "stages": job["stages"],
+        "usage": job["usage"],
+        "coalesced_triggers": job["coalesced"],
+        "priority": job["priority"],
+        "queue_position": job_store.queue_position(job["id"]) if job["status"] == "queued" else None,
+    }
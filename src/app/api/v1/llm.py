@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+from src.llm.cache import llm_cache
+from src.llm.pipeline import synthesis_stats
+
+router = APIRouter()
+
+@router.get("/llm/cache")
+async def get_llm_cache_stats():
+    return llm_cache.stats()
+
+@router.get("/llm/synthesis")
+async def get_synthesis_stats():
+    return synthesis_stats.snapshot()
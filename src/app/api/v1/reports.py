@@ -1,194 +1,110 @@
-from datetime import datetime
-from typing import List, Optional
-import uuid
+import time
+from typing import Dict, Optional
 
-from fastapi import APIRouter, Request, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import PlainTextResponse, JSONResponse
 
-from src.app.core.models import Incident, Message
+from src.app.core.config import settings
+from src.app.core.metrics import metrics
+from src.app.core.jobs import QueueFull
+from src.app.core.worker import enqueue_postmortem
+from src.ingestion.orchestrator import IngestionRequest
 from src.ingestion.parsers import slack_parser, discord_parser, teams_parser
-from src.ingestion.connectors.slack_connector import (
-    verify_slack_signature,
-    retrieve_slack_chat_history,
-    retrieve_slack_user_name,
-    send_slack_message,
-)
-from src.ingestion.connectors.discord_connector import (
-    verify_discord_signature,
-    retrieve_discord_chat_history,
-    retrieve_discord_user_name,
-    send_discord_message,
-)
-from src.ingestion.connectors.teams_connector import (
-    verify_teams_request,
-    retrieve_teams_chat_history,
-    retrieve_teams_user_name,
-    send_teams_message,
-)
-from src.ingestion.connectors.github_connector import get_latest_github_action_logs
-from src.ingestion.connectors.jenkins_connector import get_latest_jenkins_build_log
-from src.llm.pipeline import PostmortemAgent
+from src.ingestion.connectors.slack_connector import verify_slack_signature
+from src.ingestion.connectors.discord_connector import verify_discord_signature
+from src.ingestion.connectors.teams_connector import verify_teams_request
 
 router = APIRouter()
 
-async def generate_and_send_postmortem(incident: Incident):
-    agent = PostmortemAgent()
-    postmortem = agent.run(incident)
-
-    if incident.source == "slack":
-        await send_slack_message(incident.channel_id, f"*Postmortem for incident `{incident.incident_id}`:*\n\n{postmortem}")
-    elif incident.source == "discord":
-        await send_discord_message(incident.channel_id, f"**Postmortem for incident `{incident.incident_id}`**\n\n{postmortem}")
-    elif incident.source == "teams":
-        await send_teams_message(incident.channel_id, f"**Postmortem for incident `{incident.incident_id}`**\n\n{postmortem}")
-    else:
-        print("Unknown incident source; no outbound message sent.")
-
-async def fetch_all_deployment_logs() -> Optional[str]:
-    log_parts = []
-    
-    print("Fetching deployment logs...")
-    github_logs = await get_latest_github_action_logs()
-    if github_logs:
-        print(f"Successfully fetched {len(github_logs)} chars from GitHub.")
-        log_parts.append(f"--- GITHUB ACTION LOGS ---\n{github_logs}")
-
-    jenkins_logs = await get_latest_jenkins_build_log()
-    if jenkins_logs:
-        print(f"Successfully fetched {len(jenkins_logs)} chars from Jenkins.")
-        log_parts.append(f"--- JENKINS BUILD LOGS ---\n{jenkins_logs}")
-
-    if not log_parts:
-        print("No deployment logs fetched.")
-        return None
-        
-    return "\n\n".join(log_parts)
-
-@router.post("/slack")
-async def handle_slack_command(request: Request, background_tasks: BackgroundTasks):
+def describe_trigger(job_id: str, existing: Optional[Dict], started: str, position: int = 0) -> str:
+    """Reply text; ends with the job id so clients can pick it up."""
+    if existing is None and position:
+        return f"All postmortem workers are busy: queued at position {position}, it starts when one frees up. job `{job_id}`"
+    if existing is None:
+        return f"{started} job `{job_id}`"
+    if existing["status"] == "done":
+        ago = int(time.time() - (existing["finished_at"] or time.time()))
+        return f"A postmortem for this channel was posted {ago}s ago (use `refresh` to regenerate). job `{job_id}`"
+    return f"A postmortem for this channel is already being generated. job `{job_id}`"
+
+def describe_rejection(e: QueueFull) -> str:
+    return f"Too many postmortems are being generated right now ({e.queued} queued). Please try again in a few minutes."
+
+def require_configured(platform: str):
+    def check():
+        if platform not in settings.configured_platforms():
+            raise HTTPException(status_code=503, detail=f"{platform} is not configured on this server")
+    return check
+
+@router.post("/slack", dependencies=[Depends(require_configured("slack"))])
+async def handle_slack_command(request: Request):
     body: bytes = await request.body()
-    verify_slack_signature(request, body)
+    with metrics.stage("signature_check", platform="slack"):
+        verify_slack_signature(request, body)
     payload = slack_parser.parse_slash_payload(body)
 
-    channel_id = payload.get("channel_id")
-    user_id = payload.get("user_id")
-    user_name = await retrieve_slack_user_name(user_id)
-    channel_name = payload.get("channel_name")
-
-    messages= await retrieve_slack_chat_history(channel_id)
-    conversation: List[Message] = []
-    for msg in messages:
-        conversation.append(
-            Message(
-                user_id=msg.get("user","unknown"),
-                username=await retrieve_slack_user_name(msg.get("user")) or "Unknown",
-                text=msg.get("text",""),
-                timestamp=datetime.fromtimestamp(float(msg.get("ts", 0))),
-                source="slack"
-            )
-        )
-    
-    deployment_logs = await fetch_all_deployment_logs()
-
-    incident = Incident(
-        incident_id=str(uuid.uuid4()),
-        channel_id=channel_id,
-        triggered_by_user_id=user_id,
-        triggered_by_user_name=user_name,
-        channel_name=channel_name,
-        conversation=conversation,
-        deployment_logs=deployment_logs,
-        source="slack",
-        trigger_platform="slack_slash"
-    )
-
-    background_tasks.add_task(generate_and_send_postmortem, incident)
-    return PlainTextResponse("Generating postmortem (including deployment logs)...", status_code=200)
-
-@router.post("/discord")
-async def handle_discord_interaction(request: Request, background_tasks: BackgroundTasks):
+    try:
+        job_id, existing, position = enqueue_postmortem(IngestionRequest(
+            platform="slack",
+            channel_id=payload.get("channel_id"),
+            user_id=payload.get("user_id"),
+            channel_name=payload.get("channel_name"),
+            trigger_platform="slack_slash",
+        ), refresh=slack_parser.wants_refresh(payload), severity=slack_parser.severity(payload))
+    except QueueFull as e:
+        return PlainTextResponse(describe_rejection(e), status_code=200)
+
+    return PlainTextResponse(describe_trigger(job_id, existing, "Generating postmortem (including deployment logs)...", position), status_code=200)
+
+@router.post("/discord", dependencies=[Depends(require_configured("discord"))])
+async def handle_discord_interaction(request: Request):
     body: bytes = await request.body()
 
-    verify_discord_signature(request, body)
+    with metrics.stage("signature_check", platform="discord"):
+        verify_discord_signature(request, body)
 
     payload = await request.json()
     parsed = discord_parser.parse_interaction_payload(payload)
 
-    channel_id = parsed.get("channel_id")
-    user_id = parsed.get("user_id")
-    user_name = await retrieve_discord_user_name(user_id)
-    channel_name = parsed.get("channel_name")
-
-    messages = await retrieve_discord_chat_history(channel_id)
-    conversation: List[Message] = []
-    for msg in messages:
-        conversation.append(
-            Message(
-                user_id=msg.get("author", {}).get("id", "unknown"),
-                username=msg.get("author", {}).get("username") or "Unknown",
-                text=msg.get("content", ""),
-                timestamp=datetime.fromtimestamp(float(msg.get("timestamp", datetime.utcnow().timestamp()))),
-                source="discord"
-            )
-        )
-
-    deployment_logs = await fetch_all_deployment_logs()
-
-    incident = Incident(
-        incident_id=str(uuid.uuid4()),
-        channel_id=channel_id,
-        triggered_by_user_id=user_id,
-        triggered_by_user_name=user_name,
-        channel_name=channel_name,
-        conversation=conversation,
-        deployment_logs=deployment_logs,
-        source="discord",
-        trigger_platform=parsed.get("trigger_platform", "discord_interaction")
-    )
-
-    background_tasks.add_task(generate_and_send_postmortem, incident)
-    return JSONResponse({"type": 200, "message": "Postmortem generation (including deployment logs) started."})
-
-@router.post("/teams")
-async def handle_teams_trigger(request: Request, background_tasks: BackgroundTasks):
+    try:
+        job_id, existing, position = enqueue_postmortem(IngestionRequest(
+            platform="discord",
+            channel_id=parsed.get("channel_id"),
+            user_id=parsed.get("user_id"),
+            channel_name=parsed.get("channel_name"),
+            trigger_platform=parsed.get("trigger_platform", "discord_interaction"),
+        ), refresh=parsed.get("refresh", False), severity=parsed.get("severity"))
+    except QueueFull as e:
+        return JSONResponse({"type": 200, "message": describe_rejection(e), "job_id": None, "rejected": True})
+
+    if existing is None and not position:
+        message = "Postmortem generation (including deployment logs) started."
+    else:
+        message = describe_trigger(job_id, existing, "", position)
+    return JSONResponse({
+        "type": 200, "message": message, "job_id": job_id, "coalesced": existing is not None, "queue_position": position or None,
+    })
+
+@router.post("/teams", dependencies=[Depends(require_configured("teams"))])
+async def handle_teams_trigger(request: Request):
     body: bytes = await request.body()
     json_payload = await request.json()
 
-    verify_teams_request(request, body)
+    with metrics.stage("signature_check", platform="teams"):
+        verify_teams_request(request, body)
 
     parsed = teams_parser.parse_trigger_payload(json_payload)
-    channel_id = parsed.get("channel_id")
-    user_id = parsed.get("user_id")
-    user_name = await retrieve_teams_user_name(user_id)
-    channel_name = parsed.get("channel_name")
-    trigger_platform = parsed.get("trigger_platform", "teams_webhook")
-
-    messages = await retrieve_teams_chat_history(channel_id)
-    conversation: List[Message] = []
-    for msg in messages:
-        conversation.append(
-            Message(
-                user_id=msg.get("from", {}).get("user", {}).get("id", "unknown"),
-                username=msg.get("from", {}).get("user", {}).get("displayName") or "Unknown",
-                text=msg.get("body", {}).get("content", ""),
-                timestamp=datetime.fromtimestamp(float(msg.get("createdDateTime", datetime.utcnow().timestamp()))),
-                source="teams"
-            )
-        )
-
-    deployment_logs = await fetch_all_deployment_logs()
-
-    incident = Incident(
-        incident_id=str(uuid.uuid4()),
-        channel_id=channel_id,
-        triggered_by_user_id=user_id,
-        triggered_by_user_name=user_name,
-        channel_name=channel_name,
-        conversation=conversation,
-        deployment_logs=deployment_logs,
-        source="teams",
-        trigger_platform=trigger_platform
-    )
-
-    background_tasks.add_task(generate_and_send_postmortem, incident)
-    return PlainTextResponse("Generating postmortem...", status_code=200)
\ No newline at end of file
+    try:
+        job_id, existing, position = enqueue_postmortem(IngestionRequest(
+            platform="teams",
+            channel_id=parsed.get("channel_id"),
+            user_id=parsed.get("user_id"),
+            channel_name=parsed.get("channel_name"),
+            trigger_platform=parsed.get("trigger_platform", "teams_webhook"),
+        ), refresh=parsed.get("refresh", False), severity=parsed.get("severity"))
+    except QueueFull as e:
+        return PlainTextResponse(describe_rejection(e), status_code=200)
+
+    if existing is None and not position:
+        return PlainTextResponse(f"Generating postmortem... job {job_id}", status_code=200)
+    return PlainTextResponse(describe_trigger(job_id, existing, "", position), status_code=200)
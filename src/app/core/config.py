@@ -2,18 +2,19 @@ from pydantic_settings import BaseSettings
 from typing import Optional
 
 class Settings(BaseSettings):
-    SLACK_TOKEN: str
-    SLACK_SIGNING_SECRET: str
-    OPENAI_API_KEY: str
+    # Platform credentials are optional: a platform without them is simply not initialized.
+    SLACK_TOKEN: Optional[str] = None
+    SLACK_SIGNING_SECRET: Optional[str] = None
+    OPENAI_API_KEY: Optional[str] = None
     CORS_ORIGINS: list[str] = ["*"]
     ENV: str = "development"
 
-    DISCORD_TOKEN: str
-    DISCORD_PUBLIC_KEY: str
-    TEAMS_CLIENT_ID: str
-    TEAMS_CLIENT_SECRET: str
-    TEAMS_TENANT_ID: str
-    TEAMS_GRAPH_TOKEN: str
+    DISCORD_TOKEN: Optional[str] = None
+    DISCORD_PUBLIC_KEY: Optional[str] = None
+    TEAMS_CLIENT_ID: Optional[str] = None
+    TEAMS_CLIENT_SECRET: Optional[str] = None
+    TEAMS_TENANT_ID: Optional[str] = None
+    TEAMS_GRAPH_TOKEN: Optional[str] = None
 
     GITHUB_TOKEN: Optional[str] = None
     GITHUB_REPO: Optional[str] = None
@@ -22,7 +23,194 @@ class Settings(BaseSettings):
     JENKINS_TOKEN: Optional[str] = None
     JENKINS_JOB_NAME: Optional[str] = None
 
+    USER_DIRECTORY_TTL_SECONDS: int = 3600
+    USER_DIRECTORY_MAX_ENTRIES: int = 50000
+    USER_DIRECTORY_CONCURRENCY: int = 8
+
+    HTTP_TIMEOUT_SECONDS: float = 30.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    HTTP_PLATFORM_TIMEOUTS: dict[str, float] = {"github": 120.0, "jenkins": 120.0}
+    HTTP_MAX_CONNECTIONS: int = 50
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    HTTP2_ENABLED: bool = True
+    # API roots; overridable to point the connectors at a proxy or local stand-ins.
+    SLACK_API_URL: str = "https://slack.com/api"
+    DISCORD_API_URL: str = "https://discord.com/api/v10"
+    GRAPH_API_URL: str = "https://graph.microsoft.com/v1.0"
+    GRAPH_LOGIN_URL: str = "https://login.microsoftonline.com"
+    GITHUB_API_URL: str = "https://api.github.com"
+
+    # Outbound budgets as [requests per second, burst]: "platform" for all of its traffic, "platform:family"
+    # for one route family on top (Slack: the Web API method; others: HTTP method and path, ids elided,
+    # metered per channel). Retry-After and X-RateLimit-* headers close buckets further. OpenAI has its own limiter.
+    HTTP_RATE_LIMIT_ENABLED: bool = True
+    HTTP_RATE_LIMITS: dict[str, list[float]] = {
+        "slack:conversations.history": [0.8, 5],
+        "slack:conversations.replies": [0.8, 5],
+        "slack:users.list": [0.3, 2],
+        "slack:users.info": [1.6, 10],
+        "slack:chat.postMessage": [1.0, 3],
+        "slack:chat.update": [0.8, 5],
+        "discord": [50, 50],
+        "discord:POST channels/{id}/messages": [1.0, 5],
+        "discord:PATCH channels/{id}/messages/{id}": [1.0, 5],
+        "teams": [15, 30],
+        "teams:POST teams/{id}/channels/{id}/messages": [1.0, 4],
+        "teams:POST teams/{id}/channels/{id}/messages/{id}/replies": [1.0, 4],
+        "github": [1.4, 100],
+    }
+    HTTP_RATE_LIMIT_MAX_RETRIES: int = 3
+    HTTP_RATE_LIMIT_MAX_WAIT_SECONDS: float = 60.0
+
+    INGESTION_DEADLINE_SECONDS: float = 25.0
+    INGESTION_SOURCE_DEADLINE_SECONDS: float = 20.0
+    INGESTION_SOURCE_DEADLINES: dict[str, float] = {"trigger_user": 5.0}
+
+    INCIDENT_LOOKBACK_HOURS: float = 24.0
+    HISTORY_PAGE_SIZE: int = 200
+    HISTORY_MAX_MESSAGES: int = 50000
+
+    MESSAGE_STORE_PATH: str = "data/messages.sqlite3"
+    MESSAGE_STORE_OVERLAP_SECONDS: float = 900.0
+
+    # Teams uses client-credential tokens when TEAMS_CLIENT_ID/SECRET/TENANT_ID are set (else TEAMS_GRAPH_TOKEN),
+    # renewed in the background this long before they expire.
+    TEAMS_TOKEN_REFRESH_MARGIN_SECONDS: float = 300.0
+    # Read Teams channels with Graph delta queries; the deltaLink is the channel's message-store mark,
+    # so a repeat trigger only transfers what changed.
+    TEAMS_DELTA_ENABLED: bool = True
+    # Read the thread replies of the root messages each read returns, 20 threads per Graph $batch.
+    TEAMS_FETCH_REPLIES: bool = True
+
+    LOG_EXTRACT_MODE: str = "tail"
+    LOG_TAIL_BYTES: int = 2_000_000
+    LOG_WINDOW_PADDING_SECONDS: float = 3600.0
+    LOG_SPOOL_THRESHOLD_BYTES: int = 4_000_000
+    LOG_PROMPT_MAX_CHARS: int = 2_000_000
+    JENKINS_LOG_FOLLOW_SECONDS: float = 0.0
+
+    # Job lists and logs of completed GitHub Actions runs never change: they are kept on disk and
+    # served from there. Other GitHub API responses are revalidated with If-None-Match.
+    GITHUB_CACHE_ENABLED: bool = True
+    GITHUB_CACHE_PATH: str = "data/github"
+    GITHUB_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+    # Logs fetched per run: failed or cancelled jobs when there are any, otherwise every job.
+    GITHUB_MAX_JOB_LOGS: int = 6
+    # Of a failed job, read from this long before its first failing step.
+    GITHUB_FAILED_STEP_CONTEXT_SECONDS: float = 120.0
+
+    # Recent GitHub Actions runs and Jenkins builds are polled in the background into an in-memory
+    # index, so a trigger picks the deployments that overlap or precede its window with no metadata calls.
+    DEPLOYMENT_POLLER_ENABLED: bool = True
+    DEPLOYMENT_POLL_INTERVAL_SECONDS: float = 60.0
+    # Newest runs / builds kept per provider.
+    DEPLOYMENT_INDEX_SIZE: int = 30
+    # Logs fetched per provider and incident: the newest deployments overlapping the window,
+    # or the last one before it.
+    DEPLOYMENT_MAX_PER_INCIDENT: int = 2
+
+    LOG_REDUCER_ENABLED: bool = True
+    LOG_REDUCER_CONTEXT_BEFORE: int = 3
+    LOG_REDUCER_CONTEXT_AFTER: int = 3
+    LOG_REDUCER_MAX_WINDOWS: int = 10
+    LOG_REDUCER_MAX_WINDOW_LINES: int = 30
+    LOG_REDUCER_MAX_TEMPLATES: int = 25
+    LOG_REDUCER_SIMILARITY: float = 0.5
+    # Rendered digest size, capped at the pipeline's 10,000 char LOG_LENGTH_LIMIT.
+    LOG_DIGEST_MAX_CHARS: int = 9_500
+
+    # LLM summarization of oversized logs; only used with LOG_REDUCER_ENABLED=false.
+    LOG_SUMMARY_MODE: str = "map_reduce"
+    LOG_SUMMARY_CHUNK_TOKENS: int = 6000
+    LOG_SUMMARY_CONCURRENCY: int = 4
+    LOG_SUMMARY_FALLBACK_LINES: int = 40
+
+    CONTEXT_TOKEN_BUDGET: int = 24000
+    # Share of CONTEXT_TOKEN_BUDGET per prompt section; whatever a section leaves unused goes to the others.
+    CONTEXT_SECTION_SHARES: dict[str, float] = {"metadata": 0.05, "conversation": 0.6, "deployment_logs": 0.35}
+    CONTEXT_RECENT_WINDOW_SECONDS: float = 3600.0
+    CONTEXT_PASTE_MIN_CHARS: int = 40
+    CONTEXT_MESSAGE_MAX_TOKENS: int = 1000
+
+    # "direct": one completion plus a repair call only if local validation fails; "agent": the ReAct agent loop.
+    SYNTHESIS_MODE: str = "direct"
+    SYNTHESIS_REPAIR_ATTEMPTS: int = 1
+
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"
+    # Process-wide limits shared by every concurrent postmortem; LLM_TOKENS_PER_MINUTE <= 0 disables the limiter.
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_TOKENS_PER_MINUTE: int = 300_000
+    # Completion size assumed when reserving rate-limit tokens, corrected by the reported usage.
+    LLM_EXPECTED_OUTPUT_TOKENS: int = 1500
+    LLM_REQUEST_TIMEOUT_SECONDS: float = 120.0
+    LLM_MAX_RETRIES: int = 5
+    LLM_BACKOFF_BASE_SECONDS: float = 1.0
+    LLM_BACKOFF_MAX_SECONDS: float = 60.0
+
+    LLM_CACHE_PATH: str = "data/llm_cache.sqlite3"
+    LLM_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    LLM_CACHE_TTL_SECONDS: float = 7 * 24 * 3600.0
+    # Pipeline stages whose model calls are served from the cache; empty disables it.
+    LLM_CACHE_STAGES: list[str] = ["log_summary", "repair"]
+
+    # Finished postmortems are embedded into a local index; the closest past incidents are shown
+    # to the model as reference and served by /api/v1/incidents/similar.
+    INCIDENT_INDEX_ENABLED: bool = True
+    INCIDENT_INDEX_PATH: str = "data/incidents.sqlite3"
+    INCIDENT_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    INCIDENT_EMBEDDING_DIMENSIONS: int = 256
+    INCIDENT_EMBEDDING_MAX_TOKENS: int = 2000
+    INCIDENT_SIMILAR_TOP_K: int = 3
+    INCIDENT_SIMILAR_MIN_SCORE: float = 0.3
+    # Past this many incidents, search scores only the INCIDENT_INDEX_NPROBE closest k-means lists.
+    INCIDENT_INDEX_IVF_THRESHOLD: int = 20000
+    INCIDENT_INDEX_NPROBE: int = 32
+
+    # Post a placeholder and edit it while the postmortem streams in, instead of one message at the end.
+    DELIVERY_STREAMING: bool = True
+    DELIVERY_EDIT_INTERVAL_SECONDS: float = 1.5
+    DELIVERY_EDIT_MAX_PENDING_CHARS: int = 600
+    # Characters per message before continuing in a thread reply.
+    DELIVERY_MESSAGE_LIMITS: dict[str, int] = {"slack": 3900, "discord": 2000, "teams": 24000}
+
+    JOB_DB_PATH: str = "data/jobs.sqlite3"
+    JOB_WORKERS: int = 2
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+    JOB_MAX_ATTEMPTS: int = 3
+    # Triggers for a channel with a job in flight, or one finished this recently, attach to that
+    # job instead of starting another (unless the trigger asks for a refresh). 0 coalesces in-flight only.
+    JOB_COALESCE_ENABLED: bool = True
+    JOB_COALESCE_WINDOW_SECONDS: float = 300.0
+    # Admission control: JOB_WORKERS bounds concurrent generations; waiting jobs are claimed by priority
+    # (lower first), then age. A job's priority is the trigger's severity ("sev1", "p0"; JOB_DEFAULT_PRIORITY
+    # without one), or its channel's entry in JOB_CHANNEL_PRIORITIES ("platform:channel_id" or channel name)
+    # when that is lower. Triggers beyond JOB_MAX_QUEUED waiting jobs are turned away (0: no limit).
+    JOB_DEFAULT_PRIORITY: int = 3
+    JOB_CHANNEL_PRIORITIES: dict[str, int] = {}
+    JOB_MAX_QUEUED: int = 50
+
+    # Prometheus text on /metrics; when off, every instrumentation point is a no-op.
+    METRICS_ENABLED: bool = True
+    # Also wrap pipeline stages in OpenTelemetry spans (needs opentelemetry-api plus a configured SDK).
+    METRICS_OTEL_ENABLED: bool = False
+
+    # Load the LangChain agent and tokenizer in a background task right after startup.
+    STARTUP_WARMUP: bool = True
+
     class Config:
         env_file = ".env"
 
+    def configured_platforms(self) -> list[str]:
+        """Platforms with credentials set; only these get HTTP clients and accept webhooks."""
+        configured = {
+            "slack": bool(self.SLACK_TOKEN),
+            "discord": bool(self.DISCORD_TOKEN),
+            "teams": bool(self.TEAMS_GRAPH_TOKEN or (self.TEAMS_CLIENT_ID and self.TEAMS_CLIENT_SECRET and self.TEAMS_TENANT_ID)),
+            "github": bool(self.GITHUB_TOKEN and self.GITHUB_REPO),
+            "jenkins": bool(self.JENKINS_URL),
+            "openai": bool(self.OPENAI_API_KEY),
+        }
+        return [platform for platform, ok in configured.items() if ok]
+
 settings = Settings()
\ No newline at end of file
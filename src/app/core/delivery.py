@@ -0,0 +1,156 @@
+import time
+from typing import List, Optional
+
+from src.app.core.config import settings
+from src.app.core.models import Incident
+from src.ingestion.connectors.rate_limit import PRIORITY_INTERACTIVE, outbound_priority
+from src.ingestion.connectors.slack_connector import send_slack_message, update_slack_message
+from src.ingestion.connectors.discord_connector import send_discord_message, edit_discord_message
+from src.ingestion.connectors.teams_connector import send_teams_message, update_teams_message
+
+STREAMING_CURSOR = " …"
+
+def postmortem_header(incident: Incident) -> str:
+    if incident.source == "slack":
+        return f"*Postmortem for incident `{incident.incident_id}`:*\n\n"
+    return f"**Postmortem for incident `{incident.incident_id}`**\n\n"
+
+async def send_postmortem(incident: Incident, postmortem: str):
+    with outbound_priority(PRIORITY_INTERACTIVE):
+        await _send_postmortem(incident, postmortem)
+
+async def _send_postmortem(incident: Incident, postmortem: str):
+    if incident.source == "slack":
+        await send_slack_message(incident.channel_id, f"{postmortem_header(incident)}{postmortem}")
+    elif incident.source == "discord":
+        await send_discord_message(incident.channel_id, f"{postmortem_header(incident)}{postmortem}")
+    elif incident.source == "teams":
+        await send_teams_message(incident.channel_id, f"{postmortem_header(incident)}{postmortem}")
+    else:
+        print("Unknown incident source; no outbound message sent.")
+
+def split_message(text: str, limit: int) -> List[str]:
+    """Split `text` into parts of at most `limit` chars, preferring line then word boundaries."""
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut < limit // 2:
+            cut = text.rfind(" ", 0, limit)
+        if cut < limit // 2:
+            cut = limit
+        parts.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    parts.append(text)
+    return parts
+
+class PlatformMessages:
+    """Post/edit primitives for one channel. Continuations go in the first message's thread."""
+
+    def __init__(self, platform: str, channel_id: str):
+        self.platform = platform
+        self.channel_id = channel_id
+        self.limit = settings.DELIVERY_MESSAGE_LIMITS.get(platform, 2000)
+        self.root: Optional[str] = None
+
+    async def post(self, text: str) -> str:
+        with outbound_priority(PRIORITY_INTERACTIVE):
+            return await self._post(text)
+
+    async def _post(self, text: str) -> str:
+        if self.platform == "slack":
+            message_id = await send_slack_message(self.channel_id, text, thread_ts=self.root)
+        elif self.platform == "discord":
+            message_id = (await send_discord_message(self.channel_id, text, reply_to=self.root))["id"]
+        else:
+            message_id = (await send_teams_message(self.channel_id, text, reply_to=self.root))["id"]
+        if self.root is None:
+            self.root = message_id
+        return message_id
+
+    async def edit(self, message_id: str, text: str):
+        with outbound_priority(PRIORITY_INTERACTIVE):
+            await self._edit(message_id, text)
+
+    async def _edit(self, message_id: str, text: str):
+        if self.platform == "slack":
+            await update_slack_message(self.channel_id, message_id, text)
+        elif self.platform == "discord":
+            await edit_discord_message(self.channel_id, message_id, text)
+        else:
+            reply_to = self.root if message_id != self.root else None
+            await update_teams_message(self.channel_id, message_id, text, reply_to=reply_to)
+
+class StreamingMessage:
+    """
+    A postmortem delivered while it is generated: a placeholder is posted right away,
+    then edited as text arrives. Edits are coalesced to at most one per
+    DELIVERY_EDIT_INTERVAL_SECONDS (sooner once DELIVERY_EDIT_MAX_PENDING_CHARS are
+    waiting), and text past the platform's length limit continues in thread replies.
+    """
+
+    def __init__(self, incident: Incident):
+        self.header = postmortem_header(incident)
+        self.messages = PlatformMessages(incident.source, incident.channel_id)
+        self.ids: List[str] = []
+        self.shown: List[str] = []
+        self.text = ""
+        self.pending = 0
+        self.last_edit = 0.0
+        self.edits = 0
+        self.started = 0.0
+        # Seconds from the placeholder to the first edit that showed generated text.
+        self.first_content_seconds: Optional[float] = None
+
+    async def start(self):
+        self.started = time.monotonic()
+        placeholder = f"{self.header}_Generating postmortem…_"
+        self.ids.append(await self.messages.post(placeholder))
+        self.shown.append(placeholder)
+        self.last_edit = time.monotonic()
+
+    async def append(self, delta: str):
+        self.text += delta
+        self.pending += len(delta)
+        elapsed = time.monotonic() - self.last_edit
+        interval = settings.DELIVERY_EDIT_INTERVAL_SECONDS
+        if elapsed >= interval or (self.pending >= settings.DELIVERY_EDIT_MAX_PENDING_CHARS and elapsed >= interval / 3):
+            try:
+                await self._render(self.text, streaming=True)
+            except Exception as e:
+                # A failed intermediate edit only delays the preview; `finish` delivers the full text.
+                print(f"Failed to update the streaming postmortem: {e}")
+                self.last_edit = time.monotonic()
+
+    async def finish(self, text: str):
+        """Replace whatever was streamed with the final (validated, possibly repaired) text."""
+        await self._render(text, streaming=False)
+
+    async def fail(self, error: str):
+        try:
+            await self.messages.edit(self.ids[0], f"{self.header}_Postmortem generation failed: {error}_")
+        except Exception as e:
+            print(f"Failed to report the postmortem failure: {e}")
+
+    async def _render(self, text: str, streaming: bool):
+        limit = self.messages.limit
+        body = f"{self.header}{text}{STREAMING_CURSOR if streaming else ''}"
+        # Cuts depend only on the text before them, so full earlier parts stay unchanged while streaming.
+        parts = split_message(body, limit)
+        for i, part in enumerate(parts):
+            if i < len(self.ids):
+                if self.shown[i] != part:
+                    await self.messages.edit(self.ids[i], part)
+                    self.shown[i] = part
+                    self.edits += 1
+            else:
+                self.ids.append(await self.messages.post(part))
+                self.shown.append(part)
+        for i in range(len(parts), len(self.ids)):
+            # A shorter final text leaves trailing continuations with nothing to show.
+            if self.shown[i] != "…":
+                await self.messages.edit(self.ids[i], "…")
+                self.shown[i] = "…"
+        if text and self.first_content_seconds is None:
+            self.first_content_seconds = time.monotonic() - self.started
+        self.pending = 0
+        self.last_edit = time.monotonic()
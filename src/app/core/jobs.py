@@ -0,0 +1,250 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from src.app.core.config import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    platform TEXT NOT NULL,
+    channel_id TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    incident_id TEXT,
+    stages TEXT NOT NULL DEFAULT '{}',
+    usage TEXT NOT NULL DEFAULT '{}',
+    coalesced INTEGER NOT NULL DEFAULT 0,
+    priority INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_channel_created ON jobs (platform, channel_id, created_at);
+"""
+
+TERMINAL_STAGES = ("done", "failed")
+
+class QueueFull(Exception):
+    """The queue already holds the maximum number of waiting jobs."""
+
+    def __init__(self, queued: int):
+        super().__init__(f"{queued} jobs are already queued")
+        self.queued = queued
+
+class JobStore:
+    """
+    Durable job queue on a local SQLite file.
+
+    Jobs move queued -> running -> done | failed. A job left `running` by a
+    crashed process is put back on the queue by `recover()` at startup.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, definition in (
+                ("usage", "TEXT NOT NULL DEFAULT '{}'"),
+                ("coalesced", "INTEGER NOT NULL DEFAULT 0"),
+                ("priority", "INTEGER NOT NULL DEFAULT 0"),
+            ):
+                if column not in columns:
+                    # Stores created before the column existed.
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+            # Not in SCHEMA: older stores only get the column above.
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_priority ON jobs (status, priority, created_at)")
+            self._conn = conn
+        return self._conn
+
+    def enqueue(
+        self, platform: str, channel_id: Optional[str], payload: Dict[str, Any], priority: int = 0, max_queued: int = 0
+    ) -> str:
+        """Add a job; raises QueueFull when `max_queued` jobs (if set) are already waiting."""
+        with self._lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._check_capacity(max_queued)
+                job_id = self._insert(platform, channel_id, payload, priority)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def enqueue_or_attach(
+        self, platform: str, channel_id: Optional[str], payload: Dict[str, Any], window: float,
+        priority: int = 0, max_queued: int = 0,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Single-flight enqueue: when the channel already has a job queued or running, or one
+        that finished successfully within the last `window` seconds, count the trigger
+        against it and return `(its id, the job)` instead of adding another.
+        Otherwise enqueue as usual and return `(new id, None)`.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id, status, created_at, finished_at FROM jobs WHERE platform = ? AND channel_id = ?"
+                    " AND (status IN ('queued', 'running') OR (status = 'done' AND finished_at >= ?))"
+                    " ORDER BY created_at DESC LIMIT 1",
+                    (platform, channel_id, now - window),
+                ).fetchone()
+                if row is None:
+                    self._check_capacity(max_queued)
+                    job_id = self._insert(platform, channel_id, payload, priority)
+                else:
+                    conn.execute("UPDATE jobs SET coalesced = coalesced + 1 WHERE id = ?", (row["id"],))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return (job_id, None) if row is None else (row["id"], dict(row))
+
+    def _check_capacity(self, max_queued: int):
+        if max_queued > 0:
+            queued = self.conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= max_queued:
+                raise QueueFull(queued)
+
+    def _insert(self, platform: str, channel_id: Optional[str], payload: Dict[str, Any], priority: int) -> str:
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        self.conn.execute(
+            "INSERT INTO jobs (id, platform, channel_id, payload, status, stage, priority, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, 'queued', 'queued', ?, ?, ?)",
+            (job_id, platform, channel_id, json.dumps(payload), priority, now, now),
+        )
+        return job_id
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """1-based place of a queued job in claim order, or None if it is no longer queued."""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM jobs AS ahead, jobs AS job WHERE job.id = ? AND job.status = 'queued'"
+                " AND ahead.status = 'queued' AND (ahead.priority < job.priority"
+                " OR (ahead.priority = job.priority AND ahead.created_at <= job.created_at))",
+                (job_id,),
+            ).fetchone()[0] or None
+
+    def queue_stats(self) -> Dict[str, Any]:
+        """Jobs waiting and running, and how long the oldest waiting one has been queued."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT SUM(status = 'queued') AS queued, SUM(status = 'running') AS running,"
+                " MIN(CASE WHEN status = 'queued' THEN created_at END) AS oldest"
+                " FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()
+        return {
+            "queued": row["queued"] or 0,
+            "running": row["running"] or 0,
+            "oldest_queued_seconds": round(time.time() - row["oldest"], 3) if row["oldest"] else 0.0,
+        }
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically take the next queued job (lowest priority value, then oldest) and mark it running."""
+        now = time.time()
+        with self._lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY priority, created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1,"
+                    " started_at = COALESCE(started_at, ?), updated_at = ? WHERE id = ?",
+                    (now, now, row["id"]),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"])
+
+    def set_stage(self, job_id: str, stage: str, **fields):
+        """Enter `stage`, closing the timing of the previous one."""
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT stage, stages FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            stages = json.loads(row["stages"])
+            previous = stages.get(row["stage"])
+            if previous and previous.get("finished_at") is None:
+                previous["finished_at"] = now
+                previous["seconds"] = round(now - previous["started_at"], 3)
+            if stage not in TERMINAL_STAGES:
+                stages[stage] = {"started_at": now, "finished_at": None}
+            assignments = ", ".join(f"{column} = ?" for column in fields)
+            self.conn.execute(
+                f"UPDATE jobs SET stage = ?, stages = ?, updated_at = ?{', ' + assignments if assignments else ''} WHERE id = ?",
+                (stage, json.dumps(stages), now, *fields.values(), job_id),
+            )
+
+    def complete(self, job_id: str, usage: Optional[Dict[str, int]] = None):
+        self.set_stage(job_id, "done", status="done", error=None, finished_at=time.time(), usage=json.dumps(usage or {}))
+
+    def fail(self, job_id: str, error: str, max_attempts: int):
+        job = self.get(job_id)
+        if job and job["attempts"] < max_attempts:
+            self.set_stage(job_id, "queued", status="queued", error=error)
+        else:
+            self.set_stage(job_id, "failed", status="failed", error=error, finished_at=time.time())
+
+    def recover(self) -> int:
+        """Requeue jobs that were running when the previous process died."""
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = 'queued', updated_at = ? WHERE status = 'running'",
+                (time.time(),),
+            )
+            return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["stages"] = json.loads(job["stages"])
+        job["usage"] = json.loads(job["usage"])
+        return job
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+job_store = JobStore(settings.JOB_DB_PATH)
@@ -0,0 +1,160 @@
+import contextvars
+import importlib.util
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.app.core.config import settings
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+METRICS = {
+    "aftermath_stage_seconds": ("histogram", "Time spent in each pipeline stage."),
+    "aftermath_jobs_total": ("counter", "Postmortem jobs finished, by platform and status."),
+    "aftermath_job_queue_depth": ("gauge", "Postmortem jobs waiting for a worker."),
+    "aftermath_jobs_running": ("gauge", "Postmortem jobs being generated."),
+    "aftermath_job_queue_oldest_seconds": ("gauge", "How long the oldest waiting job has been queued."),
+    "aftermath_job_queue_wait_seconds": ("histogram", "Time from trigger to a worker taking the job, by platform."),
+    "aftermath_triggers_total": ("counter", "Postmortem triggers, by platform and outcome (enqueued, coalesced, refresh, rejected)."),
+    "aftermath_llm_calls_total": ("counter", "Model requests sent, chat completions and embeddings (cache hits excluded), by model and stage."),
+    "aftermath_llm_tokens_total": ("counter", "Chat completion tokens, by model and kind (prompt or completion)."),
+    "aftermath_llm_cache_hits": ("gauge", "LLM response cache hits since startup, by stage."),
+    "aftermath_llm_cache_misses": ("gauge", "LLM response cache misses since startup, by stage."),
+    "aftermath_llm_cache_size_bytes": ("gauge", "Size of the cached LLM responses."),
+    "aftermath_github_cache_total": ("counter", "GitHub API responses and job logs by cache result (hit, revalidated, miss)."),
+    "aftermath_outbound_requests_total": ("counter", "Responses from external APIs, by platform and status code."),
+    "aftermath_outbound_rate_limited_total": ("counter", "429 responses from external APIs, by platform."),
+    "aftermath_outbound_retries_total": ("counter", "Rate-limited requests retried by the outbound scheduler, by platform."),
+    "aftermath_outbound_wait_seconds_total": ("counter", "Time outbound requests waited for rate-limit tokens, by platform and priority."),
+    "aftermath_user_directory_lookups_total": ("counter", "User name lookups, by platform and result (hit or miss in the directory cache)."),
+    "aftermath_user_directory_remote_lookups_total": ("counter", "User ids resolved against the platform API on a directory miss, by platform."),
+    "aftermath_user_directory_prefetched_total": ("counter", "User names loaded by bulk directory prefetches, by platform."),
+    "aftermath_deployment_polls_total": ("counter", "Background polls of recent deployments, by provider and outcome."),
+    "aftermath_deployment_index_size": ("gauge", "Deployments in the in-memory index, by provider."),
+    "aftermath_deployment_lookups_total": ("counter", "Trigger-time deployment lookups, by provider and result (index or fallback)."),
+    "aftermath_graph_token_requests_total": ("counter", "Graph client-credential token requests, by outcome."),
+    "aftermath_teams_delta_total": ("counter", "Teams channel reads, by kind (full, incremental, expired deltaLink)."),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_NOOP = nullcontext()
+_incident_usage: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar("incident_usage", default=None)
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(key: LabelKey, le: Optional[str] = None) -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in key]
+    if le is not None:
+        parts.append(f'le="{le}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Metrics:
+    """
+    In-process counters, gauges and histograms rendered in the Prometheus text format,
+    plus optional OpenTelemetry spans around pipeline stages. With `enabled` off every
+    call returns immediately and `stage()` hands back a shared no-op context manager.
+    """
+
+    def __init__(self, enabled: bool, otel: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, LabelKey], float] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], List[float]] = {}
+        self._tracer = None
+        if enabled and otel and importlib.util.find_spec("opentelemetry") is not None:
+            from opentelemetry import trace
+
+            self._tracer = trace.get_tracer("aftermath")
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._values[(name, _label_key(labels))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            # One slot per bucket, then sum and count.
+            histogram = self._histograms.setdefault(key, [0.0] * (len(STAGE_BUCKETS) + 2))
+            for i, bound in enumerate(STAGE_BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def stage(self, stage: str, **labels):
+        """Time a block into `aftermath_stage_seconds{stage=...}`, inside an OpenTelemetry span when enabled."""
+        if not self.enabled:
+            return _NOOP
+        return self._timed(stage, labels)
+
+    @contextmanager
+    def _timed(self, stage: str, labels: Dict[str, object]) -> Iterator[None]:
+        span = self._tracer.start_as_current_span(f"aftermath.{stage}", attributes=labels) if self._tracer else _NOOP
+        with span:
+            started = time.perf_counter()
+            try:
+                yield
+            finally:
+                self.observe("aftermath_stage_seconds", time.perf_counter() - started, stage=stage, **labels)
+
+    def render(self) -> str:
+        with self._lock:
+            values = dict(self._values)
+            histograms = {key: list(buckets) for key, buckets in self._histograms.items()}
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            series = sorted((key, value) for (metric, key), value in values.items() if metric == name)
+            hist = sorted((key, buckets) for (metric, key), buckets in histograms.items() if metric == name)
+            if not series and not hist:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in series:
+                lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for key, buckets in hist:
+                for bound, count in zip(STAGE_BUCKETS, buckets):
+                    lines.append(f"{name}_bucket{_format_labels(key, f'{bound:g}')} {count:g}")
+                lines.append(f"{name}_bucket{_format_labels(key, '+Inf')} {buckets[-1]:g}")
+                lines.append(f"{name}_sum{_format_labels(key)} {buckets[-2]:.6f}")
+                lines.append(f"{name}_count{_format_labels(key)} {buckets[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics(settings.METRICS_ENABLED, settings.METRICS_OTEL_ENABLED)
+
+@contextmanager
+def track_usage() -> Iterator[Dict[str, int]]:
+    """Collect the LLM calls and tokens of everything run inside the block (tasks it spawns included)."""
+    usage = {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    token = _incident_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _incident_usage.reset(token)
+
+def record_llm_call(model: Optional[str], stage: Optional[str], prompt_tokens: int, completion_tokens: int):
+    usage = _incident_usage.get()
+    if usage is not None:
+        usage["llm_calls"] += 1
+        usage["prompt_tokens"] += prompt_tokens
+        usage["completion_tokens"] += completion_tokens
+    model = model or "default"
+    metrics.inc("aftermath_llm_calls_total", model=model, stage=stage or "other")
+    metrics.inc("aftermath_llm_tokens_total", prompt_tokens, model=model, kind="prompt")
+    metrics.inc("aftermath_llm_tokens_total", completion_tokens, model=model, kind="completion")
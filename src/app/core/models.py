@@ -1,5 +1,8 @@
-from pydantic import BaseModel
-from typing import List, Optional
+import sys
+from array import array
+from pydantic import BaseModel, Field
+from pydantic_core import core_schema
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from datetime import datetime
 
 class Message(BaseModel):
@@ -8,6 +11,156 @@ class Message(BaseModel):
     text: str
     timestamp: datetime
     source: Optional[str] = None
+    message_id: Optional[str] = None
+    is_bot: bool = False
+    # Join/leave and other platform system events.
+    is_system: bool = False
+
+# (user_id, username, text, epoch seconds, source, message_id, is_bot, is_system)
+MessageRow = Tuple[str, str, str, float, Optional[str], Optional[str], bool, bool]
+
+BOT_FLAG = 1
+SYSTEM_FLAG = 2
+
+class Conversation:
+    """
+    Columnar message list for large channels: one column per field, with user ids,
+    usernames and sources interned, timestamps as epoch floats in an `array('d')` and
+    the bot/system flags packed in a `bytearray`. Rows are validated a column at a time
+    when added in bulk. Indexing and iteration hand out `Message` objects (built without
+    re-validation), and as an `Incident` field it serializes exactly like `List[Message]`.
+    """
+
+    __slots__ = ("user_ids", "usernames", "texts", "timestamps", "sources", "message_ids", "flags")
+
+    def __init__(self):
+        self.user_ids: List[str] = []
+        self.usernames: List[str] = []
+        self.texts: List[str] = []
+        self.timestamps = array("d")
+        self.sources: List[Optional[str]] = []
+        self.message_ids: List[Optional[str]] = []
+        self.flags = bytearray()
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[MessageRow]) -> "Conversation":
+        conversation = cls()
+        conversation.extend_rows(rows)
+        return conversation
+
+    @classmethod
+    def from_messages(cls, messages: Iterable[Union[Message, dict]]) -> "Conversation":
+        conversation = cls()
+        conversation.extend(messages)
+        return conversation
+
+    def extend_rows(self, rows: Iterable[MessageRow]):
+        columns = list(zip(*rows))
+        if not columns:
+            return
+        if len(columns) != 8:
+            raise ValueError(f"Conversation rows need 8 fields, got {len(columns)}")
+        user_ids, usernames, texts, timestamps, sources, message_ids, is_bot, is_system = columns
+        for name, column, optional in (
+            ("user_id", user_ids, False), ("username", usernames, False), ("text", texts, False),
+            ("source", sources, True), ("message_id", message_ids, True),
+        ):
+            if not all(type(value) is str or (optional and value is None) for value in column):
+                raise ValueError(f"Conversation column '{name}' must hold strings")
+        try:
+            # array() converts and type-checks the whole column in C.
+            self.timestamps.extend(array("d", timestamps))
+        except TypeError as e:
+            raise ValueError(f"Conversation column 'timestamp' must hold epoch seconds: {e}") from e
+        intern = sys.intern
+        self.user_ids.extend(map(intern, user_ids))
+        self.usernames.extend(map(intern, usernames))
+        self.texts.extend(texts)
+        self.sources.extend(source if source is None else intern(source) for source in sources)
+        self.message_ids.extend(message_ids)
+        self.flags.extend((BOT_FLAG if bot else 0) | (SYSTEM_FLAG if system else 0) for bot, system in zip(is_bot, is_system))
+
+    def append(self, message: Union[Message, dict]):
+        self.extend((message,))
+
+    def extend(self, messages: Iterable[Union[Message, dict, "Conversation"]]):
+        if isinstance(messages, Conversation):
+            self.user_ids.extend(messages.user_ids)
+            self.usernames.extend(messages.usernames)
+            self.texts.extend(messages.texts)
+            self.timestamps.extend(messages.timestamps)
+            self.sources.extend(messages.sources)
+            self.message_ids.extend(messages.message_ids)
+            self.flags.extend(messages.flags)
+            return
+        self.extend_rows(
+            (m.user_id, m.username, m.text, m.timestamp.timestamp(), m.source, m.message_id, m.is_bot, m.is_system)
+            for m in (Message.model_validate(m) if isinstance(m, dict) else m for m in messages)
+        )
+
+    def sort(self):
+        """Order rows by timestamp (stable)."""
+        order = sorted(range(len(self.timestamps)), key=self.timestamps.__getitem__)
+        if all(i == position for position, i in enumerate(order)):
+            return
+        self.user_ids = [self.user_ids[i] for i in order]
+        self.usernames = [self.usernames[i] for i in order]
+        self.texts = [self.texts[i] for i in order]
+        self.timestamps = array("d", (self.timestamps[i] for i in order))
+        self.sources = [self.sources[i] for i in order]
+        self.message_ids = [self.message_ids[i] for i in order]
+        self.flags = bytearray(self.flags[i] for i in order)
+
+    def rows(self) -> Iterator[MessageRow]:
+        return zip(
+            self.user_ids, self.usernames, self.texts, self.timestamps, self.sources, self.message_ids,
+            (bool(flag & BOT_FLAG) for flag in self.flags), (bool(flag & SYSTEM_FLAG) for flag in self.flags),
+        )
+
+    def _message(self, i: int) -> Message:
+        flag = self.flags[i]
+        return Message.model_construct(
+            user_id=self.user_ids[i], username=self.usernames[i], text=self.texts[i],
+            timestamp=datetime.fromtimestamp(self.timestamps[i]), source=self.sources[i],
+            message_id=self.message_ids[i], is_bot=bool(flag & BOT_FLAG), is_system=bool(flag & SYSTEM_FLAG),
+        )
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __getitem__(self, i: int) -> Message:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("conversation index out of range")
+        return self._message(i)
+
+    def __iter__(self) -> Iterator[Message]:
+        return map(self._message, range(len(self)))
+
+    def dump(self, json: bool = False) -> List[Dict[str, Any]]:
+        """The rows as `Message.model_dump()` dicts; with `json`, timestamps are ISO strings."""
+        return [
+            {
+                "user_id": user_id, "username": username, "text": text,
+                "timestamp": datetime.fromtimestamp(ts).isoformat() if json else datetime.fromtimestamp(ts),
+                "source": source, "message_id": message_id, "is_bot": is_bot, "is_system": is_system,
+            }
+            for user_id, username, text, ts, source, message_id, is_bot, is_system in self.rows()
+        ]
+
+    @classmethod
+    def _validate(cls, value: Any) -> "Conversation":
+        return value if isinstance(value, Conversation) else cls.from_messages(value)
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type: Any, handler) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda value, info: value.dump(json=info.mode_is_json()), info_arg=True,
+            ),
+        )
 
 class Incident(BaseModel):
     incident_id: str
@@ -15,7 +168,12 @@ class Incident(BaseModel):
     triggered_by_user_id: str
     triggered_by_user_name: str
     channel_name: str
-    conversation: List[Message]
+    # Accepts a list of Message (or dicts) too; serializes as one.
+    conversation: Conversation
     source: Optional[str] = "slack"
     trigger_platform: Optional[str] = None
-    deployment_logs: Optional[str] = None
\ No newline at end of file
+    deployment_logs: Optional[str] = None
+    # Lazily-read src.ingestion.log_stream.LogStream objects; never serialized.
+    log_streams: List[Any] = Field(default_factory=list, exclude=True)
+    late_sources: List[str] = Field(default_factory=list)
+    failed_sources: Dict[str, str] = Field(default_factory=dict)
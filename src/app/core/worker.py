@@ -0,0 +1,159 @@
+import asyncio
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.app.core.config import settings
+from src.app.core.delivery import StreamingMessage, send_postmortem
+from src.app.core.jobs import JobStore, QueueFull, job_store
+from src.app.core.metrics import metrics, track_usage
+from src.ingestion.orchestrator import IngestionRequest, orchestrator
+from src.llm.pipeline import PostmortemAgent
+
+async def process_job(job: Dict[str, Any], store: JobStore):
+    job_id = job["id"]
+    with track_usage() as usage:
+        await _run_stages(job_id, job, store)
+    print(f"Job {job_id} used {usage['llm_calls']} LLM calls, {usage['prompt_tokens']} prompt and {usage['completion_tokens']} completion tokens.")
+    store.complete(job_id, usage=usage)
+    metrics.inc("aftermath_jobs_total", platform=job["platform"], status="done")
+
+async def _run_stages(job_id: str, job: Dict[str, Any], store: JobStore):
+    store.set_stage(job_id, "ingesting")
+    with metrics.stage("ingestion", platform=job["platform"]):
+        incident = await orchestrator.build_incident(IngestionRequest(**job["payload"]))
+    store.set_stage(job_id, "generating", incident_id=incident.incident_id)
+
+    delivery = None
+    if settings.DELIVERY_STREAMING and incident.source in settings.DELIVERY_MESSAGE_LIMITS:
+        delivery = StreamingMessage(incident)
+        try:
+            await delivery.start()
+        except Exception as e:
+            print(f"Could not post the postmortem placeholder ({e}); delivering in one message instead.")
+            delivery = None
+
+    try:
+        agent = PostmortemAgent()
+        postmortem = await agent.run(incident, on_delta=delivery.append if delivery else None)
+    except Exception as e:
+        if delivery:
+            await delivery.fail(str(e))
+        raise
+    finally:
+        for stream in incident.log_streams:
+            stream.close()
+
+    store.set_stage(job_id, "delivering")
+    with metrics.stage("delivery", platform=incident.source):
+        if delivery:
+            await delivery.finish(postmortem)
+            print(f"Streamed postmortem {incident.incident_id}: first content after {delivery.first_content_seconds}s, {delivery.edits} edits.")
+        else:
+            await send_postmortem(incident, postmortem)
+
+    if settings.INCIDENT_INDEX_ENABLED:
+        from src.llm.incident_index import remember_incident
+
+        with metrics.stage("incident_indexing"):
+            try:
+                await remember_incident(incident, postmortem, agent.model)
+            except Exception as e:
+                print(f"Could not add incident {incident.incident_id} to the similarity index: {e}")
+
+class JobWorkerPool:
+    """Runs `concurrency` workers that pull jobs from the store until stopped."""
+
+    def __init__(self, store: JobStore, concurrency: int, poll_interval: float):
+        self.store = store
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def notify(self):
+        self._wakeup.set()
+
+    async def start(self):
+        recovered = self.store.recover()
+        if recovered:
+            print(f"Requeued {recovered} jobs interrupted by the previous shutdown.")
+        self._tasks = [asyncio.create_task(self._run(i)) for i in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, worker_id: int):
+        while True:
+            job = self.store.claim()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if job["attempts"] == 1:
+                metrics.observe("aftermath_job_queue_wait_seconds", job["started_at"] - job["created_at"], platform=job["platform"])
+            try:
+                await process_job(job, self.store)
+            except asyncio.CancelledError:
+                # Leave it `running`; recover() requeues it on the next start.
+                raise
+            except Exception as e:
+                print(f"Job {job['id']} failed on worker {worker_id}: {e}")
+                metrics.inc("aftermath_jobs_total", platform=job["platform"], status="error")
+                self.store.fail(job["id"], f"{type(e).__name__}: {e}", settings.JOB_MAX_ATTEMPTS)
+
+worker_pool: Optional[JobWorkerPool] = None
+
+def get_worker_pool() -> JobWorkerPool:
+    global worker_pool
+    if worker_pool is None:
+        worker_pool = JobWorkerPool(job_store, settings.JOB_WORKERS, settings.JOB_POLL_INTERVAL_SECONDS)
+    return worker_pool
+
+def job_priority(request: IngestionRequest, severity: Optional[int] = None) -> int:
+    """Claim order of a trigger's job: its severity, or its channel's configured priority if lower."""
+    priority = settings.JOB_DEFAULT_PRIORITY if severity is None else severity
+    for key in (f"{request.platform}:{request.channel_id}", request.channel_name):
+        if key in settings.JOB_CHANNEL_PRIORITIES:
+            priority = min(priority, settings.JOB_CHANNEL_PRIORITIES[key])
+    return priority
+
+def enqueue_postmortem(
+    request: IngestionRequest, refresh: bool = False, severity: Optional[int] = None
+) -> Tuple[str, Optional[Dict[str, Any]], int]:
+    """
+    Queue a postmortem and return `(job_id, None, position)`, position being how many jobs
+    are ahead of it for a worker (0 when it starts right away); or `(job_id, existing job, 0)`
+    when the trigger was coalesced into a job already running or just finished for the same
+    channel. Raises QueueFull when JOB_MAX_QUEUED jobs are already waiting.
+    """
+    # Pin the window to the trigger time so a retried job reads the same history.
+    request.latest = request.latest or time.time()
+    priority = job_priority(request, severity)
+    try:
+        if settings.JOB_COALESCE_ENABLED and not refresh and request.channel_id:
+            job_id, existing = job_store.enqueue_or_attach(
+                request.platform, request.channel_id, asdict(request), settings.JOB_COALESCE_WINDOW_SECONDS,
+                priority=priority, max_queued=settings.JOB_MAX_QUEUED,
+            )
+        else:
+            job_id = job_store.enqueue(
+                request.platform, request.channel_id, asdict(request), priority=priority, max_queued=settings.JOB_MAX_QUEUED
+            )
+            existing = None
+    except QueueFull:
+        metrics.inc("aftermath_triggers_total", platform=request.platform, outcome="rejected")
+        raise
+    outcome = "coalesced" if existing else "refresh" if refresh else "enqueued"
+    metrics.inc("aftermath_triggers_total", platform=request.platform, outcome=outcome)
+    if existing is not None:
+        return job_id, existing, 0
+    get_worker_pool().notify()
+    free_workers = max(settings.JOB_WORKERS - job_store.queue_stats()["running"], 0)
+    return job_id, None, max((job_store.queue_position(job_id) or 0) - free_workers, 0)
@@ -1,12 +1,66 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
+from fastapi.responses import PlainTextResponse
 
 from src.app.core.config import settings
 from src.app.api.v1.reports import router as reports_router
+from src.app.api.v1.jobs import router as jobs_router
+from src.app.api.v1.llm import router as llm_router
+from src.app.api.v1.incidents import router as incidents_router
+from src.app.core.jobs import job_store
+from src.app.core.metrics import metrics
+from src.app.core.worker import get_worker_pool
+from src.ingestion.connectors.http_client import open_clients, close_clients
+from src.ingestion.connectors.github_cache import github_cache
+from src.ingestion.connectors.teams_auth import graph_tokens
+from src.ingestion.deployments import deployment_poller
+from src.ingestion.message_store import message_store
+from src.llm.cache import llm_cache
+
+def _warm_up():
+    """Load what the first postmortem needs (tokenizer, and LangChain in agent mode) off the request path."""
+    from src.llm.tokens import count_tokens
+
+    count_tokens("warmup")
+    if settings.SYNTHESIS_MODE == "agent":
+        import src.llm.agent  # noqa: F401
+    if settings.INCIDENT_INDEX_ENABLED:
+        from src.llm.incident_index import incident_index
+
+        incident_index.load()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await open_clients()
+    await graph_tokens.start()
+    workers = get_worker_pool()
+    await workers.start()
+    if settings.DEPLOYMENT_POLLER_ENABLED:
+        await deployment_poller.start()
+    warmup = asyncio.create_task(asyncio.to_thread(_warm_up)) if settings.STARTUP_WARMUP else None
+    try:
+        yield
+    finally:
+        if warmup is not None:
+            await asyncio.gather(warmup, return_exceptions=True)
+        await workers.stop()
+        await deployment_poller.stop()
+        await graph_tokens.stop()
+        await close_clients()
+        job_store.close()
+        message_store.close()
+        llm_cache.close()
+        github_cache.close()
+        if settings.INCIDENT_INDEX_ENABLED:
+            from src.llm.incident_index import incident_index
+
+            incident_index.close()
 
 def create_app() -> FastAPI:
     app = FastAPI(
+        lifespan=lifespan,
         title="Aftermath AI - Incident Postmortem Generator",
         version="0.2.0",
         description="AI agent that turns incident discussions + deploy logs into postmortem reports (Slack / Discord / Teams)",
@@ -23,13 +77,32 @@ def create_app() -> FastAPI:
     @app.get("/")
     async def health():
         return {"status": "ok"}
-    
+
+    if settings.METRICS_ENABLED:
+        @app.get("/metrics", include_in_schema=False)
+        async def prometheus_metrics():
+            queue = job_store.queue_stats()
+            metrics.set("aftermath_job_queue_depth", queue["queued"])
+            metrics.set("aftermath_jobs_running", queue["running"])
+            metrics.set("aftermath_job_queue_oldest_seconds", queue["oldest_queued_seconds"])
+            cache = llm_cache.stats()
+            metrics.set("aftermath_llm_cache_size_bytes", cache["size_bytes"])
+            for stage, counters in cache["stages"].items():
+                metrics.set("aftermath_llm_cache_hits", counters["hits"], stage=stage)
+                metrics.set("aftermath_llm_cache_misses", counters["misses"], stage=stage)
+            return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
     app.include_router(reports_router, prefix="/api/v1", tags=["Integrations"])
+    app.include_router(jobs_router, prefix="/api/v1", tags=["Jobs"])
+    app.include_router(llm_router, prefix="/api/v1", tags=["LLM"])
+    app.include_router(incidents_router, prefix="/api/v1", tags=["Incidents"])
 
     return app
 
 app = create_app()
 
 if __name__ == "__main__":
+    import uvicorn
+
     print("Starting local server at http://127.0.0.1:8000")
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=False)
\ No newline at end of file
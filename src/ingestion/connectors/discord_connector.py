@@ -1,13 +1,16 @@
 import os
 import time
-import requests
+from typing import AsyncIterator, List, Optional
 from fastapi import Request
 from src.app.core.config import settings
+from src.ingestion.connectors.http_client import get_client
 
 DISCORD_TOKEN = os.environ.get("DISCORD_TOKEN", "")
 DISCORD_PUBLIC_KEY = os.environ.get("DISCORD_PUBLIC_KEY", "")
 
-BASE = "https://discord.com/api/v10"
+BASE = settings.DISCORD_API_URL.rstrip("/")
+DISCORD_EPOCH_MS = 1420070400000
+DISCORD_PAGE_LIMIT = 100
 
 def verify_discord_signature(request: Request, body: bytes):
     """
@@ -21,27 +24,63 @@ def verify_discord_signature(request: Request, body: bytes):
         print("Discord signature missing - implement verification.")
     return True
 
-async def retrieve_discord_chat_history(channel_id: str):
-    """Return a list of messages from a Discord channel. Requires bot token & channel permissions."""
-    url = f"{BASE}/channels/{channel_id}/messages?limit=200"
+def snowflake_from_timestamp(epoch_seconds: float) -> int:
+    return (int(epoch_seconds * 1000) - DISCORD_EPOCH_MS) << 22
+
+def timestamp_from_snowflake(snowflake) -> float:
+    return ((int(snowflake) >> 22) + DISCORD_EPOCH_MS) / 1000
+
+async def iter_discord_chat_history(channel_id: str, oldest: Optional[float] = None, latest: Optional[float] = None) -> AsyncIterator[List[dict]]:
+    """
+    Yield pages of channel messages (newest first) inside the [oldest, latest] window.
+    Discord caps a page at 100 messages, so walk backwards with `before` until `oldest`.
+    Requires bot token & channel permissions.
+    """
+    url = f"{BASE}/channels/{channel_id}/messages"
     headers = {"Authorization": f"Bot {DISCORD_TOKEN}"}
-    resp = requests.get(url, headers=headers)
-    resp.raise_for_status()
-    return resp.json()
+    before = snowflake_from_timestamp(latest) if latest is not None else None
+    while True:
+        params = {"limit": min(settings.HISTORY_PAGE_SIZE, DISCORD_PAGE_LIMIT)}
+        if before is not None:
+            params["before"] = str(before)
+        resp = await get_client("discord").get(url, headers=headers, params=params)
+        resp.raise_for_status()
+        messages = resp.json()
+        if not messages:
+            return
+        in_window = [
+            msg for msg in messages
+            if oldest is None or timestamp_from_snowflake(msg["id"]) >= oldest
+        ]
+        if in_window:
+            yield in_window
+        if len(in_window) < len(messages) or len(messages) < params["limit"]:
+            return
+        before = min(int(msg["id"]) for msg in messages)
 
 async def retrieve_discord_user_name(user_id: str):
     url = f"{BASE}/users/{user_id}"
     headers = {"Authorization": f"Bot {DISCORD_TOKEN}"}
-    resp = requests.get(url, headers=headers)
+    resp = await get_client("discord").get(url, headers=headers)
     if resp.status_code != 200:
-        return "Unknown"
+        return None
     data = resp.json()
     return data.get("username")
 
-async def send_discord_message(channel_id: str, message: str):
+async def send_discord_message(channel_id: str, message: str, reply_to: Optional[str] = None):
+    """Post a message, as a reply to `reply_to` when given."""
     url = f"{BASE}/channels/{channel_id}/messages"
     headers = {"Authorization": f"Bot {DISCORD_TOKEN}", "Content-Type": "application/json"}
     payload = {"content": message}
-    resp = requests.post(url, headers=headers, json=payload)
+    if reply_to:
+        payload["message_reference"] = {"message_id": reply_to, "fail_if_not_exists": False}
+    resp = await get_client("discord").post(url, headers=headers, json=payload)
+    resp.raise_for_status()
+    return resp.json()
+
+async def edit_discord_message(channel_id: str, message_id: str, message: str):
+    url = f"{BASE}/channels/{channel_id}/messages/{message_id}"
+    headers = {"Authorization": f"Bot {DISCORD_TOKEN}", "Content-Type": "application/json"}
+    resp = await get_client("discord").patch(url, headers=headers, json={"content": message})
     resp.raise_for_status()
     return resp.json()
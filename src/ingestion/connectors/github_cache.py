@@ -0,0 +1,124 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from src.app.core.config import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    body TEXT NOT NULL,
+    immutable INTEGER NOT NULL DEFAULT 0,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS logs (
+    job_id TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS logs_accessed ON logs (accessed_at);
+"""
+
+class GitHubCache:
+    """
+    GitHub API responses and job logs on local disk.
+
+    Responses are kept with their ETag for conditional requests; `immutable` ones (the jobs
+    of a completed run) are served without asking GitHub at all. Logs of completed jobs are
+    files under `logs/`, evicted least recently read first once past `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.join(self.path, "logs"), exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.path, "cache.sqlite3"), check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get_response(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            row = self.conn.execute("SELECT etag, body, immutable FROM responses WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def put_response(self, url: str, etag: Optional[str], body: str, immutable: bool = False):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, body, immutable, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, body, int(immutable), time.time()),
+            )
+
+    def log_path(self, job_id) -> str:
+        return os.path.join(self.path, "logs", f"{job_id}.log")
+
+    def open_log(self, job_id):
+        """The cached log of a job as an open binary file, or None."""
+        with self._lock:
+            row = self.conn.execute("SELECT size FROM logs WHERE job_id = ?", (str(job_id),)).fetchone()
+            if row is None:
+                return None
+            try:
+                f = open(self.log_path(job_id), "rb")
+            except FileNotFoundError:
+                self.conn.execute("DELETE FROM logs WHERE job_id = ?", (str(job_id),))
+                return None
+            self.conn.execute("UPDATE logs SET accessed_at = ? WHERE job_id = ?", (time.time(), str(job_id)))
+        return f
+
+    def temp_log_path(self, job_id) -> str:
+        """Where to download a log before `store_log` moves it into place."""
+        os.makedirs(os.path.join(self.path, "logs"), exist_ok=True)
+        return os.path.join(self.path, "logs", f".{job_id}.{uuid.uuid4().hex}.part")
+
+    def store_log(self, job_id, temp_path: str):
+        size = os.path.getsize(temp_path)
+        now = time.time()
+        with self._lock:
+            os.replace(temp_path, self.log_path(job_id))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO logs (job_id, size, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (str(job_id), size, now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        conn = self.conn
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM logs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for row in conn.execute("SELECT job_id, size FROM logs ORDER BY accessed_at"):
+            victims.append(row["job_id"])
+            total -= row["size"]
+            if total <= self.max_bytes:
+                break
+        for job_id in victims:
+            # Open readers keep their handle; the file is gone once they close it.
+            try:
+                os.unlink(self.log_path(job_id))
+            except FileNotFoundError:
+                pass
+        conn.executemany("DELETE FROM logs WHERE job_id = ?", [(job_id,) for job_id in victims])
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+github_cache = GitHubCache(settings.GITHUB_CACHE_PATH, settings.GITHUB_CACHE_MAX_BYTES)
@@ -1,60 +1,210 @@
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
 import httpx
-from typing import Optional
+
 from src.app.core.config import settings
+from src.app.core.metrics import metrics
+from src.ingestion.connectors.github_cache import github_cache
+from src.ingestion.connectors.http_client import get_client
+from src.ingestion.log_stream import LogStream, new_log_stream
+from src.ingestion.parsers.timestamps import parse_iso_timestamp
 
-API_BASE = "https://api.github.com"
+API_BASE = settings.GITHUB_API_URL.rstrip("/")
+FAILED_CONCLUSIONS = {"failure", "cancelled", "timed_out"}
 
-async def get_latest_github_action_logs() -> Optional[str]:
-    if not settings.GITHUB_TOKEN or not settings.GITHUB_REPO:
-        print("GitHub settings (TOKEN, REPO) not configured, skipping log fetch.")
-        return None
-
-    headers = {
+def _headers() -> Dict[str, str]:
+    return {
         "Authorization": f"Bearer {settings.GITHUB_TOKEN}",
         "Accept": "application/vnd.github.v3+json",
         "X-GitHub-Api-Version": "2022-11-28"
     }
-    
+
+async def _get_json(client: httpx.AsyncClient, url: str, immutable: bool = False) -> dict:
+    """
+    GET a GitHub API resource through the disk cache: immutable entries are served as stored,
+    others are revalidated with If-None-Match (a 304 costs no rate-limit quota).
+    """
+    cached = github_cache.get_response(url) if settings.GITHUB_CACHE_ENABLED else None
+    if cached and cached["immutable"]:
+        metrics.inc("aftermath_github_cache_total", kind="api", result="hit")
+        return json.loads(cached["body"])
+    headers = _headers()
+    if cached and cached["etag"]:
+        headers["If-None-Match"] = cached["etag"]
+    resp = await client.get(url, headers=headers)
+    if resp.status_code == 304 and cached:
+        metrics.inc("aftermath_github_cache_total", kind="api", result="revalidated")
+        if immutable:
+            github_cache.put_response(url, cached["etag"], cached["body"], immutable=True)
+        return json.loads(cached["body"])
+    resp.raise_for_status()
+    if settings.GITHUB_CACHE_ENABLED:
+        metrics.inc("aftermath_github_cache_total", kind="api", result="miss")
+        if immutable or resp.headers.get("etag"):
+            github_cache.put_response(url, resp.headers.get("etag"), resp.text, immutable)
+    return resp.json()
+
+def select_jobs(jobs: List[dict]) -> List[dict]:
+    """Failed or cancelled jobs when the run has any, otherwise all of them; at most GITHUB_MAX_JOB_LOGS."""
+    failed = [job for job in jobs if job.get("conclusion") in FAILED_CONCLUSIONS]
+    return (failed or jobs)[:settings.GITHUB_MAX_JOB_LOGS]
+
+def failing_steps(job: dict) -> List[dict]:
+    return [step for step in job.get("steps") or [] if step.get("conclusion") in FAILED_CONCLUSIONS]
+
+def _step_window(job: dict) -> Optional[Tuple[float, float]]:
+    """From shortly before the first failing step of `job` to the end of the last one."""
+    steps = failing_steps(job)
+    starts = [parse_iso_timestamp(step.get("started_at")) for step in steps]
+    ends = [parse_iso_timestamp(step.get("completed_at")) for step in steps]
+    if not steps or None in starts or None in ends:
+        return None
+    return min(starts) - settings.GITHUB_FAILED_STEP_CONTEXT_SECONDS, max(ends) + 1
+
+def _label(job: dict, run: Optional[dict] = None) -> str:
+    label = job.get("name") or str(job["id"])
+    if run is not None:
+        commit = f" {run['head_sha'][:7]}" if run.get("head_sha") else ""
+        label = f"run {run.get('run_number') or run['id']}{commit} / {label}"
+    if job.get("conclusion"):
+        label += f" ({job['conclusion']}"
+        steps = failing_steps(job)
+        if steps:
+            label += " at " + ", ".join(f"'{step.get('name')}'" for step in steps)
+        label += ")"
+    return label
+
+def _open_stream(job: dict, run: Optional[dict], window: Optional[Tuple[float, float]], file=None) -> LogStream:
+    step_window = _step_window(job)
+    if step_window is not None:
+        stream = LogStream(_label(job, run), window=step_window, file=file)
+    else:
+        stream = new_log_stream(_label(job, run), window, file=file)
+    stream.label = stream.name
+    return stream
+
+@asynccontextmanager
+async def _log_response(
+    client: httpx.AsyncClient, job_id, tail_bytes: Optional[int] = None
+) -> AsyncIterator[httpx.Response]:
+    """
+    A job log as a streamed response. GitHub usually redirects to blob storage, which is
+    read with a suffix range when `tail_bytes` is given; a direct 200 is read as it comes.
+    """
+    logs_url = f"{API_BASE}/repos/{settings.GITHUB_REPO}/actions/jobs/{job_id}/logs"
+    async with client.stream("GET", logs_url, headers=_headers(), follow_redirects=False) as resp:
+        if not resp.has_redirect_location:
+            if resp.status_code >= 400:
+                await resp.aread()
+                resp.raise_for_status()
+            yield resp
+            return
+        location = resp.headers["location"]
+    headers = {"Range": f"bytes=-{tail_bytes}"} if tail_bytes else {}
+    async with client.stream("GET", location, headers=headers, follow_redirects=True) as resp:
+        if resp.status_code >= 400:
+            await resp.aread()
+            resp.raise_for_status()
+        yield resp
+
+async def _fetch_job_log(
+    client: httpx.AsyncClient, job: dict, run: Optional[dict], window: Optional[Tuple[float, float]]
+) -> LogStream:
+    job_id = job["id"]
+    completed = job.get("status") == "completed"
+    if settings.GITHUB_CACHE_ENABLED and completed:
+        # A finished job's log never changes: download it whole once, then read it from disk.
+        cached = github_cache.open_log(job_id)
+        metrics.inc("aftermath_github_cache_total", kind="log", result="hit" if cached else "miss")
+        if cached is None:
+            temp_path = github_cache.temp_log_path(job_id)
+            try:
+                # Disk writes go to a thread so a slow volume does not stall the event loop.
+                f = await asyncio.to_thread(open, temp_path, "wb")
+                try:
+                    async with _log_response(client, job_id) as resp:
+                        async for chunk in resp.aiter_bytes(64 * 1024):
+                            await asyncio.to_thread(f.write, chunk)
+                finally:
+                    await asyncio.to_thread(f.close)
+                await asyncio.to_thread(github_cache.store_log, job_id, temp_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+            cached = github_cache.open_log(job_id)
+        return _open_stream(job, run, window, file=cached)
+
+    stream = _open_stream(job, run, window)
+    try:
+        async with _log_response(client, job_id, stream.tail_bytes) as resp:
+            await stream.consume(resp)
+    except BaseException:
+        stream.close()
+        raise
+    return stream
+
+async def list_workflow_runs(per_page: int = 1, status: Optional[str] = "completed") -> List[dict]:
+    """The newest workflow runs of GITHUB_REPO, revalidated against the disk cache."""
+    url = f"{API_BASE}/repos/{settings.GITHUB_REPO}/actions/runs?per_page={per_page}"
+    if status:
+        url += f"&status={status}"
+    return (await _get_json(get_client("github"), url)).get("workflow_runs") or []
+
+async def list_run_jobs(run: dict) -> List[dict]:
+    """Jobs (with their steps) of a run; a completed run's list is served from disk after the first call."""
+    url = f"{API_BASE}/repos/{settings.GITHUB_REPO}/actions/runs/{run['id']}/jobs?per_page=100"
+    return (await _get_json(get_client("github"), url, immutable=run.get("status") == "completed")).get("jobs") or []
+
+async def get_github_run_logs(
+    run: dict, window: Optional[Tuple[float, float]] = None, jobs: Optional[List[dict]] = None, label_run: bool = False
+) -> List[LogStream]:
+    """
+    Logs of one workflow run: its failed or cancelled jobs (narrowed to the failing steps)
+    when there are any, otherwise every job, all fetched concurrently. Pass `jobs` when
+    already known to skip listing them.
+    """
+    client = get_client("github")
+    if jobs is None:
+        jobs = await list_run_jobs(run)
+    jobs = select_jobs(jobs)
+    if not jobs:
+        print(f"No jobs found for GitHub run {run['id']}.")
+        return []
+
+    results = await asyncio.gather(
+        *(_fetch_job_log(client, job, run if label_run else None, window) for job in jobs), return_exceptions=True
+    )
+    streams = []
+    for job, result in zip(jobs, results):
+        if isinstance(result, BaseException):
+            print(f"Error fetching the log of GitHub job {job.get('name') or job['id']}: {result}")
+        else:
+            streams.append(result)
+    return streams
+
+def github_configured() -> bool:
+    return bool(settings.GITHUB_TOKEN and settings.GITHUB_REPO)
+
+async def get_latest_github_action_logs(window: Optional[Tuple[float, float]] = None) -> List[LogStream]:
+    """Logs of the latest completed workflow run (see `get_github_run_logs`)."""
+    if not github_configured():
+        print("GitHub settings (TOKEN, REPO) not configured, skipping log fetch.")
+        return []
+
     try:
-        async with httpx.AsyncClient() as client:
-            runs_url = f"{API_BASE}/repos/{settings.GITHUB_REPO}/actions/runs?per_page=1&status=completed"
-            resp_runs = await client.get(runs_url, headers=headers)
-            resp_runs.raise_for_status()
-            
-            runs_data = resp_runs.json()
-            if not runs_data.get("workflow_runs"):
-                print("No completed GitHub workflow runs found.")
-                return None
-            
-            latest_run_id = runs_data["workflow_runs"][0]["id"]
-            
-            jobs_url = f"{API_BASE}/repos/{settings.GITHUB_REPO}/actions/runs/{latest_run_id}/jobs"
-            resp_jobs = await client.get(jobs_url, headers=headers)
-            resp_jobs.raise_for_status()
-
-            jobs_data = resp_jobs.json()
-            if not jobs_data.get("jobs"):
-                print(f"No jobs found for GitHub run {latest_run_id}.")
-                return None
-            
-            first_job_id = jobs_data["jobs"][0]["id"]
-            logs_url = f"{API_BASE}/repos/{settings.GITHUB_REPO}/actions/jobs/{first_job_id}/logs"
-            
-            resp_log_redirect = await client.get(logs_url, headers=headers, follow_redirects=False)
-            
-            if resp_log_redirect.status_code == 302:
-                log_content_url = resp_log_redirect.headers['location']
-                resp_logs = await client.get(log_content_url)
-                resp_logs.raise_for_status()
-                return resp_logs.text
-            else:
-                resp_logs = await client.get(logs_url, headers=headers)
-                resp_logs.raise_for_status()
-                return resp_logs.text
+        runs = await list_workflow_runs()
+        if not runs:
+            print("No completed GitHub workflow runs found.")
+            return []
+        return await get_github_run_logs(runs[0], window)
 
     except httpx.HTTPStatusError as e:
         print(f"Error fetching GitHub logs: {e.response.status_code} - {e.response.text}")
-        return None
+        return []
     except Exception as e:
         print(f"An unexpected error occurred fetching GitHub logs: {e}")
-        return None
\ No newline at end of file
+        return []
@@ -0,0 +1,62 @@
+import importlib.util
+from typing import Dict, Iterable, Optional
+
+import httpx
+
+from src.app.core.config import settings
+from src.app.core.metrics import metrics
+from src.ingestion.connectors.rate_limit import RateLimitedTransport
+
+PLATFORMS = ("slack", "discord", "teams", "github", "jenkins", "openai")
+# Jenkins is usually self-hosted behind proxies that only speak HTTP/1.1.
+HTTP2_PLATFORMS = {"slack", "discord", "teams", "github", "openai"}
+# Platforms behind the outbound rate-limit scheduler; the OpenAI client paces itself by tokens.
+RATE_LIMITED_PLATFORMS = {"slack", "discord", "teams", "github", "jenkins"}
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+def _http2_supported() -> bool:
+    return settings.HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+def _response_hook(platform: str):
+    async def record(response: httpx.Response):
+        metrics.inc("aftermath_outbound_requests_total", platform=platform, status=response.status_code)
+        if response.status_code == 429:
+            metrics.inc("aftermath_outbound_rate_limited_total", platform=platform)
+    return record
+
+def _build_client(platform: str) -> httpx.AsyncClient:
+    read_timeout = settings.HTTP_PLATFORM_TIMEOUTS.get(platform, settings.HTTP_TIMEOUT_SECONDS)
+    timeout = httpx.Timeout(read_timeout, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS)
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+    transport = httpx.AsyncHTTPTransport(limits=limits, http2=platform in HTTP2_PLATFORMS and _http2_supported())
+    if settings.HTTP_RATE_LIMIT_ENABLED and platform in RATE_LIMITED_PLATFORMS:
+        transport = RateLimitedTransport(platform, transport)
+    return httpx.AsyncClient(
+        timeout=timeout,
+        transport=transport,
+        event_hooks={"response": [_response_hook(platform)]} if metrics.enabled else None,
+    )
+
+def get_client(platform: str) -> httpx.AsyncClient:
+    """Return the long-lived pooled client for `platform`, creating it on first use."""
+    client = _clients.get(platform)
+    if client is None or client.is_closed:
+        client = _build_client(platform)
+        _clients[platform] = client
+    return client
+
+async def open_clients(platforms: Optional[Iterable[str]] = None):
+    """Pre-build clients for `platforms` (default: the configured ones); others are created on first use."""
+    for platform in platforms if platforms is not None else settings.configured_platforms():
+        get_client(platform)
+
+async def close_clients():
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
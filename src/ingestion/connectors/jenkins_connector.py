@@ -1,36 +1,102 @@
+import asyncio
+import time
 import httpx
-from typing import Optional
+from typing import List, Optional, Tuple
 from src.app.core.config import settings
+from src.ingestion.connectors.http_client import get_client
+from src.ingestion.log_stream import LogStream, new_log_stream
 
-async def get_latest_jenkins_build_log() -> Optional[str]:
-    if not settings.JENKINS_URL or not settings.JENKINS_USERNAME or not settings.JENKINS_TOKEN or not settings.JENKINS_JOB_NAME:
+# Recent builds with what the deployment index needs, in one call.
+BUILDS_TREE = "builds[number,timestamp,duration,result,building,actions[lastBuiltRevision[SHA1]]]{0,%d}"
+
+def jenkins_configured() -> bool:
+    return bool(settings.JENKINS_URL and settings.JENKINS_USERNAME and settings.JENKINS_TOKEN and settings.JENKINS_JOB_NAME)
+
+def jenkins_auth() -> Tuple[str, str]:
+    return (settings.JENKINS_USERNAME, settings.JENKINS_TOKEN)
+
+def jenkins_build_url(number) -> str:
+    return f"{settings.JENKINS_URL}/job/{settings.JENKINS_JOB_NAME}/{number}"
+
+async def list_jenkins_builds(limit: int = 20) -> List[dict]:
+    """The newest builds of JENKINS_JOB_NAME, newest first."""
+    resp = await get_client("jenkins").get(
+        f"{settings.JENKINS_URL}/job/{settings.JENKINS_JOB_NAME}/api/json",
+        params={"tree": BUILDS_TREE % limit}, auth=jenkins_auth(),
+    )
+    resp.raise_for_status()
+    return resp.json().get("builds") or []
+
+async def get_latest_jenkins_build_log(window: Optional[Tuple[float, float]] = None) -> Optional[LogStream]:
+    if not jenkins_configured():
         print("Jenkins settings (URL, USERNAME, TOKEN, JOB_NAME) not fully configured, skipping log fetch.")
         return None
 
-    auth = (settings.JENKINS_USERNAME, settings.JENKINS_TOKEN)
+    auth = jenkins_auth()
     
     try:
-        async with httpx.AsyncClient() as client:
-            job_url = f"{settings.JENKINS_URL}/job/{settings.JENKINS_JOB_NAME}/api/json"
-            resp_job = await client.get(job_url, auth=auth)
-            resp_job.raise_for_status()
-            
-            job_data = resp_job.json()
-            latest_build_num = job_data.get("lastBuild", {}).get("number")
+        client = get_client("jenkins")
+        job_url = f"{settings.JENKINS_URL}/job/{settings.JENKINS_JOB_NAME}/api/json"
+        resp_job = await client.get(job_url, auth=auth)
+        resp_job.raise_for_status()
+        
+        job_data = resp_job.json()
+        latest_build_num = job_data.get("lastBuild", {}).get("number")
+        
+        if not latest_build_num:
+            print(f"No builds found for Jenkins job {settings.JENKINS_JOB_NAME}.")
+            return None
             
-            if not latest_build_num:
-                print(f"No builds found for Jenkins job {settings.JENKINS_JOB_NAME}.")
-                return None
-                
-            log_url = f"{settings.JENKINS_URL}/job/{settings.JENKINS_JOB_NAME}/{latest_build_num}/consoleText"
-            resp_log = await client.get(log_url, auth=auth)
-            resp_log.raise_for_status()
-            
-            return resp_log.text
+        build_url = f"{settings.JENKINS_URL}/job/{settings.JENKINS_JOB_NAME}/{latest_build_num}"
+        return await stream_jenkins_build_log(build_url, auth, window)
 
     except httpx.HTTPStatusError as e:
         print(f"Error fetching Jenkins logs: {e.response.status_code} - {e.response.text}")
         return None
     except Exception as e:
         print(f"An unexpected error occurred fetching Jenkins logs: {e}")
-        return None
\ No newline at end of file
+        return None
+
+async def jenkins_log_size(build_url: str, auth) -> Optional[int]:
+    """The console's current length, from the `X-Text-Size` of a HEAD on progressiveText."""
+    resp = await get_client("jenkins").head(f"{build_url}/logText/progressiveText", auth=auth)
+    if resp.status_code >= 400 or "X-Text-Size" not in resp.headers:
+        return None
+    return int(resp.headers["X-Text-Size"])
+
+async def stream_jenkins_build_log(
+    build_url: str, auth, window: Optional[Tuple[float, float]] = None, name: str = "jenkins"
+) -> LogStream:
+    """
+    Stream a build console through `logText/progressiveText` into a LogStream.
+    In tail mode only the last LOG_TAIL_BYTES are requested, from an offset taken from
+    the console's current size. While the build is still running (`X-More-Data: true`)
+    keep following it from the `X-Text-Size` offset for up to JENKINS_LOG_FOLLOW_SECONDS.
+    """
+    client = get_client("jenkins")
+    stream = new_log_stream(name, window)
+    start = 0
+    if stream.tail_bytes:
+        size = await jenkins_log_size(build_url, auth)
+        if size is not None and size > stream.tail_bytes:
+            start = size - stream.tail_bytes
+            # The first line is cut at the offset.
+            stream.partial = True
+    follow_until = time.monotonic() + settings.JENKINS_LOG_FOLLOW_SECONDS
+    try:
+        while True:
+            async with client.stream("GET", f"{build_url}/logText/progressiveText", params={"start": start}, auth=auth) as resp:
+                if resp.status_code >= 400:
+                    await resp.aread()
+                    resp.raise_for_status()
+                received = stream.size
+                await stream.consume(resp)
+                # Without X-Text-Size, advance by what this response carried.
+                start = int(resp.headers.get("X-Text-Size", start + stream.size - received))
+                more_data = resp.headers.get("X-More-Data") == "true"
+            if not more_data or time.monotonic() >= follow_until:
+                return stream
+            await asyncio.sleep(1.0)
+    except BaseException:
+        stream.close()
+        raise
@@ -0,0 +1,231 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from src.app.core.config import settings
+from src.app.core.metrics import metrics
+
+# Lower runs first when callers wait on the same bucket.
+PRIORITY_INTERACTIVE = 0  # the postmortem message someone is watching
+PRIORITY_NORMAL = 1  # ingestion for a running job
+PRIORITY_BACKGROUND = 2  # prefetch nobody is waiting on yet
+
+# Path segments after which comes an id: /teams/{id}/channels/{id}/messages/{id}.
+COLLECTIONS = {"channels", "messages", "replies", "users", "teams", "chats", "guilds", "webhooks", "runs", "jobs", "repos"}
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("outbound_priority", default=PRIORITY_NORMAL)
+_sequence = itertools.count()
+
+@contextmanager
+def outbound_priority(priority: int) -> Iterator[None]:
+    """Send the requests made inside the block at `priority` (tasks it spawns included)."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Delay requested by `retry-after-ms` or `Retry-After` (seconds or an HTTP date)."""
+    value = response.headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def reset_seconds(response: httpx.Response) -> Optional[float]:
+    """Time until the window in `X-RateLimit-Reset-After` (seconds) or `X-RateLimit-Reset` (epoch) reopens."""
+    try:
+        value = response.headers.get("x-ratelimit-reset-after")
+        if value is not None:
+            return max(float(value), 0.0)
+        value = response.headers.get("x-ratelimit-reset")
+        if value is not None:
+            return max(float(value) - time.time(), 0.0)
+    except ValueError:
+        pass
+    return None
+
+def route_of(platform: str, request: httpx.Request) -> Tuple[str, str]:
+    """
+    `(family, major)` of a request. The family picks the configured limit: the Web API method
+    for Slack, otherwise the HTTP method and path from the first collection on, ids elided.
+    `major` is the channel id, since Discord and Graph meter message routes per channel.
+    """
+    segments = [segment for segment in request.url.path.split("/") if segment]
+    if platform == "slack":
+        return (segments[-1] if segments else ""), ""
+    start = next((i for i, segment in enumerate(segments) if segment in COLLECTIONS), len(segments))
+    family, major, previous = [], "", None
+    for segment in segments[start:]:
+        if previous in COLLECTIONS and segment not in COLLECTIONS:
+            if previous == "channels":
+                major = segment
+            family.append("{id}")
+        else:
+            family.append(segment)
+        previous = segment
+    return f"{request.method} {'/'.join(family)}", major
+
+class Bucket:
+    """
+    Token bucket of `rate` requests per second and `burst` capacity (no rate: unlimited),
+    which can also be closed until a time the API asked for. Waiters are served by
+    priority, then first come, first served.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: float = 1.0):
+        self.rate = rate
+        self.capacity = max(burst, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._queue: List[Tuple[int, int]] = []
+        self._changed = asyncio.Condition()
+
+    def _delay(self, now: float) -> float:
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        delay = self.blocked_until - now
+        if self.rate and self.tokens < 1:
+            delay = max(delay, (1 - self.tokens) / self.rate)
+        return max(delay, 0.0)
+
+    def _take(self):
+        if self.rate:
+            self.tokens -= 1
+
+    async def acquire(self, priority: int) -> float:
+        """Wait for a token; returns the seconds waited."""
+        started = time.monotonic()
+        if not self._queue and self._delay(started) <= 0:
+            self._take()
+            return 0.0
+        entry = (priority, next(_sequence))
+        async with self._changed:
+            heapq.heappush(self._queue, entry)
+            try:
+                while True:
+                    delay = self._delay(time.monotonic())
+                    first = self._queue[0] == entry
+                    if first and delay <= 0:
+                        heapq.heappop(self._queue)
+                        self._take()
+                        self._changed.notify_all()
+                        return time.monotonic() - started
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), timeout=delay if first else None)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    self._changed.notify_all()
+                raise
+
+    def block(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+class RateLimitScheduler:
+    """
+    Process-wide buckets for outbound API traffic: one per platform, and one per route family
+    (per channel where the platform meters that way), each with the HTTP_RATE_LIMITS budget
+    if configured and closed for as long as the API's rate-limit headers say.
+    """
+
+    def __init__(self, limits: Dict[str, List[float]]):
+        self.limits = limits
+        self._buckets: Dict[Tuple[str, str, str], Bucket] = {}
+
+    def bucket(self, platform: str, family: str = "", major: str = "") -> Bucket:
+        key = (platform, family, major)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            limit = self.limits.get(f"{platform}:{family}" if family else platform)
+            bucket = self._buckets[key] = Bucket(*limit) if limit else Bucket()
+        return bucket
+
+    def observe(self, response: httpx.Response, platform_bucket: Bucket, route_bucket: Bucket) -> Optional[float]:
+        """Apply the response's rate-limit headers; for a rate-limited response, return how long to wait."""
+        headers = response.headers
+        # Discord names per-route buckets; elsewhere the remaining quota is the platform's.
+        owner = route_bucket if "x-ratelimit-bucket" in headers else platform_bucket
+        remaining = headers.get("x-ratelimit-remaining")
+        exhausted = remaining is not None and remaining.split(".")[0] == "0"
+        if exhausted:
+            owner.block(reset_seconds(response) or 1.0)
+        status = response.status_code
+        if status != 429 and not (status == 403 and (exhausted or "retry-after" in headers)):
+            return None
+        wait = retry_after_seconds(response)
+        if wait is None:
+            wait = reset_seconds(response) or 1.0
+        is_global = headers.get("x-ratelimit-global") == "true" or headers.get("x-ratelimit-scope") == "global"
+        (platform_bucket if is_global else route_bucket).block(wait)
+        return wait
+
+_scheduler: Optional[Tuple[asyncio.AbstractEventLoop, RateLimitScheduler]] = None
+
+def get_scheduler() -> RateLimitScheduler:
+    """The scheduler for the running loop (buckets hold asyncio primitives bound to it)."""
+    global _scheduler
+    loop = asyncio.get_running_loop()
+    if _scheduler is None or _scheduler[0] is not loop:
+        _scheduler = (loop, RateLimitScheduler(settings.HTTP_RATE_LIMITS))
+    return _scheduler[1]
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps a platform's transport: every request first takes a token from its route and
+    platform buckets, and a rate-limited response is retried once the bucket reopens
+    (up to HTTP_RATE_LIMIT_MAX_RETRIES times, waits up to HTTP_RATE_LIMIT_MAX_WAIT_SECONDS).
+    """
+
+    def __init__(self, platform: str, transport: httpx.AsyncBaseTransport):
+        self.platform = platform
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        scheduler = get_scheduler()
+        family, major = route_of(self.platform, request)
+        route_bucket = scheduler.bucket(self.platform, family, major)
+        platform_bucket = scheduler.bucket(self.platform)
+        priority = _priority.get()
+        for attempt in range(settings.HTTP_RATE_LIMIT_MAX_RETRIES + 1):
+            waited = await route_bucket.acquire(priority) + await platform_bucket.acquire(priority)
+            if waited:
+                metrics.inc("aftermath_outbound_wait_seconds_total", waited, platform=self.platform, priority=priority)
+            response = await self.transport.handle_async_request(request)
+            wait = scheduler.observe(response, platform_bucket, route_bucket)
+            if wait is None or attempt == settings.HTTP_RATE_LIMIT_MAX_RETRIES or wait > settings.HTTP_RATE_LIMIT_MAX_WAIT_SECONDS:
+                return response
+            await response.aclose()
+            metrics.inc("aftermath_outbound_requests_total", platform=self.platform, status=response.status_code)
+            metrics.inc("aftermath_outbound_rate_limited_total", platform=self.platform)
+            metrics.inc("aftermath_outbound_retries_total", platform=self.platform)
+            print(f"{self.platform} rate limited {family!r}; retrying in {wait:.1f}s (attempt {attempt + 1}/{settings.HTTP_RATE_LIMIT_MAX_RETRIES}).")
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
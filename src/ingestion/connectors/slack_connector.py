@@ -1,28 +1,84 @@
-from slack_sdk import WebClient
-from slack_sdk.signature import SignatureVerifier
+from functools import lru_cache
+from typing import AsyncIterator, List, Optional
 from fastapi import Request
 from src.app.core.config import settings
+from src.ingestion.connectors.http_client import get_client
 
-client = WebClient(token=settings.SLACK_TOKEN)
-verifier = SignatureVerifier(settings.SLACK_SIGNING_SECRET)
+SLACK_API = settings.SLACK_API_URL.rstrip("/")
+
+@lru_cache(maxsize=1)
+def get_verifier():
+    # slack_sdk's package import pulls in its whole Web API client; defer it to the first request.
+    from slack_sdk.signature import SignatureVerifier
+
+    return SignatureVerifier(settings.SLACK_SIGNING_SECRET or "")
 
 def verify_slack_signature(request: Request, body: bytes):
     timestamp = request.headers.get("X-Slack-Request-Timestamp")
     signature = request.headers.get("X-Slack-Signature")
-    verified = verifier.is_valid(body, timestamp, signature)
+    verified = get_verifier().is_valid(body, timestamp, signature)
     if not verified:
         print("Signature verification failed: Invalid signature")
 
-async def retrieve_slack_chat_history(channel_id: str):
-    response = client.conversations_history(channel=channel_id)
-    return response["messages"]
+async def slack_api_call(method: str, http_method: str = "GET", **params):
+    """Call a Slack Web API method on the pooled client and raise if Slack reports `ok: false`."""
+    headers = {"Authorization": f"Bearer {settings.SLACK_TOKEN}"}
+    params = {k: v for k, v in params.items() if v is not None}
+    client = get_client("slack")
+    if http_method == "POST":
+        resp = await client.post(f"{SLACK_API}/{method}", headers=headers, json=params)
+    else:
+        resp = await client.get(f"{SLACK_API}/{method}", headers=headers, params=params)
+    resp.raise_for_status()
+    data = resp.json()
+    if not data.get("ok"):
+        raise RuntimeError(f"Slack {method} failed: {data.get('error')}")
+    return data
+
+async def iter_slack_chat_history(channel_id: str, oldest: Optional[float] = None, latest: Optional[float] = None) -> AsyncIterator[List[dict]]:
+    """Yield pages of `conversations.history` (newest first) inside the [oldest, latest] window, following cursors."""
+    cursor = None
+    while True:
+        response = await slack_api_call(
+            "conversations.history",
+            channel=channel_id,
+            cursor=cursor,
+            limit=settings.HISTORY_PAGE_SIZE,
+            oldest=f"{oldest:.6f}" if oldest is not None else None,
+            latest=f"{latest:.6f}" if latest is not None else None,
+            inclusive="true",
+        )
+        if response["messages"]:
+            yield response["messages"]
+        cursor = response.get("response_metadata", {}).get("next_cursor")
+        if not cursor or not response.get("has_more"):
+            return
 
 async def retrieve_slack_user_name(user_id: str):
-    response = client.users_info(user=user_id)
+    response = await slack_api_call("users.info", user=user_id)
     return response["user"].get("real_name")
 
-async def send_slack_message(channel_id: str, message: str):
-    client.chat_postMessage(channel=channel_id, text=message)
+async def list_slack_users():
+    """Map every workspace member id to its real name via paginated `users.list`."""
+    names = {}
+    cursor = None
+    while True:
+        response = await slack_api_call("users.list", cursor=cursor, limit=200)
+        for member in response["members"]:
+            name = member.get("real_name") or member.get("profile", {}).get("real_name")
+            if name:
+                names[member["id"]] = name
+        cursor = response.get("response_metadata", {}).get("next_cursor")
+        if not cursor:
+            return names
+
+async def send_slack_message(channel_id: str, message: str, thread_ts: Optional[str] = None) -> str:
+    """Post a message (in `thread_ts`'s thread when given) and return its `ts`."""
+    data = await slack_api_call("chat.postMessage", http_method="POST", channel=channel_id, text=message, thread_ts=thread_ts)
+    return data["ts"]
+
+async def update_slack_message(channel_id: str, ts: str, message: str):
+    await slack_api_call("chat.update", http_method="POST", channel=channel_id, ts=ts, text=message)
 
 # async def get_channel_id(body: bytes):
 #     payload = slack_parser.parse_slash_payload(body)
@@ -34,4 +90,4 @@ async def send_slack_message(channel_id: str, message: str):
 
 # async def get_channel_name(body: bytes):
 #     payload = slack_parser.parse_slash_payload(body)
-#     return payload.get("channel_name")
\ No newline at end of file
+#     return payload.get("channel_name")
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from typing import Optional
+
+from src.app.core.config import settings
+from src.app.core.metrics import metrics
+from src.ingestion.connectors.http_client import get_client
+
+GRAPH_SCOPE = "https://graph.microsoft.com/.default"
+# Retry a failed renewal this often while the current token is still usable.
+RETRY_SECONDS = 30.0
+
+def client_credentials_configured() -> bool:
+    return bool(settings.TEAMS_CLIENT_ID and settings.TEAMS_CLIENT_SECRET and settings.TEAMS_TENANT_ID)
+
+class GraphTokenCache:
+    """
+    App-only Graph access token from the client-credentials flow. `start` keeps it renewed
+    in the background `refresh_margin` seconds before it expires, so callers of `get` only
+    wait on the token endpoint when there is no valid token at all (first use, or renewal
+    failing for the whole margin). Without client credentials, TEAMS_GRAPH_TOKEN is used as is.
+    """
+
+    def __init__(self, refresh_margin: float):
+        self.refresh_margin = refresh_margin
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def _valid(self) -> bool:
+        return self._token is not None and time.time() < self._expires_at - 30
+
+    async def get(self) -> Optional[str]:
+        if not client_credentials_configured():
+            return settings.TEAMS_GRAPH_TOKEN
+        if not self._valid():
+            async with self._lock:
+                if not self._valid():
+                    await self._acquire()
+        return self._token
+
+    async def _acquire(self):
+        url = f"{settings.GRAPH_LOGIN_URL.rstrip('/')}/{settings.TEAMS_TENANT_ID}/oauth2/v2.0/token"
+        resp = await get_client("teams").post(url, data={
+            "grant_type": "client_credentials",
+            "client_id": settings.TEAMS_CLIENT_ID,
+            "client_secret": settings.TEAMS_CLIENT_SECRET,
+            "scope": GRAPH_SCOPE,
+        })
+        if resp.status_code != 200:
+            metrics.inc("aftermath_graph_token_requests_total", outcome="error")
+            raise RuntimeError(f"Graph token request failed: {resp.status_code} - {resp.text}")
+        data = resp.json()
+        self._token = data["access_token"]
+        self._expires_at = time.time() + float(data.get("expires_in", 3599))
+        metrics.inc("aftermath_graph_token_requests_total", outcome="ok")
+
+    async def start(self):
+        if client_credentials_configured():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                async with self._lock:
+                    await self._acquire()
+                delay = self._expires_at - time.time() - self.refresh_margin
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error renewing the Graph token: {e}")
+                delay = RETRY_SECONDS
+            await asyncio.sleep(max(delay, RETRY_SECONDS))
+
+graph_tokens = GraphTokenCache(settings.TEAMS_TOKEN_REFRESH_MARGIN_SECONDS)
@@ -1,42 +1,219 @@
-import os
-import requests
+import asyncio
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional
 from fastapi import Request
 from src.app.core.config import settings
+from src.ingestion.connectors.http_client import get_client
+from src.ingestion.connectors.teams_auth import graph_tokens
+from src.ingestion.parsers.timestamps import parse_iso_timestamp
 
-TEAMS_CLIENT_ID = os.environ.get("TEAMS_CLIENT_ID")
-TEAMS_CLIENT_SECRET = os.environ.get("TEAMS_CLIENT_SECRET")
-TEAMS_TENANT_ID = os.environ.get("TEAMS_TENANT_ID")
-GRAPH_BASE = "https://graph.microsoft.com/v1.0"
+GRAPH_BASE = settings.GRAPH_API_URL.rstrip("/")
+GRAPH_BATCH_LIMIT = 20
+GRAPH_PAGE_LIMIT = 50
+
+class DeltaExpired(Exception):
+    """Graph no longer accepts a deltaLink; the channel has to be read again."""
 
 def verify_teams_request(request: Request, body: bytes):
     return True
 
-async def retrieve_teams_chat_history(channel_id: str):
-    token = os.environ.get("TEAMS_GRAPH_TOKEN")
+async def _headers() -> Dict[str, str]:
+    token = await graph_tokens.get()
     if not token:
-        raise RuntimeError("TEAMS_GRAPH_TOKEN is not set - implement auth using MSAL.")
-    headers = {"Authorization": f"Bearer {token}"}
-    url = f"{GRAPH_BASE}/teams/{channel_id}/channels/{channel_id}/messages"
-    resp = requests.get(url, headers=headers)
-    resp.raise_for_status()
-    return resp.json().get("value", [])
+        raise RuntimeError("Teams is not configured: set TEAMS_CLIENT_ID/TEAMS_CLIENT_SECRET/TEAMS_TENANT_ID or TEAMS_GRAPH_TOKEN.")
+    return {"Authorization": f"Bearer {token}"}
 
-async def retrieve_teams_user_name(user_id: str):
-    token = os.environ.get("TEAMS_GRAPH_TOKEN")
-    if not token:
-        return "Unknown"
-    headers = {"Authorization": f"Bearer {token}"}
+def _messages_url(channel_id: str) -> str:
+    return f"{GRAPH_BASE}/teams/{channel_id}/channels/{channel_id}/messages"
+
+async def graph_batch(requests: List[dict]) -> Dict[str, dict]:
+    """
+    Send Graph requests (`id`, `method`, `url` relative to the API root) as concurrent JSON
+    `$batch`es of up to 20 and return the responses by id. Requests throttled inside a batch are sent again
+    after their Retry-After, up to HTTP_RATE_LIMIT_MAX_RETRIES times.
+    """
+    headers = {**await _headers(), "Content-Type": "application/json"}
+    responses: Dict[str, dict] = {}
+
+    async def send(chunk: List[dict]) -> List[dict]:
+        resp = await get_client("teams").post(f"{GRAPH_BASE}/$batch", headers=headers, json={"requests": chunk})
+        resp.raise_for_status()
+        return resp.json().get("responses", [])
+
+    pending = list(requests)
+    for attempt in range(settings.HTTP_RATE_LIMIT_MAX_RETRIES + 1):
+        chunks = [pending[start:start + GRAPH_BATCH_LIMIT] for start in range(0, len(pending), GRAPH_BATCH_LIMIT)]
+        by_id = {item["id"]: item for item in pending}
+        throttled, wait = [], 0.0
+        for results in await asyncio.gather(*(send(chunk) for chunk in chunks)):
+            for item in results:
+                if item.get("status") == 429 and attempt < settings.HTTP_RATE_LIMIT_MAX_RETRIES:
+                    throttled.append(by_id[item["id"]])
+                    retry_after = {k.lower(): v for k, v in (item.get("headers") or {}).items()}.get("retry-after")
+                    wait = max(wait, float(retry_after or 1))
+                else:
+                    responses[item["id"]] = item
+        if not throttled:
+            break
+        print(f"Graph throttled {len(throttled)} batched requests; retrying in {wait:.1f}s.")
+        await asyncio.sleep(min(wait, settings.HTTP_RATE_LIMIT_MAX_WAIT_SECONDS))
+        pending = throttled
+    return responses
+
+async def fetch_teams_replies(channel_id: str, message_ids: List[str]) -> List[dict]:
+    """Replies in the threads of `message_ids`, twenty threads per `$batch`."""
+    if not message_ids:
+        return []
+    path = f"/teams/{channel_id}/channels/{channel_id}/messages"
+    responses = await graph_batch([
+        {"id": str(i), "method": "GET", "url": f"{path}/{message_id}/replies?$top={GRAPH_PAGE_LIMIT}"}
+        for i, message_id in enumerate(message_ids)
+    ])
+    replies = []
+    for i, message_id in enumerate(message_ids):
+        item = responses.get(str(i))
+        if item is None or item.get("status") != 200:
+            print(f"Could not read the replies to Teams message {message_id}: {item and item.get('status')}")
+            continue
+        body = item.get("body") or {}
+        replies.extend(body.get("value", []))
+        url = body.get("@odata.nextLink")
+        # Threads longer than a page continue outside the batch.
+        while url:
+            resp = await get_client("teams").get(url, headers=await _headers())
+            resp.raise_for_status()
+            data = resp.json()
+            replies.extend(data.get("value", []))
+            url = data.get("@odata.nextLink")
+    return replies
+
+async def _with_replies(channel_id: str, messages: List[dict]) -> List[dict]:
+    if not settings.TEAMS_FETCH_REPLIES:
+        return messages
+    roots = [msg["id"] for msg in messages if not msg.get("replyToId") and not is_removed(msg)]
+    return messages + await fetch_teams_replies(channel_id, roots)
+
+def is_removed(msg: dict) -> bool:
+    """Deleted messages come back from delta reads with `deletedDateTime` (or `@removed`) set."""
+    return bool(msg.get("deletedDateTime") or msg.get("@removed"))
+
+async def iter_teams_chat_history(channel_id: str, oldest: Optional[float] = None, latest: Optional[float] = None) -> AsyncIterator[List[dict]]:
+    """
+    Yield pages of channel messages inside the [oldest, latest] window, following `@odata.nextLink`.
+    Graph cannot filter channel messages by date, so the window is applied here and paging stops
+    once a whole page was last modified before `oldest`.
+    """
+    headers = await _headers()
+    url = _messages_url(channel_id)
+    params = {"$top": min(settings.HISTORY_PAGE_SIZE, GRAPH_PAGE_LIMIT)}
+    while url:
+        resp = await get_client("teams").get(url, headers=headers, params=params)
+        resp.raise_for_status()
+        data = resp.json()
+        messages = data.get("value", [])
+        in_window = [msg for msg in messages if _in_window(msg.get("createdDateTime"), oldest, latest)]
+        if in_window:
+            # Replies written after `latest` stay out like late root messages.
+            yield [msg for msg in await _with_replies(channel_id, in_window) if _in_window(msg.get("createdDateTime"), oldest, latest)]
+        if oldest is not None and messages and all(
+            (parse_iso_timestamp(msg.get("lastModifiedDateTime") or msg.get("createdDateTime")) or 0.0) < oldest for msg in messages
+        ):
+            return
+        url = data.get("@odata.nextLink")
+        # nextLink already carries the query string.
+        params = None
+
+class ChannelDelta:
+    """
+    One round of a channel-messages delta query: the changes since `resume_link` (a deltaLink
+    from an earlier round) or, without one, every root message modified since `since`. Pages
+    (with the replies of their threads) are yielded as they arrive; once the last one is read,
+    `delta_link` holds the cursor for the next round.
+    """
+
+    def __init__(self, channel_id: str, since: Optional[float] = None, resume_link: Optional[str] = None):
+        self.channel_id = channel_id
+        self.since = since
+        self.resume_link = resume_link
+        self.delta_link: Optional[str] = None
+
+    async def pages(self) -> AsyncIterator[List[dict]]:
+        headers = await _headers()
+        if self.resume_link:
+            url, params = self.resume_link, None
+        else:
+            url = f"{_messages_url(self.channel_id)}/delta"
+            params = {"$top": min(settings.HISTORY_PAGE_SIZE, GRAPH_PAGE_LIMIT)}
+            if self.since is not None:
+                params["$filter"] = f"lastModifiedDateTime gt {_iso(self.since)}"
+        first = True
+        while url:
+            resp = await get_client("teams").get(url, headers=headers, params=params)
+            if first and self.resume_link and (resp.status_code == 410 or (resp.status_code == 400 and "sync" in resp.text.lower())):
+                raise DeltaExpired(f"{resp.status_code} - {resp.text}")
+            resp.raise_for_status()
+            first = False
+            data = resp.json()
+            messages = data.get("value", [])
+            if messages:
+                yield await _with_replies(self.channel_id, messages)
+            url = data.get("@odata.nextLink")
+            params = None
+            if data.get("@odata.deltaLink"):
+                self.delta_link = data["@odata.deltaLink"]
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def teams_message_in_window(msg: dict, oldest: Optional[float], latest: Optional[float]) -> bool:
+    return _in_window(msg.get("createdDateTime"), oldest, latest)
+
+def _in_window(value: Optional[str], oldest: Optional[float], latest: Optional[float]) -> bool:
+    ts = parse_iso_timestamp(value) or 0.0
+    return (oldest is None or ts >= oldest) and (latest is None or ts <= latest)
+
+async def retrieve_teams_user_name(user_id: str) -> Optional[str]:
+    try:
+        headers = await _headers()
+    except RuntimeError:
+        return None
     url = f"{GRAPH_BASE}/users/{user_id}"
-    resp = requests.get(url, headers=headers)
+    resp = await get_client("teams").get(url, headers=headers)
     if resp.status_code != 200:
-        return "Unknown"
+        return None
     return resp.json().get("displayName")
 
-async def send_teams_message(channel_id: str, message: str):
-    token = os.environ.get("TEAMS_GRAPH_TOKEN")
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+async def retrieve_teams_user_names(user_ids: List[str]) -> Dict[str, str]:
+    """Resolve many users at once, folding up to 20 `GET /users/{id}` calls into each Graph `$batch`."""
+    if not await graph_tokens.get():
+        return {}
+    responses = await graph_batch([
+        {"id": str(i), "method": "GET", "url": f"/users/{user_id}?$select=id,displayName"}
+        for i, user_id in enumerate(user_ids)
+    ])
+    names = {}
+    for i, user_id in enumerate(user_ids):
+        item = responses.get(str(i))
+        name = item and item.get("status") == 200 and (item.get("body") or {}).get("displayName")
+        if name:
+            names[user_id] = name
+    return names
+
+async def send_teams_message(channel_id: str, message: str, reply_to: Optional[str] = None):
+    """Post a channel message, or a reply in `reply_to`'s thread when given."""
+    headers = {**await _headers(), "Content-Type": "application/json"}
     url = f"{GRAPH_BASE}/teams/{channel_id}/channels/{channel_id}/messages"
+    if reply_to:
+        url = f"{url}/{reply_to}/replies"
     payload = {"body": {"content": message}}
-    resp = requests.post(url, headers=headers, json=payload)
+    resp = await get_client("teams").post(url, headers=headers, json=payload)
     resp.raise_for_status()
     return resp.json()
+
+async def update_teams_message(channel_id: str, message_id: str, message: str, reply_to: Optional[str] = None):
+    """Patch a channel message (or a reply to `reply_to`) in place."""
+    headers = {**await _headers(), "Content-Type": "application/json"}
+    url = f"{GRAPH_BASE}/teams/{channel_id}/channels/{channel_id}/messages"
+    url = f"{url}/{reply_to}/replies/{message_id}" if reply_to else f"{url}/{message_id}"
+    resp = await get_client("teams").patch(url, headers=headers, json={"body": {"content": message}})
+    resp.raise_for_status()
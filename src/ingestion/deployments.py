@@ -0,0 +1,172 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from src.app.core.config import settings
+from src.app.core.metrics import metrics
+from src.ingestion.connectors import github_connector, jenkins_connector
+from src.ingestion.connectors.rate_limit import PRIORITY_BACKGROUND, outbound_priority
+from src.ingestion.parsers.timestamps import parse_iso_timestamp
+
+@dataclass
+class Deployment:
+    """A GitHub Actions run or a Jenkins build, as the poller last saw it."""
+    provider: str
+    id: str
+    name: str
+    status: str
+    started_at: float
+    finished_at: Optional[float] = None  # None while running
+    commit: Optional[str] = None
+    details: Dict = field(default_factory=dict, repr=False)  # the run / build as listed
+    jobs: Optional[List[dict]] = field(default=None, repr=False)  # GitHub: the run's jobs and steps
+
+    @property
+    def completed(self) -> bool:
+        return self.finished_at is not None
+
+    def overlaps(self, window: Tuple[float, float]) -> bool:
+        oldest, latest = window
+        return self.started_at <= latest and (self.finished_at or latest) >= oldest
+
+def github_deployment(run: dict) -> Deployment:
+    started = parse_iso_timestamp(run.get("run_started_at") or run.get("created_at")) or 0.0
+    completed = run.get("status") == "completed"
+    return Deployment(
+        provider="github",
+        id=str(run["id"]),
+        name=f"{run.get('name') or 'run'} #{run.get('run_number') or run['id']}",
+        status=(run.get("conclusion") or "completed") if completed else run.get("status") or "queued",
+        started_at=started,
+        finished_at=(parse_iso_timestamp(run.get("updated_at")) or started) if completed else None,
+        commit=run.get("head_sha"),
+        details=run,
+    )
+
+def jenkins_deployment(build: dict) -> Deployment:
+    started = (build.get("timestamp") or 0) / 1000
+    commit = next(
+        (action["lastBuiltRevision"].get("SHA1") for action in build.get("actions") or []
+         if action and action.get("lastBuiltRevision")),
+        None,
+    )
+    return Deployment(
+        provider="jenkins",
+        id=str(build["number"]),
+        name=f"#{build['number']}",
+        status="running" if build.get("building") else (build.get("result") or "unknown").lower(),
+        started_at=started,
+        finished_at=None if build.get("building") else started + (build.get("duration") or 0) / 1000,
+        commit=commit,
+        details=build,
+    )
+
+class DeploymentIndex:
+    """
+    The newest deployments per provider, newest first, replaced on every successful poll.
+    A provider that has not been polled within `max_age` seconds has no index, and callers
+    fall back to asking the API.
+    """
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self._deployments: Dict[str, List[Deployment]] = {}
+        self._polled_at: Dict[str, float] = {}
+
+    def replace(self, provider: str, deployments: List[Deployment]):
+        self._deployments[provider] = sorted(deployments, key=lambda d: d.started_at, reverse=True)
+        self._polled_at[provider] = time.time()
+        metrics.set("aftermath_deployment_index_size", len(deployments), provider=provider)
+
+    def get(self, provider: str) -> Optional[List[Deployment]]:
+        polled_at = self._polled_at.get(provider)
+        if polled_at is None or time.time() - polled_at > self.max_age:
+            return None
+        return self._deployments[provider]
+
+    def select(self, provider: str, window: Tuple[float, float], limit: int) -> Optional[List[Deployment]]:
+        """
+        The newest `limit` deployments overlapping `window`, or else the last one that started
+        before it; None when the provider has no fresh index.
+        """
+        deployments = self.get(provider)
+        if deployments is None:
+            metrics.inc("aftermath_deployment_lookups_total", provider=provider, result="fallback")
+            return None
+        metrics.inc("aftermath_deployment_lookups_total", provider=provider, result="index")
+        started = [d for d in deployments if d.started_at <= window[1]]
+        overlapping = [d for d in started if d.overlaps(window)]
+        return overlapping[:limit] if overlapping else started[:1]
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            provider: {"deployments": len(deployments), "polled_at": self._polled_at[provider]}
+            for provider, deployments in self._deployments.items()
+        }
+
+class DeploymentPoller:
+    """Refreshes the index every `interval` seconds from whichever CI providers are configured."""
+
+    def __init__(self, index: DeploymentIndex, interval: float, size: int):
+        self.index = index
+        self.interval = interval
+        self.size = size
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        polls = []
+        if github_connector.github_configured():
+            polls.append(("github", self.poll_github))
+        if jenkins_connector.jenkins_configured():
+            polls.append(("jenkins", self.poll_jenkins))
+        if not polls:
+            return
+        with outbound_priority(PRIORITY_BACKGROUND):
+            while True:
+                await asyncio.gather(*(self._poll(provider, poll) for provider, poll in polls))
+                await asyncio.sleep(self.interval)
+
+    async def _poll(self, provider: str, poll):
+        try:
+            self.index.replace(provider, await poll())
+            metrics.inc("aftermath_deployment_polls_total", provider=provider, outcome="ok")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error polling {provider} deployments: {e}")
+            metrics.inc("aftermath_deployment_polls_total", provider=provider, outcome="error")
+
+    async def poll_github(self) -> List[Deployment]:
+        runs = await github_connector.list_workflow_runs(per_page=self.size, status=None)
+        known = {d.id: d for d in self.index._deployments.get("github", [])}
+        deployments = [github_deployment(run) for run in runs]
+
+        async def attach_jobs(deployment: Deployment):
+            previous = known.get(deployment.id)
+            if previous is not None and previous.completed and previous.jobs is not None:
+                # A completed run's jobs never change.
+                deployment.jobs = previous.jobs
+            else:
+                deployment.jobs = await github_connector.list_run_jobs(deployment.details)
+
+        results = await asyncio.gather(*(attach_jobs(d) for d in deployments), return_exceptions=True)
+        for deployment, result in zip(deployments, results):
+            if isinstance(result, BaseException):
+                print(f"Error listing the jobs of GitHub run {deployment.id}: {result}")
+        return deployments
+
+    async def poll_jenkins(self) -> List[Deployment]:
+        return [jenkins_deployment(build) for build in await jenkins_connector.list_jenkins_builds(self.size)]
+
+deployment_index = DeploymentIndex(max_age=3 * settings.DEPLOYMENT_POLL_INTERVAL_SECONDS)
+deployment_poller = DeploymentPoller(deployment_index, settings.DEPLOYMENT_POLL_INTERVAL_SECONDS, settings.DEPLOYMENT_INDEX_SIZE)
@@ -0,0 +1,108 @@
+import codecs
+import os
+import re
+import tempfile
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+import httpx
+
+from src.app.core.config import settings
+from src.ingestion.parsers.timestamps import parse_iso_timestamp
+
+CHUNK_SIZE = 64 * 1024
+# GitHub prefixes every line with an ISO timestamp; Jenkins' timestamper plugin wraps one in brackets.
+LINE_TIMESTAMP = re.compile(r"^\[?(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?)\]?\s?")
+
+def parse_line_timestamp(line: str) -> Optional[float]:
+    match = LINE_TIMESTAMP.match(line)
+    return parse_iso_timestamp(match.group(1)) if match else None
+
+class LogStream:
+    """
+    A deployment log downloaded chunk by chunk into a SpooledTemporaryFile, which
+    stays in memory below LOG_SPOOL_THRESHOLD_BYTES and rolls over to disk past it.
+
+    Reading is lazy via `iter_lines()`. With `tail_bytes` only the last bytes are
+    read back; with `window` only lines stamped inside (start, end) are, untimed
+    lines inheriting the timestamp of the line before them. Given an open binary
+    `file` (a cached log), the stream reads it in place instead of spooling.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        tail_bytes: Optional[int] = None,
+        window: Optional[Tuple[float, float]] = None,
+        spool_threshold: Optional[int] = None,
+        file: Optional[BinaryIO] = None,
+    ):
+        self.name = name
+        self.label = name.upper()
+        self.tail_bytes = tail_bytes
+        self.window = window
+        self.size = 0
+        self.partial = False
+        if file is not None:
+            self._file = file
+            self.size = os.fstat(file.fileno()).st_size
+        else:
+            self._file = tempfile.SpooledTemporaryFile(
+                max_size=spool_threshold or settings.LOG_SPOOL_THRESHOLD_BYTES, mode="w+b"
+            )
+
+    def write(self, chunk: bytes):
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    async def consume(self, response: httpx.Response):
+        """Copy a streamed response body into the spool; 206 responses mark the log as partial."""
+        if response.status_code == 206:
+            self.partial = True
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            self.write(chunk)
+
+    def iter_lines(self) -> Iterator[str]:
+        start = 0
+        if self.tail_bytes and self.size > self.tail_bytes:
+            start = self.size - self.tail_bytes
+        self._file.seek(start)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        buffered = ""
+        skip_first = start > 0 or self.partial
+        current_ts = None
+        while True:
+            chunk = self._file.read(CHUNK_SIZE)
+            buffered += decoder.decode(chunk, final=not chunk)
+            lines = buffered.split("\n")
+            if chunk:
+                buffered = lines.pop()
+            elif lines and lines[-1] == "":
+                lines.pop()
+            for line in lines:
+                if skip_first:
+                    # Mid-line cut from the tail offset or a ranged download.
+                    skip_first = False
+                    continue
+                line = line.rstrip("\r")
+                if self.window:
+                    current_ts = parse_line_timestamp(line) or current_ts
+                    if current_ts is not None and not (self.window[0] <= current_ts <= self.window[1]):
+                        continue
+                yield line
+            if not chunk:
+                return
+
+    def close(self):
+        self._file.close()
+
+def new_log_stream(
+    name: str, window: Optional[Tuple[float, float]] = None, file: Optional[BinaryIO] = None
+) -> LogStream:
+    """Build a LogStream configured by LOG_EXTRACT_MODE (full | tail | window)."""
+    mode = settings.LOG_EXTRACT_MODE
+    if mode == "window" and window:
+        padded = (window[0] - settings.LOG_WINDOW_PADDING_SECONDS, window[1])
+        return LogStream(name, window=padded, file=file)
+    if mode == "tail":
+        return LogStream(name, tail_bytes=settings.LOG_TAIL_BYTES, file=file)
+    return LogStream(name, file=file)
@@ -0,0 +1,139 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Union
+
+from src.app.core.config import settings
+from src.app.core.models import Conversation, Message
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    platform TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    username TEXT NOT NULL,
+    text TEXT NOT NULL,
+    ts REAL NOT NULL,
+    source TEXT,
+    is_bot INTEGER NOT NULL DEFAULT 0,
+    is_system INTEGER NOT NULL DEFAULT 0,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (platform, channel_id, message_id)
+);
+CREATE INDEX IF NOT EXISTS messages_channel_ts ON messages (platform, channel_id, ts);
+CREATE TABLE IF NOT EXISTS marks (
+    platform TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    mark TEXT NOT NULL,
+    mark_ts REAL NOT NULL,
+    covered_from REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (platform, channel_id)
+);
+"""
+
+class MessageStore:
+    """
+    Local copy of channel history keyed by platform and channel.
+
+    Each channel has a high-water mark (the platform-native cursor of the newest
+    stored message, plus its epoch time) and `covered_from`, the oldest time from
+    which the stored history is known to be complete.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(messages)")}
+            for column in ("is_bot", "is_system"):
+                if column not in columns:
+                    # Stores created before bot/system flags were tracked.
+                    conn.execute(f"ALTER TABLE messages ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+            self._conn = conn
+        return self._conn
+
+    def get_mark(self, platform: str, channel_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT mark, mark_ts, covered_from FROM marks WHERE platform = ? AND channel_id = ?",
+                (platform, channel_id),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def set_mark(self, platform: str, channel_id: str, mark: str, mark_ts: float, covered_from: float):
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO marks (platform, channel_id, mark, mark_ts, covered_from, updated_at) VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (platform, channel_id) DO UPDATE SET mark = excluded.mark, mark_ts = excluded.mark_ts,"
+                " covered_from = excluded.covered_from, updated_at = excluded.updated_at",
+                (platform, channel_id, mark, mark_ts, covered_from, time.time()),
+            )
+
+    def upsert(self, platform: str, channel_id: str, messages: Union[Conversation, Iterable[Message]]):
+        if not isinstance(messages, Conversation):
+            messages = Conversation.from_messages(messages)
+        rows = [
+            (platform, channel_id, message_id, user_id, username, text, ts, source, int(is_bot), int(is_system))
+            for user_id, username, text, ts, source, message_id, is_bot, is_system in messages.rows() if message_id
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self.conn.executemany(
+                "INSERT INTO messages (platform, channel_id, message_id, user_id, username, text, ts, source, is_bot, is_system, deleted)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)"
+                " ON CONFLICT (platform, channel_id, message_id) DO UPDATE SET user_id = excluded.user_id,"
+                " username = excluded.username, text = excluded.text, ts = excluded.ts, source = excluded.source,"
+                " is_bot = excluded.is_bot, is_system = excluded.is_system, deleted = 0",
+                rows,
+            )
+
+    def mark_deleted(self, platform: str, channel_id: str, message_ids: Iterable[str]):
+        rows = [(platform, channel_id, message_id) for message_id in message_ids]
+        if not rows:
+            return
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE messages SET deleted = 1 WHERE platform = ? AND channel_id = ? AND message_id = ?",
+                rows,
+            )
+
+    def message_ids(self, platform: str, channel_id: str, oldest: float, latest: float) -> List[str]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT message_id FROM messages WHERE platform = ? AND channel_id = ? AND deleted = 0 AND ts >= ? AND ts <= ?",
+                (platform, channel_id, oldest, latest),
+            ).fetchall()
+        return [row["message_id"] for row in rows]
+
+    def load(self, platform: str, channel_id: str, oldest: float, latest: float) -> Conversation:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT user_id, username, text, ts, source, message_id, is_bot, is_system FROM messages"
+                " WHERE platform = ? AND channel_id = ? AND deleted = 0 AND ts >= ? AND ts <= ? ORDER BY ts",
+                (platform, channel_id, oldest, latest),
+            ).fetchall()
+        return Conversation.from_rows(tuple(row) for row in rows)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+message_store = MessageStore(settings.MESSAGE_STORE_PATH)
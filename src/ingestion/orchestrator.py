@@ -0,0 +1,192 @@
+import asyncio
+import inspect
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from src.app.core.config import settings
+from src.app.core.metrics import metrics
+from src.app.core.models import Conversation, Incident
+
+# Pipeline stage each source kind is timed under.
+SOURCE_STAGES = {"conversation": "history_fetch", "trigger_user": "name_resolution", "deployment_logs": "log_fetch"}
+
+@dataclass
+class IngestionRequest:
+    platform: str
+    channel_id: str
+    user_id: str
+    channel_name: str = ""
+    trigger_platform: Optional[str] = None
+    oldest: Optional[float] = None
+    latest: Optional[float] = None
+
+    def window(self) -> Tuple[float, float]:
+        """Incident window in epoch seconds; defaults to the lookback period before the trigger."""
+        latest = self.latest or time.time()
+        oldest = self.oldest or latest - settings.INCIDENT_LOOKBACK_HOURS * 3600
+        return oldest, latest
+
+@dataclass
+class ContextSource:
+    """
+    A unit of incident context fetched concurrently with all the others.
+
+    `fetch` may be a coroutine function or an async generator; items streamed
+    by a generator before its deadline are kept even if it does not finish.
+
+    `kind` decides how the result lands in the `Incident`:
+      conversation    -> Conversation chunks (or single Messages) added to the conversation
+      trigger_user    -> display name of the user who triggered the report
+      deployment_logs -> a LogStream, a list of them (one per CI job) or plain text, shown
+                         under a `--- {label} ---` header
+    """
+    name: str
+    kind: str
+    fetch: Callable[[IngestionRequest], Awaitable[Any]]
+    deadline: float
+    platforms: Optional[Set[str]] = None
+    label: Optional[str] = None
+
+@dataclass
+class IngestionResult:
+    results: Dict[str, Any] = field(default_factory=dict)
+    late: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    durations: Dict[str, float] = field(default_factory=dict)
+
+class IngestionOrchestrator:
+    def __init__(self, overall_deadline: float, default_source_deadline: float):
+        self.overall_deadline = overall_deadline
+        self.default_source_deadline = default_source_deadline
+        self._sources: Dict[str, ContextSource] = {}
+
+    def register(
+        self,
+        name: str,
+        kind: str,
+        fetch: Callable[[IngestionRequest], Awaitable[Any]],
+        deadline: Optional[float] = None,
+        platforms: Optional[Set[str]] = None,
+        label: Optional[str] = None,
+    ):
+        if deadline is None:
+            deadline = settings.INGESTION_SOURCE_DEADLINES.get(name, self.default_source_deadline)
+        self._sources[name] = ContextSource(name, kind, fetch, deadline, platforms, label)
+
+    def sources_for(self, platform: str) -> List[ContextSource]:
+        return [s for s in self._sources.values() if s.platforms is None or platform in s.platforms]
+
+    async def gather(self, request: IngestionRequest) -> IngestionResult:
+        result = IngestionResult()
+        sources = self.sources_for(request.platform)
+        started = time.monotonic()
+
+        async def collect(source: ContextSource):
+            items = result.results.setdefault(source.name, Conversation() if source.kind == "conversation" else [])
+            async for item in source.fetch(request):
+                if isinstance(item, Conversation):
+                    items.extend(item)
+                else:
+                    items.append(item)
+                if len(items) >= settings.HISTORY_MAX_MESSAGES:
+                    print(f"Source {source.name} hit HISTORY_MAX_MESSAGES, stopping early.")
+                    break
+            return items
+
+        async def run(source: ContextSource):
+            try:
+                fetch = collect(source) if inspect.isasyncgenfunction(source.fetch) else source.fetch(request)
+                with metrics.stage(SOURCE_STAGES.get(source.kind, source.kind), source=source.name):
+                    return await asyncio.wait_for(fetch, timeout=source.deadline)
+            finally:
+                result.durations[source.name] = time.monotonic() - started
+
+        tasks = {asyncio.create_task(run(source)): source for source in sources}
+        if not tasks:
+            return result
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=self.overall_deadline)
+        except asyncio.CancelledError:
+            # Shutdown: don't leave source fetches running against clients about to close.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        for task in pending:
+            task.cancel()
+            result.late.append(tasks[task].name)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        for task in done:
+            name = tasks[task].name
+            try:
+                result.results[name] = task.result()
+            except asyncio.TimeoutError:
+                result.late.append(name)
+            except Exception as e:
+                result.failed[name] = f"{type(e).__name__}: {e}"
+
+        if result.late or result.failed:
+            print(f"Ingestion for {request.platform}:{request.channel_id} incomplete - late: {result.late}, failed: {list(result.failed)}")
+        return result
+
+    async def build_incident(self, request: IngestionRequest) -> Incident:
+        result = await self.gather(request)
+
+        conversation = Conversation()
+        trigger_user_name = None
+        log_parts = []
+        log_streams = []
+        for source in self.sources_for(request.platform):
+            value = result.results.get(source.name)
+            if not value:
+                continue
+            if source.kind == "conversation":
+                conversation.extend(value)
+            elif source.kind == "trigger_user":
+                trigger_user_name = value
+            elif source.kind == "deployment_logs" and isinstance(value, str):
+                log_parts.append(f"--- {source.label or source.name.upper()} ---\n{value}")
+            elif source.kind == "deployment_logs" and isinstance(value, list):
+                for stream in value:
+                    stream.label = f"{source.label or source.name.upper()}: {stream.name}"
+                    log_streams.append(stream)
+            elif source.kind == "deployment_logs":
+                value.label = source.label or source.name.upper()
+                log_streams.append(value)
+        conversation.sort()
+
+        return Incident(
+            incident_id=str(uuid.uuid4()),
+            channel_id=request.channel_id,
+            triggered_by_user_id=request.user_id,
+            triggered_by_user_name=trigger_user_name or "Unknown",
+            channel_name=request.channel_name or "",
+            conversation=conversation,
+            deployment_logs="\n\n".join(log_parts) or None,
+            log_streams=log_streams,
+            source=request.platform,
+            trigger_platform=request.trigger_platform,
+            late_sources=sorted(result.late),
+            failed_sources=result.failed,
+        )
+
+orchestrator = IngestionOrchestrator(
+    overall_deadline=settings.INGESTION_DEADLINE_SECONDS,
+    default_source_deadline=settings.INGESTION_SOURCE_DEADLINE_SECONDS,
+)
+
+def _register_sources():
+    from src.ingestion import sources
+
+    orchestrator.register("slack_conversation", "conversation", sources.fetch_slack_conversation, platforms={"slack"})
+    orchestrator.register("discord_conversation", "conversation", sources.fetch_discord_conversation, platforms={"discord"})
+    orchestrator.register("teams_conversation", "conversation", sources.fetch_teams_conversation, platforms={"teams"})
+    orchestrator.register("trigger_user", "trigger_user", sources.fetch_trigger_user_name)
+    orchestrator.register("github_logs", "deployment_logs", sources.fetch_github_logs, label="GITHUB ACTION LOGS")
+    orchestrator.register("jenkins_logs", "deployment_logs", sources.fetch_jenkins_logs, label="JENKINS BUILD LOGS")
+
+_register_sources()
@@ -1,3 +1,5 @@
 from .slack_parser import parse_slash_payload
 from .discord_parser import parse_interaction_payload
 from .teams_parser import parse_trigger_payload
+from .log_reducer import reduce_logs
+from .context_builder import build_context
@@ -1,10 +1,279 @@
-from typing import List, Dict
-
-def build_conversation_context(messages: List[Dict]) -> str:
-    lines = []
-    for msg in messages:
-        ts = msg.get("timestamp", "")
-        user = msg.get("user_id", "unknown")
-        text = msg.get("text", "")
-        lines.append(f"[{user}]: {text}")
+import hashlib
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.app.core.config import settings
+from src.app.core.models import Incident, Message
+from src.ingestion.parsers.log_reducer import is_signal, mask_line
+from src.llm.tokens import count_tokens, truncate_to_tokens
+
+SECTIONS = ("metadata", "conversation", "deployment_logs")
+HEADERS = {
+    "metadata": "--- INCIDENT ---",
+    "conversation": "--- CONVERSATION ---",
+    "deployment_logs": "--- DEPLOYMENT LOGS ---",
+}
+# "14:32", "2:05pm", "3 pm", ISO timestamps: messages pinning events to a time anchor the timeline.
+TIME_REFERENCE = re.compile(
+    r"\b\d{1,2}:\d{2}(?::\d{2})?\b|\b\d{1,2}\s?(?:am|pm)\b|\b\d{4}-\d{2}-\d{2}[t ]\d{2}:\d{2}",
+    re.IGNORECASE,
+)
+WHITESPACE = re.compile(r"\s+")
+# Approximate cost of one "... N messages omitted ..." line.
+GAP_MARKER_TOKENS = 12
+
+@dataclass
+class ContextSection:
+    name: str
+    text: str = ""
+    tokens: int = 0
+    budget: int = 0
+    items_total: int = 0
+    items_kept: int = 0
+
+@dataclass
+class BuiltContext:
+    sections: Dict[str, ContextSection] = field(default_factory=dict)
+    budget: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(section.tokens for section in self.sections.values())
+
+    def render(self) -> str:
+        return "\n\n".join(
+            f"{HEADERS[name]}\n{self.sections[name].text}"
+            for name in SECTIONS if name in self.sections and self.sections[name].text
+        )
+
+    def usage(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {
+                "tokens": section.tokens,
+                "budget": section.budget,
+                "items_total": section.items_total,
+                "items_kept": section.items_kept,
+            }
+            for name, section in self.sections.items()
+        }
+
+    def report(self) -> str:
+        parts = [f"{name}={section.tokens}/{section.budget}" for name, section in self.sections.items()]
+        return f"Context tokens {self.total_tokens}/{self.budget}: " + ", ".join(parts)
+
+@dataclass
+class _Entry:
+    message: Message
+    line: str = ""
+    tokens: int = 0
+    score: float = 0.0
+    # Messages folded into this one: repeated pastes and runs of similar bot messages.
+    repeats: int = 1
+    bot_run: int = 1
+    bot_run_until: Optional[str] = None
+
+    @property
+    def folded(self) -> int:
+        return self.repeats + self.bot_run - 1
+
+def _normalize(text: str) -> str:
+    return WHITESPACE.sub(" ", text).strip().lower()
+
+def _paste_key(text: str) -> Optional[str]:
+    normalized = _normalize(text)
+    if len(normalized) < settings.CONTEXT_PASTE_MIN_CHARS:
+        return None
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+def _format_line(entry: _Entry, default_source: str) -> str:
+    msg = entry.message
+    notes = []
+    if entry.repeats > 1:
+        notes.append(f"pasted {entry.repeats}x")
+    if entry.bot_run > 1:
+        notes.append(f"+{entry.bot_run - 1} similar bot messages until {entry.bot_run_until}")
+    suffix = f" ({'; '.join(notes)})" if notes else ""
+    stamp = msg.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+    text = msg.text.replace("\n", " / ")
+    return f"[{stamp}] [{msg.source or default_source}] {msg.user_id} ({msg.username}): {text}{suffix}"
+
+def collapse_messages(messages: List[Message]) -> Tuple[List[_Entry], int]:
+    """
+    Chronological entries with system events dropped (their count is returned),
+    consecutive similar messages from the same bot folded into the first, and
+    repeated long pastes folded into their first occurrence.
+    """
+    entries: List[_Entry] = []
+    pastes: Dict[str, _Entry] = {}
+    system_events = 0
+    for msg in sorted(messages, key=lambda m: m.timestamp):
+        if msg.is_system:
+            system_events += 1
+            continue
+        if not msg.text.strip():
+            continue
+        previous = entries[-1] if entries else None
+        if (
+            msg.is_bot and previous is not None and previous.message.is_bot
+            and previous.message.user_id == msg.user_id
+            and mask_line(_normalize(previous.message.text)) == mask_line(_normalize(msg.text))
+        ):
+            previous.bot_run += 1
+            previous.bot_run_until = msg.timestamp.strftime("%H:%M:%S")
+            continue
+        key = _paste_key(msg.text)
+        if key is not None and key in pastes:
+            pastes[key].repeats += 1
+            continue
+        entry = _Entry(message=msg)
+        if key is not None:
+            pastes[key] = entry
+        entries.append(entry)
+    return entries, system_events
+
+def _score(entries: List[_Entry]):
+    """Recency (halving every CONTEXT_RECENT_WINDOW_SECONDS) plus bonuses for error talk,
+    explicit times and the opening message; bot output ranks lower."""
+    if not entries:
+        return
+    latest = entries[-1].message.timestamp.timestamp()
+    half_life = max(settings.CONTEXT_RECENT_WINDOW_SECONDS, 1.0)
+    for i, entry in enumerate(entries):
+        msg = entry.message
+        score = math.pow(0.5, (latest - msg.timestamp.timestamp()) / half_life)
+        if is_signal(msg.text):
+            score += 1.0
+        if TIME_REFERENCE.search(msg.text):
+            score += 1.0
+        if i == 0:
+            score += 2.0
+        if msg.is_bot:
+            score -= 0.5
+        entry.score = score
+
+def _select(entries: List[_Entry], budget: int) -> Set[int]:
+    """Greedy by score; each pick also pays for the change in "... omitted ..." markers it causes."""
+    if sum(entry.tokens for entry in entries) <= budget:
+        return set(range(len(entries)))
+    kept: Set[int] = set()
+    # Everything dropped starts as one gap.
+    used = GAP_MARKER_TOKENS
+    last = len(entries) - 1
+    for i in sorted(range(len(entries)), key=lambda i: entries[i].score, reverse=True):
+        left_closed = i == 0 or i - 1 in kept
+        right_closed = i == last or i + 1 in kept
+        markers = -1 if left_closed and right_closed else (1 if not left_closed and not right_closed else 0)
+        cost = entries[i].tokens + markers * GAP_MARKER_TOKENS
+        if used + cost <= budget:
+            kept.add(i)
+            used += cost
+    return kept
+
+def _conversation_section(
+    entries: List[_Entry], system_events: int, total: int, budget: int, model: Optional[str]
+) -> ContextSection:
+    section = ContextSection(name="conversation", budget=budget, items_total=total)
+    lines = [f"({system_events} join/leave/system events omitted)"] if system_events else []
+    kept = _select(entries, budget - sum(count_tokens(line, model) + 1 for line in lines))
+    omitted = 0
+    for i, entry in enumerate(entries):
+        if i not in kept:
+            omitted += entry.folded
+            continue
+        if omitted:
+            lines.append(f"... {omitted} messages omitted ...")
+            omitted = 0
+        lines.append(entry.line)
+        section.items_kept += entry.folded
+    if omitted:
+        lines.append(f"... {omitted} messages omitted ...")
+    section.text = "\n".join(lines)
+    section.tokens = count_tokens(section.text, model)
+    return section
+
+def _metadata_text(incident: Incident, entries: List[_Entry]) -> str:
+    lines = [
+        f"Incident: {incident.incident_id}",
+        f"Channel: #{incident.channel_name} ({incident.source or 'unknown'})",
+        f"Triggered by: {incident.triggered_by_user_name} ({incident.triggered_by_user_id})",
+    ]
+    if entries:
+        first = entries[0].message.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        last = entries[-1].message.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        lines.append(f"Conversation: {len(incident.conversation)} messages from {first} to {last}")
+    missing = incident.late_sources + list(incident.failed_sources)
+    if missing:
+        lines.append(f"Unavailable context (not fetched in time or failed): {', '.join(missing)}")
     return "\n".join(lines)
+
+def allocate_budget(budget: int, needs: Dict[str, int], shares: Optional[Dict[str, float]] = None) -> Dict[str, int]:
+    """
+    Split `budget` by `shares` (CONTEXT_SECTION_SHARES), then repeatedly hand what
+    sections do not need to the ones still short, in proportion to their shares.
+    """
+    shares = shares or settings.CONTEXT_SECTION_SHARES
+    names = list(needs)
+    weights = {name: max(shares.get(name, 0.0), 0.0) or 0.01 for name in names}
+    allocated = {name: 0 for name in names}
+    remaining = budget
+    short = [name for name in names if needs[name] > 0]
+    while remaining > 0 and short:
+        weight = sum(weights[name] for name in short)
+        grants = {name: int(remaining * weights[name] / weight) for name in short}
+        if not any(grants.values()):
+            grants[short[0]] = remaining
+        for name in short:
+            grant = min(grants[name], needs[name] - allocated[name])
+            allocated[name] += grant
+            remaining -= grant
+        short = [name for name in short if allocated[name] < needs[name]]
+    return allocated
+
+def build_context(
+    incident: Incident,
+    deployment_logs: Optional[str] = None,
+    budget: Optional[int] = None,
+    model: Optional[str] = None,
+) -> BuiltContext:
+    """
+    Assemble the prompt context within `budget` tokens (CONTEXT_TOKEN_BUDGET) across
+    metadata, conversation and deployment logs. Over budget, the conversation keeps
+    its best-scoring messages in chronological order with gap markers, and the logs
+    keep their tail.
+    """
+    budget = budget or settings.CONTEXT_TOKEN_BUDGET
+    default_source = incident.source or "unknown"
+    entries, system_events = collapse_messages(incident.conversation)
+    for entry in entries:
+        entry.line = _format_line(entry, default_source)
+        entry.tokens = count_tokens(entry.line, model) + 1
+        if entry.tokens > settings.CONTEXT_MESSAGE_MAX_TOKENS:
+            entry.line = truncate_to_tokens(entry.line, settings.CONTEXT_MESSAGE_MAX_TOKENS - 2, model) + " [...]"
+            entry.tokens = count_tokens(entry.line, model) + 1
+    _score(entries)
+
+    metadata = _metadata_text(incident, entries)
+    needs = {
+        "metadata": count_tokens(metadata, model),
+        "conversation": sum(entry.tokens for entry in entries) + (GAP_MARKER_TOKENS if system_events else 0),
+        "deployment_logs": count_tokens(deployment_logs, model) if deployment_logs else 0,
+    }
+    budgets = allocate_budget(budget, needs)
+
+    context = BuiltContext(budget=budget)
+    metadata = truncate_to_tokens(metadata, budgets["metadata"], model)
+    context.sections["metadata"] = ContextSection(
+        name="metadata", text=metadata, tokens=count_tokens(metadata, model), budget=budgets["metadata"],
+    )
+    context.sections["conversation"] = _conversation_section(
+        entries, system_events, len(incident.conversation), budgets["conversation"], model,
+    )
+    logs = truncate_to_tokens(deployment_logs or "", budgets["deployment_logs"], model, keep_tail=True)
+    logs_tokens = count_tokens(logs, model)
+    context.sections["deployment_logs"] = ContextSection(
+        name="deployment_logs", text=logs, tokens=logs_tokens, budget=budgets["deployment_logs"],
+        items_total=needs["deployment_logs"], items_kept=logs_tokens,
+    )
+    return context
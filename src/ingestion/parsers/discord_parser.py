@@ -1,4 +1,9 @@
-from typing import Dict
+import time
+from typing import Dict, List
+
+from src.app.core.models import Conversation, MessageRow
+from src.ingestion.parsers.severity import parse_severity
+from src.ingestion.parsers.timestamps import parse_iso_timestamp
 
 def parse_interaction_payload(payload: Dict) -> Dict:
     out = {}
@@ -7,4 +12,24 @@ def parse_interaction_payload(payload: Dict) -> Dict:
     out["user_id"] = user.get("id") or payload.get("author", {}).get("id")
     out["channel_name"] = payload.get("channel", {}).get("name") or ""
     out["trigger_platform"] = payload.get("trigger_platform", "discord_interaction")
+    options = (payload.get("data") or {}).get("options") or []
+    out["refresh"] = any(option.get("name") == "refresh" and option.get("value", True) for option in options)
+    out["severity"] = next((parse_severity(option.get("value")) for option in options if option.get("name") == "severity"), None)
     return out
+
+def _history_row(msg: Dict) -> MessageRow:
+    author = msg.get("author") or {}
+    return (
+        author.get("id", "unknown"),
+        author.get("username") or "Unknown",
+        msg.get("content", ""),
+        parse_iso_timestamp(msg.get("timestamp")) or time.time(),
+        "discord",
+        msg.get("id"),
+        bool(author.get("bot")),
+        # Anything but DEFAULT (0) and REPLY (19) is a system event such as a member join or pin.
+        msg.get("type", 0) not in (0, 19),
+    )
+
+def parse_history_page(page: List[Dict]) -> Conversation:
+    return Conversation.from_rows(map(_history_row, page))
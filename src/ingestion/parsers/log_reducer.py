@@ -0,0 +1,246 @@
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from src.app.core.config import settings
+
+WILDCARD = "<*>"
+# Longest template or context line rendered into a digest.
+MAX_LINE_CHARS = 300
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;?]*[ -/]*[@-~]")
+LEADING_TIMESTAMP = re.compile(
+    r"^\s*\[?("
+    r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"
+    r"|\d{2}:\d{2}:\d{2}(?:[.,]\d+)?"
+    r"|[A-Z][a-z]{2} +\d{1,2} \d{2}:\d{2}:\d{2}"
+    r")\]?\s*"
+)
+# Tokens carrying digits (ids, counters, durations, versions, addresses) vary between
+# otherwise identical lines, so they are masked before clustering.
+VARIABLE_TOKEN = re.compile(r"(?<!\S)[^\s\d]*\d\S*")
+# Matched against the lower-cased line.
+SIGNAL = re.compile(
+    r"error|exception|traceback|\b(?:fatal|fail|failed|failure|panic|warn|warning|denied|refused"
+    r"|timeout|timed out|killed|oomkilled|out of memory|segfault|exit code [1-9]\d*)\b"
+)
+
+def clean_line(line: str) -> str:
+    """Strip ANSI escapes and a leading timestamp."""
+    line = ANSI_ESCAPE.sub("", line)
+    return LEADING_TIMESTAMP.sub("", line, count=1).rstrip()
+
+def mask_line(line: str) -> str:
+    return VARIABLE_TOKEN.sub(WILDCARD, line)
+
+def is_signal(line: str) -> bool:
+    return SIGNAL.search(line.lower()) is not None
+
+@dataclass
+class LogTemplate:
+    tokens: List[str]
+    count: int = 0
+    first_line: int = 0
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.tokens)
+
+class TemplateMiner:
+    """
+    Drain-style online clustering of log lines into templates.
+
+    Lines are bucketed by token count and their first `depth` tokens; within a
+    bucket a line joins the most similar template (share of equal tokens at or
+    above `similarity`), whose differing positions become wildcards.
+    """
+
+    def __init__(self, depth: int = 2, similarity: float = 0.5, max_templates_per_bucket: int = 100):
+        self.depth = depth
+        self.similarity = similarity
+        self.max_templates_per_bucket = max_templates_per_bucket
+        self._buckets: Dict[Tuple, List[LogTemplate]] = {}
+        # Exact masked line -> template, so repeated lines skip the similarity search.
+        self._exact: Dict[str, LogTemplate] = {}
+        self.templates: List[LogTemplate] = []
+
+    def add(self, masked_line: str, line_no: int) -> LogTemplate:
+        template = self._exact.get(masked_line)
+        if template is None:
+            template = self._match(masked_line.split(), line_no)
+            if len(self._exact) < 200_000:
+                self._exact[masked_line] = template
+        template.count += 1
+        return template
+
+    def _match(self, masked: List[str], line_no: int) -> LogTemplate:
+        prefix = tuple(masked[:self.depth])
+        bucket = self._buckets.setdefault((len(masked), prefix), [])
+        best, best_score = None, -1.0
+        for candidate in bucket:
+            same = sum(1 for a, b in zip(candidate.tokens, masked) if a == b or a == WILDCARD)
+            score = same / len(masked) if masked else 1.0
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is not None and best_score >= self.similarity:
+            best.tokens = [a if a == b else WILDCARD for a, b in zip(best.tokens, masked)]
+            return best
+        template = LogTemplate(tokens=list(masked), first_line=line_no)
+        if len(bucket) < self.max_templates_per_bucket:
+            bucket.append(template)
+        self.templates.append(template)
+        return template
+
+@dataclass
+class LogDigest:
+    total_lines: int = 0
+    total_chars: int = 0
+    signal_lines: int = 0
+    templates: List[LogTemplate] = field(default_factory=list)
+    windows: List[List[Tuple[int, str]]] = field(default_factory=list)
+    dropped_windows: int = 0
+
+    def render(self, max_templates: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+        """
+        Render within `max_chars` (LOG_DIGEST_MAX_CHARS by default). Templates get up to a
+        third of the budget and error windows the rest; windows that do not fit are omitted,
+        keeping the first and then the latest ones, and long lines are clipped.
+        """
+        max_templates = max_templates or settings.LOG_REDUCER_MAX_TEMPLATES
+        max_chars = max_chars or settings.LOG_DIGEST_MAX_CHARS
+        header = (
+            f"--- LOG DIGEST: {self.total_lines} lines, {len(self.templates)} templates, "
+            f"{self.signal_lines} error/warning lines ---"
+        )
+        footer = "--- END OF DIGEST ---"
+        budget = max_chars - len(header) - len(footer) - 2
+
+        top = sorted(self.templates, key=lambda t: t.count, reverse=True)[:max_templates]
+        template_lines = _fit(
+            ["Most frequent line templates:"] + [f"  {t.count}x {_clip(t.text)}" for t in top], budget // 3
+        )
+        budget -= _length(template_lines)
+
+        blocks: Dict[int, List[str]] = {}
+        # Room for the section title and the omitted-windows note.
+        budget -= 60
+        # The first window often holds the root cause, the latest ones the final failure.
+        for index in [0] + list(range(len(self.windows) - 1, 0, -1)):
+            window = self.windows[index]
+            block = _fit([f"  @ line {window[0][0]}"] + [f"    {_clip(text)}" for _, text in window], budget)
+            if len(block) > 1:
+                blocks[index] = block
+                budget -= _length(block)
+            if len(block) < len(window) + 1:
+                break
+
+        lines = [header] + template_lines
+        if blocks:
+            lines.append("Error/warning context:")
+            omitted = self.dropped_windows + len(self.windows) - len(blocks)
+            if omitted:
+                lines.append(f"  ({omitted} windows omitted)")
+            for index in sorted(blocks):
+                lines.extend(blocks[index])
+        lines.append(footer)
+        return "\n".join(lines)
+
+def _clip(text: str) -> str:
+    return text if len(text) <= MAX_LINE_CHARS else text[:MAX_LINE_CHARS] + "..."
+
+def _length(lines: List[str]) -> int:
+    return sum(len(line) + 1 for line in lines)
+
+def _fit(lines: List[str], budget: int) -> List[str]:
+    """The longest prefix of `lines` that fits in `budget` chars, newlines included."""
+    kept = []
+    for line in lines:
+        budget -= len(line) + 1
+        if budget < 0:
+            break
+        kept.append(line)
+    return kept
+
+def reduce_logs(
+    lines: Iterable[str],
+    context_before: Optional[int] = None,
+    context_after: Optional[int] = None,
+    max_windows: Optional[int] = None,
+) -> LogDigest:
+    """
+    Single pass over `lines`: cluster every cleaned line into a template and keep
+    error/warning lines with `context_before`/`context_after` lines around them.
+    Consecutive lines of the same template inside a window collapse to one entry,
+    and a window is capped at LOG_REDUCER_MAX_WINDOW_LINES entries.
+    The first window (often the root cause) and the latest `max_windows - 1` are kept.
+    """
+    before = settings.LOG_REDUCER_CONTEXT_BEFORE if context_before is None else context_before
+    after = settings.LOG_REDUCER_CONTEXT_AFTER if context_after is None else context_after
+    max_windows = max_windows or settings.LOG_REDUCER_MAX_WINDOWS
+    max_window_lines = settings.LOG_REDUCER_MAX_WINDOW_LINES
+
+    miner = TemplateMiner(similarity=settings.LOG_REDUCER_SIMILARITY)
+    digest = LogDigest()
+    history: Deque[Tuple[int, str, LogTemplate]] = deque(maxlen=before)
+    first_window: Optional[List] = None
+    # With max_windows=1 the deque has maxlen 0: every window after the first is dropped.
+    recent_windows: Deque[List] = deque(maxlen=max_windows - 1)
+    window: Optional[List] = None
+    remaining_after = 0
+    last_windowed_line = 0
+
+    def close_window():
+        nonlocal first_window, window
+        if window and first_window is None:
+            first_window = window
+        elif window:
+            if len(recent_windows) == recent_windows.maxlen:
+                digest.dropped_windows += 1
+            recent_windows.append(window)
+        window = None
+
+    def append(entry: Tuple[int, str, LogTemplate]):
+        nonlocal last_windowed_line
+        line_no, text, template = entry
+        last_windowed_line = line_no
+        if window and window[-1][2] is template:
+            window[-1][3] += 1
+        else:
+            window.append([line_no, text, template, 1])
+
+    for line_no, raw in enumerate(lines, start=1):
+        digest.total_lines += 1
+        digest.total_chars += len(raw) + 1
+        text = clean_line(raw)
+        if not text:
+            continue
+        template = miner.add(mask_line(text), line_no)
+        entry = (line_no, text, template)
+
+        if is_signal(text):
+            digest.signal_lines += 1
+            if window is None:
+                window = []
+                for previous in history:
+                    if previous[0] > last_windowed_line:
+                        append(previous)
+            append(entry)
+            remaining_after = after
+        elif window is not None and remaining_after > 0:
+            append(entry)
+            remaining_after -= 1
+        elif window is not None:
+            close_window()
+        if window is not None and len(window) >= max_window_lines:
+            close_window()
+        history.append(entry)
+    close_window()
+
+    digest.templates = miner.templates
+    kept = ([first_window] if first_window else []) + list(recent_windows)
+    digest.windows = [
+        [(line_no, f"{text}  (x{repeats})" if repeats > 1 else text) for line_no, text, _, repeats in w]
+        for w in kept
+    ]
+    return digest
@@ -0,0 +1,17 @@
+import re
+from typing import Any, Optional
+
+# "sev1", "SEV-2", "p0", "P 3": the usual ways to tag an incident's severity, 0 the most severe.
+SEVERITY = re.compile(r"\b(?:sev|p)[\s-]?([0-4])\b", re.IGNORECASE)
+
+def parse_severity(value: Any) -> Optional[int]:
+    """Severity from trigger text or an explicit field ("sev1", "p2", 3); None when absent."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value if 0 <= value <= 4 else None
+    text = str(value).strip()
+    if text.isdigit():
+        return parse_severity(int(text))
+    match = SEVERITY.search(text)
+    return int(match.group(1)) if match else None
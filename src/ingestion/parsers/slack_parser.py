@@ -1,7 +1,38 @@
-from typing import List
+from typing import Dict, List, Optional
 from urllib.parse import parse_qs
 
+from src.app.core.models import Conversation
+from src.ingestion.parsers.severity import parse_severity
+
+SYSTEM_SUBTYPES = {
+    "channel_join", "channel_leave", "channel_topic", "channel_purpose", "channel_name",
+    "channel_archive", "channel_unarchive", "group_join", "group_leave", "pinned_item", "unpinned_item",
+}
+
 def parse_slash_payload(body: bytes):
     body_str = body.decode("utf-8")
     parsed = parse_qs(body_str)
-    return {k: v[0] if v else "" for k, v in parsed.items()}
\ No newline at end of file
+    return {k: v[0] if v else "" for k, v in parsed.items()}
+
+def wants_refresh(payload: Dict) -> bool:
+    """`/postmortem refresh` regenerates instead of attaching to the channel's recent job."""
+    return "refresh" in payload.get("text", "").lower().split()
+
+def severity(payload: Dict) -> Optional[int]:
+    """`/postmortem sev1` (or `p1`) ranks the job ahead of less severe ones when the queue is busy."""
+    return parse_severity(payload.get("text", ""))
+
+def parse_history_page(page: List[Dict], user_names: Dict[str, str]) -> Conversation:
+    return Conversation.from_rows(
+        (
+            msg.get("user", "unknown"),
+            user_names.get(msg.get("user")) or "Unknown",
+            msg.get("text", ""),
+            float(msg.get("ts", 0)),
+            "slack",
+            msg.get("ts"),
+            bool(msg.get("bot_id")) or msg.get("subtype") == "bot_message",
+            msg.get("subtype") in SYSTEM_SUBTYPES,
+        )
+        for msg in page
+    )
@@ -1,4 +1,9 @@
-from typing import Dict
+import time
+from typing import Dict, List
+
+from src.app.core.models import Conversation, MessageRow
+from src.ingestion.parsers.severity import parse_severity
+from src.ingestion.parsers.timestamps import parse_iso_timestamp
 
 def parse_trigger_payload(payload: Dict) -> Dict:
     out = {}
@@ -16,4 +21,23 @@ def parse_trigger_payload(payload: Dict) -> Dict:
     out["user_id"] = payload.get("from", {}).get("user", {}).get("id") or payload.get("user", {}).get("id") or payload.get("from", {}).get("id")
     out["channel_name"] = payload.get("channelName") or payload.get("resourceData", {}).get("channel", {}).get("displayName", "")
     out["trigger_platform"] = payload.get("trigger_platform") or payload.get("type") or "teams_webhook"
+    out["refresh"] = bool(payload.get("refresh")) or "refresh" in str(payload.get("text") or "").lower().split()
+    out["severity"] = parse_severity(payload.get("severity")) if payload.get("severity") is not None else parse_severity(payload.get("text"))
     return out
+
+def _history_row(msg: Dict) -> MessageRow:
+    sender = msg.get("from") or {}
+    user = sender.get("user") or {}
+    return (
+        user.get("id", "unknown"),
+        user.get("displayName") or "Unknown",
+        (msg.get("body") or {}).get("content", ""),
+        parse_iso_timestamp(msg.get("createdDateTime")) or time.time(),
+        "teams",
+        msg.get("id"),
+        bool(sender.get("application")),
+        msg.get("messageType") == "systemEventMessage",
+    )
+
+def parse_history_page(page: List[Dict]) -> Conversation:
+    return Conversation.from_rows(map(_history_row, page))
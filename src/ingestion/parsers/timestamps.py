@@ -0,0 +1,23 @@
+import re
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+# fromisoformat takes at most 6 fractional digits; Graph and GitHub log lines carry 7.
+FRACTION = re.compile(r"\.(\d+)")
+
+def parse_iso_timestamp(value: Any) -> Optional[float]:
+    """
+    ISO 8601 ("Z" or an offset, "T" or a space, any fractional digits; UTC when unzoned)
+    to epoch seconds. None when missing or unparseable.
+    """
+    if not value:
+        return None
+    text = str(value).strip().replace(" ", "T", 1).replace("Z", "+00:00")
+    text = FRACTION.sub(lambda m: "." + m.group(1)[:6].ljust(6, "0"), text, count=1)
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
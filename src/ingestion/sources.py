@@ -0,0 +1,215 @@
+import asyncio
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple, Union, TYPE_CHECKING
+
+from src.app.core.config import settings
+from src.app.core.metrics import metrics
+from src.app.core.models import Conversation
+from src.ingestion.parsers import slack_parser, discord_parser, teams_parser
+from src.ingestion.log_stream import LogStream
+from src.ingestion.message_store import message_store
+from src.ingestion.user_directory import directory
+from src.ingestion.connectors.slack_connector import iter_slack_chat_history
+from src.ingestion.connectors.discord_connector import iter_discord_chat_history
+from src.ingestion.connectors.teams_connector import (
+    ChannelDelta, DeltaExpired, is_removed, iter_teams_chat_history, teams_message_in_window,
+)
+from src.ingestion.connectors.github_connector import get_github_run_logs, get_latest_github_action_logs
+from src.ingestion.connectors.jenkins_connector import (
+    get_latest_jenkins_build_log, jenkins_auth, jenkins_build_url, stream_jenkins_build_log,
+)
+from src.ingestion.deployments import Deployment, deployment_index
+
+if TYPE_CHECKING:
+    from src.ingestion.orchestrator import IngestionRequest
+
+async def _incremental_conversation(
+    request: "IngestionRequest",
+    iter_pages: Callable[..., AsyncIterator[List[dict]]],
+    parse_page: Callable[[List[dict]], Awaitable[Tuple[Conversation, List[str]]]],
+) -> AsyncIterator[Conversation]:
+    """
+    Serve the incident window from the message store and fetch only what is newer
+    than the channel's high-water mark. The last MESSAGE_STORE_OVERLAP_SECONDS before
+    the mark are re-fetched so recent edits and deletions are merged.
+    Yields one Conversation chunk for the stored part and one per fetched page.
+    """
+    platform, channel_id = request.platform, request.channel_id
+    oldest, latest = request.window()
+    # Message store reads and writes run in a thread so SQLite never blocks the event loop.
+    mark = await asyncio.to_thread(message_store.get_mark, platform, channel_id)
+    fetch_from = oldest
+    covered_from = oldest
+    if mark and mark["covered_from"] <= oldest <= mark["mark_ts"]:
+        fetch_from = max(oldest, mark["mark_ts"] - settings.MESSAGE_STORE_OVERLAP_SECONDS)
+        covered_from = mark["covered_from"]
+        stored = await asyncio.to_thread(message_store.load, platform, channel_id, oldest, fetch_from)
+        # Messages stamped exactly fetch_from come back with the fetch.
+        stored = Conversation.from_rows(row for row in stored.rows() if row[3] < fetch_from)
+        print(f"Message store: {len(stored)} cached messages for {platform}:{channel_id}, fetching since {fetch_from:.0f}.")
+        if len(stored):
+            yield stored
+
+    seen_ids = set()
+    newest: Optional[Tuple[float, str]] = None
+    async for page in iter_pages(channel_id, fetch_from, latest):
+        messages, deleted_ids = await parse_page(page)
+        await asyncio.to_thread(message_store.upsert, platform, channel_id, messages)
+        await asyncio.to_thread(message_store.mark_deleted, platform, channel_id, deleted_ids)
+        seen_ids.update(messages.message_ids)
+        if len(messages):
+            page_newest = max(zip(messages.timestamps, messages.message_ids))
+            if newest is None or page_newest[0] > newest[0]:
+                newest = page_newest
+            yield messages
+
+    # [fetch_from, latest] was read completely, so stored messages that did not come back were deleted.
+    gone = set(await asyncio.to_thread(message_store.message_ids, platform, channel_id, fetch_from, latest)) - seen_ids
+    await asyncio.to_thread(message_store.mark_deleted, platform, channel_id, gone)
+    if newest is not None and (mark is None or newest[0] >= mark["mark_ts"]):
+        await asyncio.to_thread(message_store.set_mark, platform, channel_id, newest[1], newest[0], covered_from)
+
+async def _parse_slack_page(page: List[dict]) -> Tuple[Conversation, List[str]]:
+    live = [msg for msg in page if msg.get("subtype") != "tombstone"]
+    with metrics.stage("name_resolution", source="slack_conversation"):
+        user_names = await directory.resolve_many("slack", [msg.get("user") for msg in live])
+    deleted_ids = [msg["ts"] for msg in page if msg.get("subtype") == "tombstone"]
+    return slack_parser.parse_history_page(live, user_names), deleted_ids
+
+def _seed_names(platform: str, conversation: Conversation):
+    directory.seed(platform, {
+        user_id: username for user_id, username in zip(conversation.user_ids, conversation.usernames) if username != "Unknown"
+    })
+
+async def _parse_discord_page(page: List[dict]) -> Tuple[Conversation, List[str]]:
+    conversation = discord_parser.parse_history_page(page)
+    _seed_names("discord", conversation)
+    return conversation, []
+
+async def _parse_teams_page(page: List[dict]) -> Tuple[Conversation, List[str]]:
+    live = [msg for msg in page if not is_removed(msg)]
+    conversation = teams_parser.parse_history_page(live)
+    _seed_names("teams", conversation)
+    return conversation, [msg["id"] for msg in page if is_removed(msg)]
+
+async def _store_teams_page(channel_id: str, page: List[dict]) -> Conversation:
+    messages, deleted_ids = await _parse_teams_page(page)
+    await asyncio.to_thread(message_store.upsert, "teams", channel_id, messages)
+    await asyncio.to_thread(message_store.mark_deleted, "teams", channel_id, deleted_ids)
+    return messages
+
+async def _teams_delta_conversation(request: "IngestionRequest") -> AsyncIterator[Conversation]:
+    """
+    A Teams channel through Graph delta queries, the deltaLink kept as the channel's mark.
+    With a mark covering the window only the changes since it are fetched; they are applied
+    to the message store, which then serves the window in one chunk. Otherwise (or when Graph
+    no longer accepts the deltaLink) everything modified since the window opened is read and
+    streamed a page at a time.
+    """
+    platform, channel_id = request.platform, request.channel_id
+    oldest, latest = request.window()
+    mark = await asyncio.to_thread(message_store.get_mark, platform, channel_id)
+    synced_at = time.time()
+    if mark and mark["mark"].startswith("http") and mark["covered_from"] <= oldest:
+        delta = ChannelDelta(channel_id, resume_link=mark["mark"])
+        try:
+            changed = 0
+            async for page in delta.pages():
+                await _store_teams_page(channel_id, page)
+                changed += len(page)
+        except DeltaExpired as e:
+            print(f"Teams deltaLink for {channel_id} expired ({e}); reading the window again.")
+            metrics.inc("aftermath_teams_delta_total", kind="expired")
+        else:
+            metrics.inc("aftermath_teams_delta_total", kind="incremental")
+            if delta.delta_link:
+                await asyncio.to_thread(message_store.set_mark, platform, channel_id, delta.delta_link, synced_at, mark["covered_from"])
+            stored = await asyncio.to_thread(message_store.load, platform, channel_id, oldest, latest)
+            print(f"Message store: {len(stored)} cached messages for {platform}:{channel_id} after {changed} delta changes.")
+            if len(stored):
+                yield stored
+            return
+
+    metrics.inc("aftermath_teams_delta_total", kind="full")
+    delta = ChannelDelta(channel_id, since=oldest)
+    async for page in delta.pages():
+        inside = [msg for msg in page if teams_message_in_window(msg, oldest, latest)]
+        outside = [msg for msg in page if not teams_message_in_window(msg, oldest, latest)]
+        # Keep what falls outside the window too: the next round's changes start after it.
+        await _store_teams_page(channel_id, outside)
+        messages = await _store_teams_page(channel_id, inside)
+        if len(messages):
+            yield messages
+    if delta.delta_link:
+        await asyncio.to_thread(message_store.set_mark, platform, channel_id, delta.delta_link, synced_at, oldest)
+
+async def fetch_slack_conversation(request: "IngestionRequest") -> AsyncIterator[Conversation]:
+    async for chunk in _incremental_conversation(request, iter_slack_chat_history, _parse_slack_page):
+        yield chunk
+
+async def fetch_discord_conversation(request: "IngestionRequest") -> AsyncIterator[Conversation]:
+    async for chunk in _incremental_conversation(request, iter_discord_chat_history, _parse_discord_page):
+        yield chunk
+
+async def fetch_teams_conversation(request: "IngestionRequest") -> AsyncIterator[Conversation]:
+    if settings.TEAMS_DELTA_ENABLED:
+        async for chunk in _teams_delta_conversation(request):
+            yield chunk
+        return
+    async for chunk in _incremental_conversation(request, iter_teams_chat_history, _parse_teams_page):
+        yield chunk
+
+async def fetch_trigger_user_name(request: "IngestionRequest") -> Optional[str]:
+    return await directory.resolve(request.platform, request.user_id)
+
+def _indexed_deployments(provider: str, request: "IngestionRequest") -> Optional[List[Deployment]]:
+    if not settings.DEPLOYMENT_POLLER_ENABLED:
+        return None
+    deployments = deployment_index.select(provider, request.window(), settings.DEPLOYMENT_MAX_PER_INCIDENT)
+    if deployments is not None:
+        print(f"Deployment index: {provider} {[d.name for d in deployments]} for the incident window.")
+    return deployments
+
+def _log_window(deployment: Deployment, request: "IngestionRequest") -> Optional[Tuple[float, float]]:
+    """The incident window, unless the deployment ran entirely before it (then its log is read as a whole)."""
+    window = request.window()
+    return window if deployment.overlaps(window) else None
+
+async def _gather_streams(fetches) -> List[LogStream]:
+    streams = []
+    for result in await asyncio.gather(*fetches, return_exceptions=True):
+        if isinstance(result, BaseException):
+            print(f"Error fetching deployment logs: {result}")
+        elif isinstance(result, list):
+            streams.extend(result)
+        else:
+            streams.append(result)
+    return streams
+
+async def fetch_github_logs(request: "IngestionRequest") -> List[LogStream]:
+    deployments = _indexed_deployments("github", request)
+    if deployments is None:
+        github_logs = await get_latest_github_action_logs(request.window())
+    else:
+        github_logs = await _gather_streams(
+            get_github_run_logs(d.details, _log_window(d, request), jobs=d.jobs, label_run=len(deployments) > 1)
+            for d in deployments
+        )
+    if github_logs:
+        print(f"Successfully fetched {sum(stream.size for stream in github_logs)} bytes from {len(github_logs)} GitHub jobs.")
+    return github_logs
+
+async def fetch_jenkins_logs(request: "IngestionRequest") -> Union[List[LogStream], LogStream, None]:
+    deployments = _indexed_deployments("jenkins", request)
+    if deployments is None:
+        jenkins_logs = await get_latest_jenkins_build_log(request.window())
+        if jenkins_logs:
+            print(f"Successfully fetched {jenkins_logs.size} bytes from Jenkins.")
+        return jenkins_logs
+    jenkins_logs = await _gather_streams(
+        stream_jenkins_build_log(jenkins_build_url(d.id), jenkins_auth(), _log_window(d, request), name=f"{d.name} ({d.status})")
+        for d in deployments
+    )
+    if jenkins_logs:
+        print(f"Successfully fetched {sum(stream.size for stream in jenkins_logs)} bytes from {len(jenkins_logs)} Jenkins builds.")
+    return jenkins_logs
@@ -0,0 +1,241 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.app.core.config import settings
+from src.app.core.metrics import metrics
+from src.ingestion.connectors.rate_limit import PRIORITY_BACKGROUND, outbound_priority
+
+Resolver = Callable[[str], Awaitable[Optional[str]]]
+BulkResolver = Callable[[List[str]], Awaitable[Dict[str, str]]]
+Prefetcher = Callable[[], Awaitable[Dict[str, str]]]
+
+# Wait this long before retrying a bulk prefetch that failed, so a broken endpoint is not hammered per trigger.
+WARM_RETRY_SECONDS = 60.0
+
+class UserDirectory:
+    """
+    Shared user-id -> display-name cache for every chat platform.
+
+    Entries live for `ttl_seconds` and the least recently used ones are evicted
+    past `max_entries`. Concurrent lookups for the same id share one request,
+    and a platform's bulk endpoint (if registered) warms the cache in the background once per TTL.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, concurrency: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.concurrency = concurrency
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._resolvers: Dict[str, Resolver] = {}
+        self._bulk_resolvers: Dict[str, BulkResolver] = {}
+        self._prefetchers: Dict[str, Prefetcher] = {}
+        self._warmed_at: Dict[str, float] = {}
+        self._warming: Dict[str, asyncio.Task] = {}
+        self._warm_failed_at: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.remote_lookups = 0
+        self.prefetched = 0
+
+    def register(
+        self,
+        platform: str,
+        resolve: Resolver,
+        resolve_many: Optional[BulkResolver] = None,
+        prefetch: Optional[Prefetcher] = None,
+    ):
+        self._resolvers[platform] = resolve
+        if resolve_many:
+            self._bulk_resolvers[platform] = resolve_many
+        if prefetch:
+            self._prefetchers[platform] = prefetch
+
+    def get_cached(self, platform: str, user_id: str) -> Optional[str]:
+        key = (platform, user_id)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, name = entry
+        if expires_at < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return name
+
+    def put(self, platform: str, user_id: str, name: Optional[str]):
+        if not user_id or not name:
+            return
+        key = (platform, user_id)
+        self._cache[key] = (time.monotonic() + self.ttl_seconds, name)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def seed(self, platform: str, names: Dict[str, str]):
+        for user_id, name in names.items():
+            self.put(platform, user_id, name)
+
+    def warm(self, platform: str) -> Optional[asyncio.Task]:
+        """
+        Start the platform's bulk prefetch in the background unless it is warm, already warming,
+        or failed less than WARM_RETRY_SECONDS ago. Lookups never wait for it: until it lands,
+        misses are resolved per id.
+        """
+        prefetch = self._prefetchers.get(platform)
+        if not prefetch:
+            return None
+        if platform in self._warming:
+            return self._warming[platform]
+        now = time.monotonic()
+        warmed_at = self._warmed_at.get(platform)
+        if warmed_at is not None and now - warmed_at < self.ttl_seconds:
+            return None
+        failed_at = self._warm_failed_at.get(platform)
+        if failed_at is not None and now - failed_at < WARM_RETRY_SECONDS:
+            return None
+        task = asyncio.create_task(self._warm(platform, prefetch))
+        self._warming[platform] = task
+        return task
+
+    async def _warm(self, platform: str, prefetch: Prefetcher):
+        try:
+            with outbound_priority(PRIORITY_BACKGROUND):
+                names = await prefetch()
+            self.seed(platform, names)
+            # Only a complete listing makes the platform warm; a failed or cancelled one is retried.
+            self._warmed_at[platform] = time.monotonic()
+            self.prefetched += len(names)
+            metrics.inc("aftermath_user_directory_prefetched_total", len(names), platform=platform)
+            print(f"User directory warmed {len(names)} {platform} users.")
+        except Exception as e:
+            self._warm_failed_at[platform] = time.monotonic()
+            print(f"User directory prefetch for {platform} failed: {e}")
+        finally:
+            del self._warming[platform]
+
+    async def resolve(self, platform: str, user_id: str) -> Optional[str]:
+        names = await self.resolve_many(platform, [user_id])
+        return names.get(user_id)
+
+    async def resolve_many(self, platform: str, user_ids: Iterable[Optional[str]]) -> Dict[str, str]:
+        unique_ids = list(dict.fromkeys(uid for uid in user_ids if uid))
+        if not unique_ids:
+            return {}
+
+        resolved: Dict[str, str] = {}
+        missing: List[str] = []
+        for uid in unique_ids:
+            name = self.get_cached(platform, uid)
+            if name is not None:
+                resolved[uid] = name
+            else:
+                missing.append(uid)
+
+        if missing:
+            self.warm(platform)
+
+        self.hits += len(unique_ids) - len(missing)
+        self.misses += len(missing)
+        metrics.inc("aftermath_user_directory_lookups_total", len(unique_ids) - len(missing), platform=platform, result="hit")
+        metrics.inc("aftermath_user_directory_lookups_total", len(missing), platform=platform, result="miss")
+        if missing:
+            resolved.update(await self._fetch(platform, missing))
+        return resolved
+
+    async def _fetch(self, platform: str, user_ids: List[str]) -> Dict[str, str]:
+        waiting: Dict[str, asyncio.Future] = {}
+        owned: Dict[str, asyncio.Future] = {}
+        loop = asyncio.get_running_loop()
+        for uid in user_ids:
+            key = (platform, uid)
+            if key in self._inflight:
+                waiting[uid] = self._inflight[key]
+            else:
+                future = loop.create_future()
+                self._inflight[key] = future
+                owned[uid] = future
+
+        if owned:
+            names: Optional[Dict[str, str]] = None
+            try:
+                names = await self._lookup(platform, list(owned))
+            except Exception as e:
+                print(f"User directory lookup for {platform} failed: {e}")
+                names = {}
+            finally:
+                # Settle every owned future, even when cancelled (e.g. by a source deadline),
+                # or later lookups of these ids would wait on them forever.
+                for uid, future in owned.items():
+                    self._inflight.pop((platform, uid), None)
+                    if names is None:
+                        future.cancel()
+                    else:
+                        self.put(platform, uid, names.get(uid))
+                        future.set_result(names.get(uid))
+
+        results: Dict[str, str] = {}
+        for uid, future in {**waiting, **owned}.items():
+            try:
+                name = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The lookup that owned it was cancelled: unresolved this time, retried next time.
+                name = None
+            if name:
+                results[uid] = name
+        return results
+
+    async def _lookup(self, platform: str, user_ids: List[str]) -> Dict[str, str]:
+        self.remote_lookups += len(user_ids)
+        metrics.inc("aftermath_user_directory_remote_lookups_total", len(user_ids), platform=platform)
+        bulk = self._bulk_resolvers.get(platform)
+        if bulk:
+            return await bulk(user_ids)
+
+        resolve = self._resolvers.get(platform)
+        if not resolve:
+            return {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(uid: str) -> Tuple[str, Optional[str]]:
+            async with semaphore:
+                try:
+                    return uid, await resolve(uid)
+                except Exception as e:
+                    print(f"Failed to resolve {platform} user {uid}: {e}")
+                    return uid, None
+
+        pairs = await asyncio.gather(*(one(uid) for uid in user_ids))
+        return {uid: name for uid, name in pairs if name}
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "remote_lookups": self.remote_lookups,
+            "prefetched": self.prefetched,
+        }
+
+directory = UserDirectory(
+    ttl_seconds=settings.USER_DIRECTORY_TTL_SECONDS,
+    max_entries=settings.USER_DIRECTORY_MAX_ENTRIES,
+    concurrency=settings.USER_DIRECTORY_CONCURRENCY,
+)
+
+def _register_platforms():
+    from src.ingestion.connectors.slack_connector import retrieve_slack_user_name, list_slack_users
+    from src.ingestion.connectors.discord_connector import retrieve_discord_user_name
+    from src.ingestion.connectors.teams_connector import retrieve_teams_user_name, retrieve_teams_user_names
+
+    directory.register("slack", retrieve_slack_user_name, prefetch=list_slack_users)
+    directory.register("discord", retrieve_discord_user_name)
+    directory.register("teams", retrieve_teams_user_name, resolve_many=retrieve_teams_user_names)
+
+_register_platforms()
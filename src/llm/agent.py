@@ -0,0 +1,47 @@
+# LangChain ReAct agent for SYNTHESIS_MODE=agent. Only imported on first use, since
+# importing LangChain takes about a second.
+from langchain_community.chat_models import ChatOpenAI
+from langchain.tools import Tool
+from langchain.agents import initialize_agent, AgentType
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src.app.core.config import settings
+from src.app.core.models import Incident
+from src.ingestion.parsers.context_builder import build_context
+from src.llm.client import ModelClient
+
+def slack_tool_func(state: dict) -> str:
+    """Return formatted context (keeps compatibility with existing tools)"""
+    incident: Incident = state["incident"]
+    return build_context(incident).sections["conversation"].text
+
+slack_tool = Tool(
+    name="ConversationContext",
+    func=lambda incident_state: slack_tool_func(incident_state),
+    description="Returns previously ingested messages for this incident from any source (Slack/Discord/Teams).",
+)
+
+TOOLS = [slack_tool]
+
+class _CallCounter(BaseCallbackHandler):
+    """Counts the agent's model round-trips against the ModelClient."""
+
+    def __init__(self, model: ModelClient):
+        self.model = model
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.model.calls += 1
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.model.calls += 1
+
+async def run_agent(prompt: str, model: ModelClient) -> str:
+    # The agent drives its own LangChain chat model, outside ModelClient's limiter and retries.
+    llm = ChatOpenAI(model=model.model_name, temperature=model.temperature, openai_api_key=settings.OPENAI_API_KEY)
+    llm_agent = initialize_agent(
+        tools=TOOLS,
+        llm=llm,
+        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        verbose=False
+    )
+    return await llm_agent.arun(prompt, callbacks=[_CallCounter(model)])
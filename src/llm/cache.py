@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src.app.core.config import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    stage TEXT NOT NULL,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    tokens INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+"""
+
+def normalize_messages(messages: List[dict]) -> List[dict]:
+    """Role plus content with line endings unified and trailing whitespace stripped per line."""
+    return [
+        {
+            "role": m["role"],
+            "content": "\n".join(line.rstrip() for line in m["content"].replace("\r\n", "\n").split("\n")).strip(),
+        }
+        for m in messages
+    ]
+
+def cache_key(model: Optional[str], temperature: float, messages: List[dict]) -> str:
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "messages": normalize_messages(messages)},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMCache:
+    """
+    Content-addressed store of LLM responses on a local SQLite file.
+
+    Entries expire after `ttl` seconds; once their total size passes `max_bytes`
+    the least recently read entries are evicted. Hit/miss counters and the
+    tokens a hit saved (prompt plus completion) are kept per stage.
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._size = 0
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+            self._size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def _count(self, stage: str, field: str, amount: int = 1):
+        counters = self._stats.setdefault(stage, {"hits": 0, "misses": 0, "tokens_saved": 0})
+        counters[field] += amount
+
+    def get(self, key: str, stage: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            conn = self.conn
+            row = conn.execute("SELECT response, size, tokens, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and row["created_at"] < now - self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= row["size"]
+                row = None
+            if row is None:
+                self._count(stage, "misses")
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self._count(stage, "hits")
+            self._count(stage, "tokens_saved", row["tokens"])
+            return row["response"]
+
+    def put(self, key: str, stage: str, model: Optional[str], response: str, tokens: int):
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self.conn
+            previous = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, stage, model, response, size, tokens, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, stage, model or "", response, size, tokens, now, now),
+            )
+            self._size += size - (previous["size"] if previous else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop expired entries, then least recently read ones until under `max_bytes`."""
+        conn = self.conn
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+        self._size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if self._size <= self.max_bytes:
+            return
+        excess = self._size - self.max_bytes
+        freed = 0
+        victims = []
+        for row in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            victims.append((row["key"],))
+            freed += row["size"]
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self._size -= freed
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stages = {stage: dict(counters) for stage, counters in self._stats.items()}
+            size = self._size
+        for counters in stages.values():
+            lookups = counters["hits"] + counters["misses"]
+            counters["hit_rate"] = round(counters["hits"] / lookups, 3) if lookups else 0.0
+        return {"size_bytes": size, "max_bytes": self.max_bytes, "stages": stages}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+llm_cache = LLMCache(settings.LLM_CACHE_PATH, settings.LLM_CACHE_MAX_BYTES, settings.LLM_CACHE_TTL_SECONDS)
@@ -0,0 +1,232 @@
+import asyncio
+import json
+import random
+import time
+from typing import AsyncIterator, List, Optional, Tuple
+
+import httpx
+
+from src.app.core.config import settings
+from src.app.core.metrics import record_llm_call
+from src.ingestion.connectors.http_client import get_client
+from src.ingestion.connectors.rate_limit import retry_after_seconds
+from src.llm.cache import cache_key, llm_cache
+from src.llm.tokens import count_tokens
+
+class TokenRateLimiter:
+    """
+    Token bucket holding up to one minute of `tokens_per_minute`, refilled continuously.
+    Callers reserve an estimate up front and `settle` it with the usage the API reports.
+    """
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = float(tokens_per_minute)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens: int):
+        if self.capacity <= 0:
+            return
+        tokens = min(tokens, self.capacity)
+        # Holding the lock while waiting keeps waiters first come, first served.
+        async with self._lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+    def settle(self, reserved: int, used: int):
+        if self.capacity <= 0:
+            return
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + min(reserved, self.capacity) - used)
+
+_limits: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore, TokenRateLimiter]] = None
+
+def _get_limits() -> Tuple[asyncio.Semaphore, TokenRateLimiter]:
+    """Process-wide concurrency semaphore and token limiter, shared by every ModelClient on this loop."""
+    global _limits
+    loop = asyncio.get_running_loop()
+    if _limits is None or _limits[0] is not loop:
+        _limits = (loop, asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY), TokenRateLimiter(settings.LLM_TOKENS_PER_MINUTE))
+    return _limits[1], _limits[2]
+
+def backoff_seconds(attempt: int) -> float:
+    delay = min(settings.LLM_BACKOFF_MAX_SECONDS, settings.LLM_BACKOFF_BASE_SECONDS * 2 ** attempt)
+    return delay * random.uniform(0.5, 1.0)
+
+class ModelClient:
+    def __init__(self, provider: str = "openai", model_name: str = None, temperature: float = 0.3):
+        self.provider = provider
+        self.model_name = model_name
+        self.temperature = temperature
+        # Completion requests actually sent (cache hits excluded).
+        self.calls = 0
+
+    @classmethod
+    def select(cls, provider: str = "openai", model_name: str = "gpt-4o") -> "ModelClient":
+        return cls(provider, model_name)
+
+    async def generate(self, messages: List[dict], stage: Optional[str] = None) -> str:
+        """Call the model; stages listed in LLM_CACHE_STAGES are answered from the response cache when possible."""
+        if stage is None or stage not in settings.LLM_CACHE_STAGES:
+            return await self._generate(messages, stage)
+        key = cache_key(self.model_name, self.temperature, messages)
+        # The cache is SQLite: look up and store in a thread, off the event loop.
+        cached = await asyncio.to_thread(llm_cache.get, key, stage)
+        if cached is not None:
+            return cached
+        response = await self._generate(messages, stage)
+        tokens = sum(count_tokens(m["content"], self.model_name) for m in messages)
+        await asyncio.to_thread(llm_cache.put, key, stage, self.model_name, response, tokens + count_tokens(response, self.model_name))
+        return response
+
+    async def stream(self, messages: List[dict], stage: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield the completion text as it arrives; a cached response is replayed in one piece."""
+        key = None
+        if stage is not None and stage in settings.LLM_CACHE_STAGES:
+            key = cache_key(self.model_name, self.temperature, messages)
+            cached = await asyncio.to_thread(llm_cache.get, key, stage)
+            if cached is not None:
+                yield cached
+                return
+        semaphore, limiter = _get_limits()
+        prompt_tokens = sum(count_tokens(m["content"], self.model_name) for m in messages)
+        reserved = prompt_tokens + settings.LLM_EXPECTED_OUTPUT_TOKENS
+        await limiter.acquire(reserved)
+        used = 0
+        usage: dict = {}
+        parts: List[str] = []
+        try:
+            response = await self._send(semaphore, self._body(messages, stream=True), stream=True)
+            try:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    event = json.loads(data)
+                    usage = event.get("usage") or usage
+                    used = usage.get("total_tokens", used)
+                    for choice in event.get("choices") or []:
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            parts.append(delta)
+                            yield delta
+            finally:
+                await response.aclose()
+                semaphore.release()
+        finally:
+            limiter.settle(reserved, used or (reserved if parts else 0))
+        self.calls += 1
+        response_text = "".join(parts)
+        record_llm_call(
+            self.model_name, stage, usage.get("prompt_tokens", prompt_tokens),
+            usage.get("completion_tokens") or count_tokens(response_text, self.model_name),
+        )
+        if key is not None:
+            await asyncio.to_thread(
+                llm_cache.put, key, stage, self.model_name, response_text,
+                prompt_tokens + count_tokens(response_text, self.model_name),
+            )
+
+    async def embed(self, texts: List[str], model: str, dimensions: Optional[int] = None) -> List[List[float]]:
+        """Embedding vectors for `texts`, in order; counted against the same limits as completions."""
+        semaphore, limiter = _get_limits()
+        reserved = sum(count_tokens(text, self.model_name) for text in texts)
+        await limiter.acquire(reserved)
+        body: dict = {"model": model, "input": texts}
+        if dimensions:
+            body["dimensions"] = dimensions
+        try:
+            data = (await self._send(semaphore, body, path="/embeddings")).json()
+        except Exception:
+            limiter.settle(reserved, 0)
+            raise
+        usage = data.get("usage") or {}
+        limiter.settle(reserved, usage.get("total_tokens", reserved))
+        record_llm_call(model, "embedding", usage.get("prompt_tokens", reserved), 0)
+        return [item["embedding"] for item in sorted(data["data"], key=lambda item: item["index"])]
+
+    def _body(self, messages: List[dict], stream: bool = False) -> dict:
+        body = {
+            "model": self.model_name,
+            "temperature": self.temperature,
+            "messages": [{"role": m["role"], "content": m["content"]} for m in messages],
+        }
+        if stream:
+            body["stream"] = True
+            body["stream_options"] = {"include_usage": True}
+        return body
+
+    async def _generate(self, messages: List[dict], stage: Optional[str] = None) -> str:
+        semaphore, limiter = _get_limits()
+        prompt_tokens = sum(count_tokens(m["content"], self.model_name) for m in messages)
+        reserved = prompt_tokens + settings.LLM_EXPECTED_OUTPUT_TOKENS
+        await limiter.acquire(reserved)
+        try:
+            data = (await self._send(semaphore, self._body(messages))).json()
+        except Exception:
+            limiter.settle(reserved, 0)
+            raise
+        usage = data.get("usage") or {}
+        limiter.settle(reserved, usage.get("total_tokens", reserved))
+        self.calls += 1
+        text = data["choices"][0]["message"]["content"] or ""
+        record_llm_call(
+            self.model_name, stage, usage.get("prompt_tokens", prompt_tokens),
+            usage.get("completion_tokens") or count_tokens(text, self.model_name),
+        )
+        return text
+
+    async def _send(
+        self, semaphore: asyncio.Semaphore, body: dict, stream: bool = False, path: str = "/chat/completions"
+    ) -> httpx.Response:
+        """
+        POST to the OpenAI API (a chat completion by default), retrying timeouts, connection errors, 429 and 5xx with backoff.
+        Each attempt holds `semaphore`; with `stream` the response is returned open and still
+        holding it, and the caller must close the response and release the semaphore.
+        """
+        client = get_client("openai")
+        url = f"{settings.OPENAI_BASE_URL.rstrip('/')}{path}"
+        headers = {"Authorization": f"Bearer {settings.OPENAI_API_KEY}"}
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            await semaphore.acquire()
+            try:
+                request = client.build_request(
+                    "POST", url, json=body, headers=headers, timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS
+                )
+                response = await client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                semaphore.release()
+                error, delay = e, backoff_seconds(attempt)
+            except BaseException:
+                semaphore.release()
+                raise
+            else:
+                if not response.is_error:
+                    if not stream:
+                        semaphore.release()
+                    return response
+                if stream:
+                    await response.aread()
+                    await response.aclose()
+                semaphore.release()
+                if response.status_code != 429 and response.status_code < 500:
+                    raise RuntimeError(f"OpenAI API error {response.status_code}: {response.text[:500]}")
+                error = RuntimeError(f"OpenAI API error {response.status_code}: {response.text[:200]}")
+                delay = retry_after_seconds(response)
+                delay = backoff_seconds(attempt) if delay is None else min(delay, settings.LLM_BACKOFF_MAX_SECONDS)
+            if attempt == settings.LLM_MAX_RETRIES:
+                raise error
+            print(f"{error!r}; retrying in {delay:.1f}s (attempt {attempt + 1}/{settings.LLM_MAX_RETRIES}).")
+            await asyncio.sleep(delay)
@@ -0,0 +1,343 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.app.core.config import settings
+from src.app.core.models import Incident
+from src.llm.client import ModelClient
+from src.llm.tokens import truncate_to_tokens
+from src.llm.validation import split_sections
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    incident_id TEXT PRIMARY KEY,
+    platform TEXT NOT NULL,
+    channel_id TEXT,
+    channel_name TEXT NOT NULL DEFAULT '',
+    summary TEXT NOT NULL,
+    root_cause TEXT NOT NULL,
+    embedding_key TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    dimensions INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+# Characters of each past incident's summary and root cause shown in results and prompts.
+EXCERPT_CHARS = 600
+
+def embedding_key(model: str, dimensions: int, text: str) -> str:
+    return hashlib.sha256(f"{model}\n{dimensions}\n{text}".encode("utf-8")).hexdigest()
+
+def _normalize(vectors):
+    import numpy as np
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def _top_k(scores, k: int):
+    import numpy as np
+
+    if len(scores) <= k:
+        return np.argsort(-scores)
+    best = np.argpartition(-scores, k)[:k]
+    return best[np.argsort(-scores[best])]
+
+class IncidentIndex:
+    """
+    Past postmortems and their embeddings on a local SQLite file, searched in memory.
+
+    Embeddings are stored by a hash of (model, dimensions, text), so a text is embedded once.
+    Indexed vectors are unit-normalized float32 rows of one matrix and cosine similarity is
+    a single matrix-vector product. Past `ivf_threshold` incidents, search switches to an
+    inverted file: k-means centroids over the corpus, scoring only the `nprobe` closest lists.
+    """
+
+    def __init__(self, path: str, model: str, dimensions: int, ivf_threshold: int, nprobe: int):
+        self.path = path
+        self.model = model
+        self.dimensions = dimensions
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._matrix = None
+        # (centroids, list id per row, corpus size at build time) once the IVF is built.
+        self._ivf = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def load(self):
+        with self._lock:
+            self._ensure_loaded()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._ids)
+
+    @property
+    def mode(self) -> str:
+        return "ivf" if self._ivf is not None else "exact"
+
+    def cached_embeddings(self, keys: Sequence[str]) -> Dict[str, object]:
+        import numpy as np
+
+        if not keys:
+            return {}
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(keys))})", list(keys)
+            ).fetchall()
+        return {row["key"]: np.frombuffer(row["vector"], dtype=np.float32) for row in rows}
+
+    def put_embeddings(self, entries: Sequence[Tuple[str, object]]):
+        now = time.time()
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dimensions, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(key, self.model, self.dimensions, _normalize(vector).tobytes(), now) for key, vector in entries],
+            )
+
+    async def embed(self, texts: List[str], model_client: ModelClient) -> List[object]:
+        """Unit vectors for `texts`, embedding only the ones not already stored."""
+        keys = [embedding_key(self.model, self.dimensions, text) for text in texts]
+        vectors = self.cached_embeddings(list(dict.fromkeys(keys)))
+        missing = list(dict.fromkeys(key for key in keys if key not in vectors))
+        if missing:
+            texts_by_key = dict(zip(keys, texts))
+            embedded = await model_client.embed([texts_by_key[key] for key in missing], self.model, self.dimensions)
+            fresh = list(zip(missing, _normalize(embedded)))
+            self.put_embeddings(fresh)
+            vectors.update(fresh)
+        return [vectors[key] for key in keys]
+
+    def add(self, records: Sequence[Dict], keys: Sequence[str]):
+        """
+        Index `records` (incident_id, platform, channel_id, channel_name, summary, root_cause,
+        created_at) under the stored embeddings `keys`; re-adding an incident replaces it.
+        """
+        rows = [
+            (r["incident_id"], r["platform"], r.get("channel_id"), r.get("channel_name") or "",
+             r["summary"], r["root_cause"], key, r.get("created_at") or time.time())
+            for r, key in zip(records, keys)
+        ]
+        with self._lock:
+            conn = self.conn
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO incidents (incident_id, platform, channel_id, channel_name,"
+                    " summary, root_cause, embedding_key, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if not self._loaded:
+                # The next search loads everything from disk, these included.
+                return
+            vectors = self._vectors_for(list(keys))
+            self._append([r["incident_id"] for r in records], vectors)
+            self._maybe_build_ivf()
+
+    def _vectors_for(self, keys: List[str]):
+        import numpy as np
+
+        stored = {}
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            for row in self.conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+            ):
+                stored[row["key"]] = np.frombuffer(row["vector"], dtype=np.float32)
+        return np.stack([stored[key] for key in keys]) if keys else np.empty((0, self.dimensions), np.float32)
+
+    def _ensure_loaded(self):
+        import numpy as np
+
+        if self._loaded:
+            return
+        started = time.perf_counter()
+        ids, blobs = [], []
+        for row in self.conn.execute(
+            "SELECT i.incident_id, e.vector FROM incidents i JOIN embeddings e ON e.key = i.embedding_key"
+            " WHERE e.model = ? AND e.dimensions = ? ORDER BY i.created_at",
+            (self.model, self.dimensions),
+        ):
+            ids.append(row["incident_id"])
+            blobs.append(row["vector"])
+        self._ids, self._positions = [], {}
+        self._matrix = np.empty((max(len(ids), 1024), self.dimensions), dtype=np.float32)
+        if ids:
+            self._append(ids, np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(len(ids), self.dimensions))
+        self._loaded = True
+        self._maybe_build_ivf()
+        print(f"Loaded {len(ids)} past incidents into the similarity index in {time.perf_counter() - started:.2f}s ({self.mode}).")
+
+    def _append(self, ids: List[str], vectors):
+        import numpy as np
+
+        for incident_id, vector in zip(ids, vectors):
+            position = self._positions.get(incident_id)
+            if position is None:
+                position = len(self._ids)
+                if position == len(self._matrix):
+                    grown = np.empty((len(self._matrix) * 2, self.dimensions), dtype=np.float32)
+                    grown[:position] = self._matrix
+                    self._matrix = grown
+                self._ids.append(incident_id)
+                self._positions[incident_id] = position
+            self._matrix[position] = vector
+            if self._ivf is not None:
+                centroids, lists, built = self._ivf
+                if position >= len(lists):
+                    lists = np.concatenate([lists, np.empty(len(self._matrix) - len(lists), dtype=np.int32)])
+                lists[position] = int(np.argmax(centroids @ vector))
+                self._ivf = (centroids, lists, built)
+
+    def _maybe_build_ivf(self):
+        """Build the IVF once the corpus passes the threshold, and rebuild whenever it doubles."""
+        size = len(self._ids)
+        if size < self.ivf_threshold or (self._ivf is not None and size < 2 * self._ivf[2]):
+            return
+        started = time.perf_counter()
+        self._ivf = self._build_ivf(self._matrix[:size])
+        print(f"Built a {len(self._ivf[0])}-list IVF over {size} incidents in {time.perf_counter() - started:.2f}s.")
+
+    @staticmethod
+    def _build_ivf(vectors, iterations: int = 8, sample: int = 25000):
+        """Spherical k-means with ~4*sqrt(n) centroids fitted on a sample, then every row assigned."""
+        import numpy as np
+
+        rng = np.random.default_rng(0)
+        count = int(4 * np.sqrt(len(vectors)))
+        fit = vectors[rng.choice(len(vectors), min(sample, len(vectors)), replace=False)]
+        centroids = fit[rng.choice(len(fit), count, replace=False)].copy()
+        for _ in range(iterations):
+            assigned = np.argmax(fit @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assigned, fit)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+        lists = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), 8192):
+            lists[start:start + 8192] = np.argmax(vectors[start:start + 8192] @ centroids.T, axis=1)
+        return centroids, lists, len(vectors)
+
+    def search(self, vector, k: int, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """The `k` indexed incidents closest to `vector` by cosine similarity, best first."""
+        import numpy as np
+
+        query = _normalize(vector)
+        with self._lock:
+            self._ensure_loaded()
+            size = len(self._ids)
+            if not size:
+                return []
+            if self._ivf is None:
+                candidates = None
+                scores = self._matrix[:size] @ query
+            else:
+                centroids, lists, _ = self._ivf
+                probes = _top_k(centroids @ query, self.nprobe)
+                candidates = np.flatnonzero(np.isin(lists[:size], probes))
+                scores = self._matrix[candidates] @ query
+            best = _top_k(scores, k + 1)
+            rows = best if candidates is None else candidates[best]
+            results = [(self._ids[row], float(scores[i])) for i, row in zip(best, rows)]
+        return [(incident_id, score) for incident_id, score in results if incident_id != exclude][:k]
+
+    def vector(self, incident_id: str):
+        with self._lock:
+            self._ensure_loaded()
+            position = self._positions.get(incident_id)
+            return None if position is None else self._matrix[position].copy()
+
+    def describe(self, results: List[Tuple[str, float]]) -> List[Dict]:
+        """Stored metadata for search results, in result order."""
+        if not results:
+            return []
+        ids = [incident_id for incident_id, _ in results]
+        with self._lock:
+            rows = {
+                row["incident_id"]: dict(row)
+                for row in self.conn.execute(
+                    "SELECT incident_id, platform, channel_id, channel_name, summary, root_cause, created_at"
+                    f" FROM incidents WHERE incident_id IN ({','.join('?' * len(ids))})", ids,
+                )
+            }
+        return [{**rows[incident_id], "score": round(score, 4)} for incident_id, score in results if incident_id in rows]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+incident_index = IncidentIndex(
+    settings.INCIDENT_INDEX_PATH,
+    settings.INCIDENT_EMBEDDING_MODEL,
+    settings.INCIDENT_EMBEDDING_DIMENSIONS,
+    settings.INCIDENT_INDEX_IVF_THRESHOLD,
+    settings.INCIDENT_INDEX_NPROBE,
+)
+
+def incident_query_text(incident: Incident) -> str:
+    """What a new incident is searched by: its channel and the latest discussion."""
+    conversation = incident.conversation
+    lines = [conversation.texts[i] for i in range(len(conversation)) if not conversation.flags[i]]
+    text = f"Channel: {incident.channel_name}\n" + "\n".join(lines)
+    return truncate_to_tokens(text, settings.INCIDENT_EMBEDDING_MAX_TOKENS, keep_tail=True)
+
+def postmortem_sections(postmortem: str) -> Tuple[str, str]:
+    sections = dict(split_sections(postmortem))
+    summary = sections.get("Summary") or postmortem
+    return summary[:EXCERPT_CHARS], (sections.get("Root Cause") or "")[:EXCERPT_CHARS]
+
+async def recall_similar(incident: Incident, model_client: ModelClient) -> List[Dict]:
+    """Past incidents resembling this one, above INCIDENT_SIMILAR_MIN_SCORE."""
+    if not len(incident.conversation):
+        return []
+    [vector] = await incident_index.embed([incident_query_text(incident)], model_client)
+    results = await asyncio.to_thread(incident_index.search, vector, settings.INCIDENT_SIMILAR_TOP_K, incident.incident_id)
+    return incident_index.describe([(i, score) for i, score in results if score >= settings.INCIDENT_SIMILAR_MIN_SCORE])
+
+async def remember_incident(incident: Incident, postmortem: str, model_client: ModelClient):
+    summary, root_cause = postmortem_sections(postmortem)
+    text = truncate_to_tokens(
+        f"Channel: {incident.channel_name}\n{summary}\n{root_cause}", settings.INCIDENT_EMBEDDING_MAX_TOKENS
+    )
+    await incident_index.embed([text], model_client)
+    record = {
+        "incident_id": incident.incident_id, "platform": incident.source, "channel_id": incident.channel_id,
+        "channel_name": incident.channel_name, "summary": summary, "root_cause": root_cause,
+    }
+    await asyncio.to_thread(incident_index.add, [record], [embedding_key(incident_index.model, incident_index.dimensions, text)])
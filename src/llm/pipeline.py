@@ -1,38 +1,18 @@
-from typing import List, Optional
-from langchain_community.chat_models import ChatOpenAI
-from langchain.schema import AIMessage, HumanMessage, SystemMessage
-from langchain.tools import Tool
-from langchain.agents import initialize_agent, AgentType
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Iterator, Optional
 
 from src.app.core.config import settings
+from src.app.core.metrics import metrics
 from src.app.core.models import Incident
+from src.ingestion.parsers.context_builder import build_context
+from src.ingestion.parsers.log_reducer import is_signal, reduce_logs
+from src.llm.client import ModelClient
+from src.llm.tokens import chunk_lines, count_tokens, truncate_to_tokens
+from src.llm.validation import validate_structure
 
-OPENAI_API_KEY = settings.OPENAI_API_KEY
-LOG_LENGTH_LIMIT = 10000 
-
-class ModelClient:
-    def __init__(self, provider: str = "openai", model_name: str = None):
-        self.provider = provider
-        self.model_name = model_name
-        self.client = ChatOpenAI(
-            model=model_name,
-            temperature=0.3,
-            openai_api_key=OPENAI_API_KEY
-        )
-
-    @classmethod
-    def select(cls, provider: str = "openai", model_name: str = "gpt-4o") -> "ModelClient":
-        return cls(provider, model_name)
-
-    def generate(self, messages: List[dict]) -> str:
-        lc_msgs = []
-        for m in messages:
-            if m["role"] == "system":
-                lc_msgs.append(SystemMessage(content=m["content"]))
-            elif m["role"] == "user":
-                lc_msgs.append(HumanMessage(content=m["content"]))
-        response = self.client(lc_msgs)
-        return response.content
+LOG_LENGTH_LIMIT = 10000
 
 POSTMORTEM_TEMPLATE = """
 You are a senior SRE generating an incident postmortem.
@@ -56,6 +36,11 @@ Output format:
 6. Follow-ups
 """.strip()
 
+SIMILAR_INCIDENTS_HEADER = """
+Similar past incidents (reference only: use them to recognise recurring causes, never as facts or
+citations for this incident):
+""".strip()
+
 class AgentState(dict):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -63,93 +48,251 @@ class AgentState(dict):
         self.setdefault("postmortem", None)
         self.setdefault("valid", False)
 
-def build_multi_source_context(incident: Incident) -> str:
-    """
-    Format messages with source tags:
-      [slack] U123: message
-      [discord] 98765: message
-      [teams] S-1: message
-    """
+def iter_deployment_log_lines(incident: Incident) -> Iterator[str]:
+    """Lazily yield every deployment log line, inline text first, then each LogStream under its header."""
+    if incident.deployment_logs:
+        yield from incident.deployment_logs.split("\n")
+    for stream in incident.log_streams:
+        yield f"--- {stream.label} ---"
+        yield from stream.iter_lines()
+
+def read_deployment_logs(incident: Incident, limit: int) -> Optional[str]:
     lines = []
-    for msg in incident.conversation:
-        source = msg.source or incident.source or "unknown"
-        lines.append(f"[{source}] {msg.user_id}: {msg.text}")
-    return "\n".join(lines)
+    total = 0
+    for line in iter_deployment_log_lines(incident):
+        lines.append(line)
+        total += len(line) + 1
+        if total >= limit:
+            print(f"Deployment logs exceed {limit} chars, reading stopped early.")
+            break
+    return "\n".join(lines) or None
 
-def slack_tool_func(state: AgentState) -> str:
-    """Return formatted context (keeps compatibility with existing tools)"""
-    incident: Incident = state["incident"]
-    return build_multi_source_context(incident)
+def reduce_deployment_logs(incident: Incident) -> str:
+    """Compact oversized logs locally into a template/error-window digest within LOG_LENGTH_LIMIT."""
+    digest = reduce_logs(iter_deployment_log_lines(incident))
+    rendered = digest.render(max_chars=min(settings.LOG_DIGEST_MAX_CHARS, LOG_LENGTH_LIMIT))
+    print(f"Reduced {digest.total_chars} chars of deployment logs to a {len(rendered)} char digest.")
+    return rendered
 
-slack_tool = Tool(
-    name="ConversationContext",
-    func=lambda incident_state: slack_tool_func(incident_state),
-    description="Returns previously ingested messages for this incident from any source (Slack/Discord/Teams).",
-)
+SUMMARIZE_PROMPT = """
+You are a log summarization bot. Summarize the following deployment logs.
+Focus *only* on errors, warnings, failures, and key success markers (e.g., "deployment successful", "service started").
+Be very concise and use bullet points for key findings.
+""".strip()
 
-TOOLS = [slack_tool]
+MERGE_SUMMARIES_PROMPT = """
+You are a log summarization bot. Below are summaries of consecutive sections of one deployment log, in order.
+Merge them into one concise bullet-point summary: keep every distinct error, warning, failure and key success marker,
+drop duplicates, and keep chronological order.
+""".strip()
 
-def summarize_logs(logs: str, model_client: ModelClient) -> str:
+async def summarize_logs(logs: str, model_client: ModelClient) -> str:
     print(f"Summarizing {len(logs)} chars of log data...")
-    SUMMARIZE_PROMPT = """
-    You are a log summarization bot. Summarize the following deployment logs.
-    Focus *only* on errors, warnings, failures, and key success markers (e.g., "deployment successful", "service started").
-    Be very concise and use bullet points for key findings.
-    """.strip()
-    
+    if settings.LOG_SUMMARY_MODE == "map_reduce" and count_tokens(logs, model_client.model_name) > settings.LOG_SUMMARY_CHUNK_TOKENS:
+        return await map_reduce_summarize_logs(logs, model_client)
+
     try:
-        summary = model_client.generate([
+        summary = await model_client.generate([
             {"role": "system", "content": SUMMARIZE_PROMPT},
             {"role": "user", "content": logs},
-        ])
+        ], stage="log_summary")
         return f"--- LOG SUMMARY ---\n{summary}\n--- END OF SUMMARY ---"
     except Exception as e:
         print(f"Failed to summarize logs: {e}. Truncating instead.")
-        return logs[:LOG_LENGTH_LIMIT] # Fallback to truncation
+        return logs[-LOG_LENGTH_LIMIT:] # Fallback to truncation, keeping the tail where failures usually are
+
+async def _summarize_chunk(chunk: str, model_client: ModelClient, limit: asyncio.Semaphore) -> str:
+    try:
+        async with limit:
+            return await model_client.generate([
+                {"role": "system", "content": SUMMARIZE_PROMPT},
+                {"role": "user", "content": chunk},
+            ], stage="log_summary")
+    except Exception as e:
+        print(f"Failed to summarize log chunk: {e}. Keeping its error lines instead.")
+        error_lines = [line for line in chunk.split("\n") if is_signal(line)]
+        return "\n".join(error_lines[-settings.LOG_SUMMARY_FALLBACK_LINES:]) or "(no errors or warnings in this section)"
+
+async def _merge_summaries(group: str, model_client: ModelClient, limit: asyncio.Semaphore) -> str:
+    try:
+        async with limit:
+            return await model_client.generate([
+                {"role": "system", "content": MERGE_SUMMARIES_PROMPT},
+                {"role": "user", "content": group},
+            ], stage="log_summary")
+    except Exception as e:
+        print(f"Failed to merge log summaries: {e}. Keeping them unmerged.")
+        return truncate_to_tokens(group, settings.LOG_SUMMARY_CHUNK_TOKENS // 2, model_client.model_name)
+
+async def map_reduce_summarize_logs(logs: str, model_client: ModelClient) -> str:
+    """
+    Split logs on line boundaries into LOG_SUMMARY_CHUNK_TOKENS-sized chunks, summarize them
+    concurrently (at most LOG_SUMMARY_CONCURRENCY calls in flight), then merge the partial
+    summaries level by level until one remains.
+    """
+    model_name = model_client.model_name
+    chunks = await asyncio.to_thread(chunk_lines, logs.split("\n"), settings.LOG_SUMMARY_CHUNK_TOKENS, model_name)
+    print(f"Map-reduce summarizing {len(chunks)} log chunks...")
+
+    limit = asyncio.Semaphore(settings.LOG_SUMMARY_CONCURRENCY)
+    partials = await asyncio.gather(*(_summarize_chunk(chunk, model_client, limit) for chunk in chunks))
+    while len(partials) > 1:
+        sections = [f"[Section {i + 1}]\n{partial}" for i, partial in enumerate(partials)]
+        groups = chunk_lines(sections, settings.LOG_SUMMARY_CHUNK_TOKENS, model_name)
+        if len(groups) >= len(partials):
+            # Every partial fills a chunk on its own; merge pairwise so each level still shrinks.
+            groups = ["\n".join(sections[i:i + 2]) for i in range(0, len(sections), 2)]
+        partials = await asyncio.gather(*(_merge_summaries(group, model_client, limit) for group in groups))
 
-def synthesize_postmortem(state: AgentState, model: ModelClient):
-    llm_agent = initialize_agent(
-        tools=TOOLS,
-        llm=model.client,
-        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-        verbose=False
-    )
+    return f"--- LOG SUMMARY ---\n{partials[0]}\n--- END OF SUMMARY ---"
 
+REPAIR_PROMPT = """
+You fix incident postmortems. You are given the original instructions and context, a draft postmortem,
+and the problems a structural check found in it. Return the complete corrected postmortem only,
+changing nothing that is not needed to fix the listed problems.
+""".strip()
+
+class SynthesisStats:
+    """Per SYNTHESIS_MODE run counts, latency, LLM calls and repair outcomes, for comparing modes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._modes: Dict[str, Dict[str, float]] = {}
+
+    def record(self, mode: str, seconds: float, llm_calls: int, repaired: bool, valid: bool):
+        with self._lock:
+            stats = self._modes.setdefault(
+                mode, {"runs": 0, "seconds": 0.0, "llm_calls": 0, "repairs": 0, "invalid": 0}
+            )
+            stats["runs"] += 1
+            stats["seconds"] += seconds
+            stats["llm_calls"] += llm_calls
+            stats["repairs"] += int(repaired)
+            stats["invalid"] += int(not valid)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            modes = {mode: dict(stats) for mode, stats in self._modes.items()}
+        for stats in modes.values():
+            stats["avg_seconds"] = round(stats["seconds"] / stats["runs"], 3)
+            stats["avg_llm_calls"] = round(stats["llm_calls"] / stats["runs"], 2)
+            stats["seconds"] = round(stats["seconds"], 3)
+        return modes
+
+synthesis_stats = SynthesisStats()
+
+async def build_postmortem_prompt(state: AgentState, model: ModelClient) -> str:
     incident: Incident = state["incident"]
+
+    # Log reading, reduction and tokenization are CPU/disk bound; keep them off the event loop.
+    deployment_logs = await asyncio.to_thread(read_deployment_logs, incident, LOG_LENGTH_LIMIT + 1)
     
-    conversation_context = build_multi_source_context(incident)
-    full_context = [conversation_context]
-    
-    deployment_logs = incident.deployment_logs
-    
-    if deployment_logs:
-        if len(deployment_logs) > LOG_LENGTH_LIMIT:
+    # Oversized logs are compacted one way: by the local reducer (whose digest fits the limit),
+    # or, with the reducer disabled, by LLM summarization.
+    if deployment_logs and len(deployment_logs) > LOG_LENGTH_LIMIT:
+        if settings.LOG_REDUCER_ENABLED:
+            with metrics.stage("log_reduction"):
+                deployment_logs = await asyncio.to_thread(reduce_deployment_logs, incident)
+        else:
+            deployment_logs = await asyncio.to_thread(read_deployment_logs, incident, settings.LOG_PROMPT_MAX_CHARS)
             print(f"Deployment logs exceed {LOG_LENGTH_LIMIT} chars, summarizing...")
-            deployment_logs = summarize_logs(deployment_logs, model)
-        
-        full_context.append(f"\n\n--- DEPLOYMENT LOGS ---\n{deployment_logs}")
+            with metrics.stage("log_summarization"):
+                deployment_logs = await summarize_logs(deployment_logs, model)
 
-    context = "\n".join(full_context)
-    prompt = POSTMORTEM_TEMPLATE.replace("{{context}}", context)
+    with metrics.stage("context_build"):
+        context = await asyncio.to_thread(build_context, incident, deployment_logs, None, model.model_name)
+    print(context.report())
+    state["context_usage"] = context.usage()
+    rendered = context.render()
+    if settings.INCIDENT_INDEX_ENABLED:
+        with metrics.stage("similar_incidents"):
+            rendered += await similar_incidents_section(incident, model)
+    return POSTMORTEM_TEMPLATE.replace("{{context}}", rendered)
 
-    state["postmortem"] = llm_agent.run(prompt)
+async def similar_incidents_section(incident: Incident, model: ModelClient) -> str:
+    from src.llm.incident_index import recall_similar
+
+    try:
+        similar = await recall_similar(incident, model)
+    except Exception as e:
+        print(f"Failed to look up similar incidents: {e}. Continuing without them.")
+        return ""
+    if not similar:
+        return ""
+    entries = [
+        f"- [{time.strftime('%Y-%m-%d', time.localtime(past['created_at']))}] #{past['channel_name'] or past['channel_id']}"
+        f" (similarity {past['score']:.2f})\n  Summary: {past['summary']}\n  Root cause: {past['root_cause'] or 'n/a'}"
+        for past in similar
+    ]
+    return f"\n\n{SIMILAR_INCIDENTS_HEADER}\n" + "\n".join(entries)
+
+async def synthesize_postmortem(
+    state: AgentState, model: ModelClient, on_delta: Optional[Callable[[str], Awaitable[None]]] = None
+):
+    """Generate the draft postmortem; in direct mode with `on_delta`, text is handed over as it streams in."""
+    prompt = await build_postmortem_prompt(state, model)
+    state["prompt"] = prompt
+
+    with metrics.stage("synthesis", mode=settings.SYNTHESIS_MODE):
+        if settings.SYNTHESIS_MODE == "agent":
+            from src.llm.agent import run_agent
+
+            state["postmortem"] = await run_agent(prompt, model)
+        elif on_delta is not None:
+            parts = []
+            async for delta in model.stream([{"role": "user", "content": prompt}], stage="synthesis"):
+                parts.append(delta)
+                await on_delta(delta)
+            state["postmortem"] = "".join(parts)
+        else:
+            state["postmortem"] = await model.generate([{"role": "user", "content": prompt}], stage="synthesis")
     return state
 
-def validate_postmortem(state: AgentState, model: ModelClient):
-    check_query = f"Is the following postmortem complete and properly formatted? Respond YES or NO.\n\n{state['postmortem']}"
-    res = model.generate([
-        {"role": "system", "content": "You are a validator."},
-        {"role": "user", "content": check_query},
-    ])
-    state["valid"] = "YES" in res.upper()
+async def validate_postmortem(state: AgentState, model: ModelClient):
+    """Check the postmortem structure locally; ask the model to repair it only when the check fails."""
+    incident: Incident = state["incident"]
+    known_users = set(incident.conversation.user_ids) | {incident.triggered_by_user_id}
+    result = validate_structure(state["postmortem"], known_users)
+
+    for _ in range(settings.SYNTHESIS_REPAIR_ATTEMPTS):
+        if result.valid:
+            break
+        print(f"Postmortem failed validation ({'; '.join(result.problems)}), repairing...")
+        problems = "\n".join(f"- {problem}" for problem in result.problems)
+        try:
+            repaired = await model.generate([
+                {"role": "system", "content": REPAIR_PROMPT},
+                {"role": "user", "content": (
+                    f"{state['prompt']}\n\n--- DRAFT POSTMORTEM ---\n{state['postmortem']}"
+                    f"\n\n--- PROBLEMS ---\n{problems}"
+                )},
+            ], stage="repair")
+        except Exception as e:
+            print(f"Failed to repair postmortem: {e}. Keeping the draft.")
+            break
+        state["repaired"] = True
+        repaired_result = validate_structure(repaired, known_users)
+        if len(repaired_result.problems) <= len(result.problems):
+            state["postmortem"], result = repaired, repaired_result
+
+    state["valid"] = result.valid
+    state["validation_problems"] = result.problems
     return state
 
 class PostmortemAgent:
     def __init__(self, model_client: Optional[ModelClient] = None):
         self.model = model_client or ModelClient.select()
 
-    def run(self, incident: Incident) -> str:
+    async def run(self, incident: Incident, on_delta: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
+        mode = settings.SYNTHESIS_MODE
+        started = time.perf_counter()
+        calls_before = self.model.calls
         state = AgentState(incident=incident)
-        state = synthesize_postmortem(state, self.model)
-        state = validate_postmortem(state, self.model)
-        return state.get("postmortem", "No output generated.")
\ No newline at end of file
+        state = await synthesize_postmortem(state, self.model, on_delta)
+        with metrics.stage("validation"):
+            state = await validate_postmortem(state, self.model)
+        elapsed = time.perf_counter() - started
+        llm_calls = self.model.calls - calls_before
+        synthesis_stats.record(mode, elapsed, llm_calls, state.get("repaired", False), state["valid"])
+        print(f"Postmortem synthesized in {elapsed:.2f}s with {llm_calls} LLM calls ({mode} mode, valid={state['valid']}).")
+        return state.get("postmortem", "No output generated.")
@@ -0,0 +1,59 @@
+import math
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Rough chars-per-token ratio for English/log text when tiktoken is unavailable.
+CHARS_PER_TOKEN = 4
+
+@lru_cache(maxsize=8)
+def _encoding(model: Optional[str]):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("o200k_base")
+    except (KeyError, ValueError):
+        return tiktoken.get_encoding("o200k_base")
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None, keep_tail: bool = False) -> str:
+    """Cut `text` to `max_tokens`, keeping its start (or its end with `keep_tail`)."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is None:
+        limit = max_tokens * CHARS_PER_TOKEN
+        return text[-limit:] if keep_tail else text[:limit]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[-max_tokens:] if keep_tail else tokens[:max_tokens])
+
+def chunk_lines(lines: Iterable[str], max_tokens: int, model: Optional[str] = None) -> List[str]:
+    """Pack lines into chunks of at most `max_tokens`, splitting only on line boundaries
+    (a single line longer than a chunk is cut on its own)."""
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for line in lines:
+        line_tokens = count_tokens(line, model) + 1
+        if line_tokens > max_tokens:
+            line = truncate_to_tokens(line, max_tokens - 1, model)
+            line_tokens = max_tokens
+        if current and current_tokens + line_tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
@@ -0,0 +1,103 @@
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from typing import Iterable, List, Optional, Set, Tuple
+
+REQUIRED_SECTIONS = ("Summary", "Impact", "Timeline", "Root Cause", "Remediations", "Follow-ups")
+# "1. Summary", "## 2) Impact", "**Root Cause**:", "Follow ups" ... A bare word only counts
+# as a heading when it is alone on its line or followed by a colon.
+SECTION_HEADING = re.compile(
+    r"^\s*(?P<marker>(?:#{1,6}\s*)?(?:\*\*|__)?\s*(?:\d+\s*[.)]\s*)?(?:\*\*|__)?)\s*"
+    r"(?P<name>summary|impact|timeline|root[ -]cause|remediations?|follow[- ]?ups?)\b\s*(?:\*\*|__)?\s*(?P<colon>:?)",
+    re.IGNORECASE,
+)
+TIMELINE_STAMP = re.compile(r"(?:(\d{4}-\d{2}-\d{2})[T ])?\b(\d{1,2}):(\d{2})(?::(\d{2}))?\b")
+CITATION = re.compile(r"\b([\w.\-]+)@(slack|discord|teams)\b", re.IGNORECASE)
+
+@dataclass
+class ValidationResult:
+    problems: List[str] = field(default_factory=list)
+
+    @property
+    def valid(self) -> bool:
+        return not self.problems
+
+def _key(name: str) -> str:
+    return re.sub(r"[^a-z]", "", name.lower()).rstrip("s")
+
+def _canonical(name: str) -> str:
+    return next((section for section in REQUIRED_SECTIONS if _key(section) == _key(name)), name)
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """(section, body) pairs in document order, keyed by the canonical names in REQUIRED_SECTIONS."""
+    sections: List[Tuple[str, List[str]]] = []
+    for line in text.splitlines():
+        match = SECTION_HEADING.match(line)
+        if match and (match.group("marker").strip() or match.group("colon") or not line[match.end():].strip()):
+            sections.append((_canonical(match.group("name")), [line[match.end():]]))
+        elif sections:
+            sections[-1][1].append(line)
+    return [(name, "\n".join(body).strip()) for name, body in sections]
+
+def _timeline_stamps(body: str) -> List[datetime]:
+    stamps = []
+    current_day: Optional[date] = None
+    for line in body.splitlines():
+        match = TIMELINE_STAMP.search(line)
+        if not match:
+            continue
+        day, hour, minute, second = match.groups()
+        if day:
+            try:
+                current_day = date.fromisoformat(day)
+            except ValueError:
+                continue
+        if int(hour) > 23 or int(minute) > 59:
+            continue
+        stamps.append(datetime.combine(current_day or date.min, time(int(hour), int(minute), int(second or 0))))
+    return stamps
+
+def validate_structure(text: str, known_users: Optional[Iterable[str]] = None) -> ValidationResult:
+    """
+    Local checks of a generated postmortem: the six required sections are present,
+    non-empty and in order; timeline entries are chronological; and inline citations
+    use `user_id@source` naming users that appear in the incident (when `known_users` is given).
+    """
+    result = ValidationResult()
+    if not text or not text.strip():
+        result.problems.append("The postmortem is empty.")
+        return result
+
+    sections = split_sections(text)
+    found = [name for name, _ in sections if name in REQUIRED_SECTIONS]
+    missing = [name for name in REQUIRED_SECTIONS if name not in found]
+    if missing:
+        result.problems.append(f"Missing sections: {', '.join(missing)}.")
+    present = [name for name in REQUIRED_SECTIONS if name in found]
+    first_seen = list(dict.fromkeys(found))
+    if first_seen != present:
+        result.problems.append(f"Sections must appear in this order: {', '.join(REQUIRED_SECTIONS)}.")
+    for name, body in sections:
+        if name in REQUIRED_SECTIONS and not body:
+            result.problems.append(f"Section '{name}' is empty.")
+
+    timeline = next((body for name, body in sections if name == "Timeline"), "")
+    stamps = _timeline_stamps(timeline)
+    if timeline and not stamps:
+        result.problems.append("Timeline entries have no times.")
+    for earlier, later in zip(stamps, stamps[1:]):
+        if later < earlier:
+            result.problems.append(
+                f"Timeline is not chronological: {later.strftime('%H:%M')} comes after {earlier.strftime('%H:%M')}."
+            )
+            break
+
+    citations = CITATION.findall(text)
+    if not citations:
+        result.problems.append("No inline citations in user_id@source form (e.g. U123@slack).")
+    elif known_users is not None:
+        known: Set[str] = set(known_users)
+        unknown = sorted({f"{user}@{source}" for user, source in citations if user not in known})
+        if unknown:
+            result.problems.append(f"Citations name users not in the conversation: {', '.join(unknown[:10])}.")
+    return result